@@ -1,10 +1,17 @@
+import multiprocessing
+
 import hylandbook.app
 
 
 
 
-try:
-    App = hylandbook.app.App()
-    App.main()
-except KeyboardInterrupt:
-    pass
+# worker processes import this module too, only the main process runs the app
+if __name__ == '__main__':
+    # needed for process pools in the bundled exe
+    multiprocessing.freeze_support()
+
+    try:
+        App = hylandbook.app.App()
+        App.main()
+    except KeyboardInterrupt:
+        pass
@@ -1,13 +1,35 @@
-import json
+import asyncio
+import concurrent.futures
+import cProfile
+import signal
 import sqlite3
 import sys
 import time
 from pathlib import Path
 
 import hylandbook.argparser
-import hylandbook.database
+import hylandbook.cmd_bench
+import hylandbook.cmd_compact
+import hylandbook.cmd_export_history
+import hylandbook.cmd_generate
+import hylandbook.cmd_import
+import hylandbook.cmd_rebuild_rollups
+import hylandbook.cmd_restore
+import hylandbook.cmd_stats
+import hylandbook.command
 import hylandbook.conf
+import hylandbook.export
+import hylandbook.httpserver
+import hylandbook.metrics
+import hylandbook.pipeline
+import hylandbook.retention
+import hylandbook.savegame
+import hylandbook.scheduler
 import hylandbook.screen
+import hylandbook.sinks
+import hylandbook.snapshots
+import hylandbook.watcher
+import hylandbook.writer
 
 
 
@@ -18,69 +40,219 @@ Screen = hylandbook.screen.Screen()
 
 
 
-class App:
-    Argparser: hylandbook.argparser.Argparser
-    Database: hylandbook.database.DatabaseSQLite
-
-    args: dict
-
-    save_dir: Path
-    data_dir: Path
-    db_file: Path
+class App(hylandbook.command.Command):
+    # the other commands, their options are in Conf.commands
+    commands: dict[str, type[hylandbook.command.Command]] = {
+        'generate': hylandbook.cmd_generate.GenerateCommand,
+        'bench': hylandbook.cmd_bench.BenchCommand,
+        'compact': hylandbook.cmd_compact.CompactCommand,
+        'rebuild-rollups': hylandbook.cmd_rebuild_rollups.RebuildRollupsCommand,
+        'import': hylandbook.cmd_import.ImportCommand,
+        'restore': hylandbook.cmd_restore.RestoreCommand,
+        'stats': hylandbook.cmd_stats.StatsCommand,
+        'export-history': hylandbook.cmd_export_history.ExportHistoryCommand,
+    }
 
-    sd_profile: dict = {}
-    sd_log: dict = {}
-    sd_cache: dict = {}
+    Argparser: hylandbook.argparser.Argparser
+    Exporter: hylandbook.export.Exporter
+    Watcher: hylandbook.watcher.Watcher | None = None
+    Scheduler: hylandbook.scheduler.AdaptiveScheduler | None = None
+    Retention: hylandbook.retention.Retention | None = None
+    OverlayServer: hylandbook.httpserver.OverlayServer | None = None
+    Sinks: list[hylandbook.sinks.Sink]
+    Snapshots: hylandbook.snapshots.SnapshotStore | None = None
+    WriterQueue: hylandbook.writer.WriterQueue | None = None
+    DbStage: hylandbook.pipeline.Stage
+    ExportStage: hylandbook.pipeline.Stage
+    Metrics: hylandbook.metrics.Metrics
+    Profiler: cProfile.Profile | None = None
+
+    next_vacuum: float = 0
+    freed_pages: int = 0
 
 
     def __init__(self) -> None:
+        super().__init__()
         self.Argparser = hylandbook.argparser.Argparser(conf=Conf.argparser)
+        self.Metrics = hylandbook.metrics.Metrics(definitions=Conf.metrics, buckets=Conf.metrics_buckets)
+        self.Sinks = []
 
 
     def main(self) -> None:
+        command: str | None = Conf.command_aliases.get(sys.argv[1], sys.argv[1]) if len(sys.argv) > 1 else None
+
+        if command in Conf.commands:
+            args: dict = hylandbook.argparser.Argparser(conf=Conf.commands[command]).parse(sys.argv[2:])
+            sys.exit(self.commands[command](args=args).run())
+
+        # known before parsing, the start screen is skipped too
+        Screen.setup(headless='--headless' in sys.argv[1:])
+
         Screen.clear()
-        Screen.msg(Conf.app_banner, end="\n\n")
+        if not Screen.headless:
+            Screen.msg(Conf.app_banner, end="\n\n")
 
         if len(sys.argv) < 2:
             self.Argparser.help()
             Screen.prompt_to_exit()
 
         self.args = self.Argparser.parse()
+
+        exit_code: int = self.run()
+        if exit_code:
+            Screen.prompt_to_exit(exit_code)
+
+
+    def run(self) -> int:
         self.args['check_interval'] = max(Conf.min_check_interval, self.args['check_interval'])
+        self.args['keyframe_interval'] = max(1, self.args['keyframe_interval'])
 
         if not self._init_fs():
-            Screen.prompt_to_exit(1)
-            return
+            return 1
 
         if not self._init_db():
-            Screen.prompt_to_exit(2)
-            return
-
-        if not self._init_sd_profile():
-            Screen.prompt_to_exit(3)
-            return
+            return 2
+
+        self.Exporter = hylandbook.export.Exporter(
+            data_dir=self.data_dir,
+            types=self.args['export_types'],
+            keys=self.args['export_keys'],
+            all_keys=Conf.export_keys_choices,
+            replace_retries=Conf.export_replace_retries,
+            replace_retry_delay=Conf.export_replace_retry_delay,
+        )
+
+        if not self._init_sd_profiles():
+            return 3
+
+        if self.args['retention']:
+            self.Retention = self._new_retention()
+
+        if self.args['snapshots']:
+            self.Snapshots = hylandbook.snapshots.SnapshotStore(
+                database=self.Database,
+                codec=self.args['snapshots'],
+                glob=Conf.snapshot_glob,
+                keyframe_interval=self.args['keyframe_interval'],
+                delta_min_size=Conf.snapshot_delta_min_size,
+            )
 
-        Screen.msg(f"save directory: {self.save_dir}", start="\n")
-        Screen.msg(f"data directory: {self.data_dir}")
-        Screen.msg(f"  organisation: {self.sd_profile['organisation']}", end="\n\n")
+        if self.args['writer_queue']:
+            self.WriterQueue = hylandbook.writer.WriterQueue(data_dir=self.data_dir, database=self._new_database(), poll_interval=Conf.writer_poll_interval)
+            try:
+                self.WriterQueue.start()
+            except OSError as e:
+                Screen.msg(f"[BOO] {e}")
+                return 4
+
+        if self.args['http'] is not None:
+            self.OverlayServer = hylandbook.httpserver.OverlayServer(
+                host=Conf.http_host,
+                port=self.args['http'],
+                cors_origin=Conf.http_cors_origin,
+                keepalive=Conf.http_keepalive,
+                long_poll_timeout=Conf.http_long_poll_timeout,
+                backlog=Conf.http_event_backlog,
+                metrics=self.Metrics.render,
+            )
+            try:
+                self.OverlayServer.start()
+            except OSError as e:
+                Screen.msg(f"[BOO] failed to start http server on port {self.args['http']}: {e}")
+                return 4
 
-        Screen.msg("to quit at any time, type [CTRL]+[C] or close this window", end="\n\n")
+        for spec in self.args['sink']:
+            try:
+                sink: hylandbook.sinks.Sink = hylandbook.sinks.Sink.create(
+                    spec=spec,
+                    keys=self.Exporter.keys,
+                    data_dir=self.data_dir,
+                    policies=Conf.sink_policies,
+                    maxsize=Conf.sink_queue_size,
+                    accept_interval=Conf.sink_accept_interval,
+                    fifo_write_timeout=Conf.sink_fifo_write_timeout,
+                    max_datagram=Conf.sink_udp_max_datagram,
+                    statsd_prefix=Conf.sink_statsd_prefix,
+                    line_measurement=Conf.sink_line_measurement,
+                )
+                sink.start()
+            except (ValueError, OSError) as e:
+                Screen.msg(f"[BOO] failed to start sink {spec}: {e}")
+                self._close_sinks()
+                return 4
+            self.Sinks.append(sink)
+
+        if self.args['watch']:
+            self.Watcher = hylandbook.watcher.Watcher.create(
+                dirs=[save.save_dir for save in self.saves],
+                files=Conf.sd_files,
+                debounce=Conf.watch_debounce,
+                poll_interval=Conf.watch_poll_interval,
+            )
+        elif self.args['adaptive']:
+            self.Scheduler = hylandbook.scheduler.AdaptiveScheduler(
+                min_interval=Conf.adaptive_min_interval,
+                max_interval=self.args['check_interval'],
+                backoff=Conf.adaptive_backoff,
+                burst_gap=Conf.adaptive_burst_gap,
+                margin=Conf.adaptive_margin,
+                window_checks=Conf.adaptive_window_checks,
+            )
 
-        if input("start monitoring? [y/n]: ").strip().lower() != 'y':
-            return
+        Screen.msg(f"data directory: {self.data_dir}", start="\n")
+        if self.Watcher:
+            Screen.msg(f"    check mode: watch ({self.Watcher.name})")
+        elif self.Scheduler:
+            Screen.msg(f"    check mode: adaptive, every {self.Scheduler.min_interval:g}-{self.Scheduler.max_interval:g}s")
+        else:
+            Screen.msg(f"    check mode: every {self.args['check_interval']}s")
+        if self.Retention:
+            Screen.msg(f"     retention: {len(Conf.retention_tiers)} tiers")
+        if self.Snapshots:
+            Screen.msg(f"     snapshots: {self.Snapshots.codec}, keyframe every {self.Snapshots.keyframe_interval}")
+        if self.WriterQueue:
+            Screen.msg(f"  writer queue: {self.WriterQueue.role}")
+        if self.OverlayServer:
+            Screen.msg(f"   http server: http://{self.OverlayServer.host}:{self.OverlayServer.port}/current.json")
+        for sink in self.Sinks:
+            Screen.msg(f"          sink: {sink.name}, {sink.policy}")
+        if self.args['metrics']:
+            Screen.msg(f"       metrics: {self.data_dir.joinpath(Conf.metrics_file_name)}")
+        Screen.msg()
+
+        for save in self.saves:
+            Screen.msg(f"save directory: {save.save_dir}")
+            Screen.msg(f"  organisation: {save.sd_profile['organisation']}", end="\n\n")
+
+        if not self.args['headless']:
+            Screen.msg("to quit at any time, type [CTRL]+[C] or close this window", end="\n\n")
+
+        if not self.args['headless'] and input("start monitoring? [y/n]: ").strip().lower() != 'y':
+            return 0
+
+        # service managers stop with SIGTERM, leave through the cleanup in _monitor_sd like on [CTRL]+[C],
+        # replaced by the event loop's own handler where it has one
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+        if hasattr(signal, 'SIGUSR1'):
+            signal.signal(signal.SIGUSR1, lambda signum, frame: self._toggle_profile())
 
         self._monitor_sd()
 
+        return 0
+
 
     def _init_fs(self) -> bool:
-        self.save_dir = Path(self.args['save_dir']).resolve()
         self.data_dir = Path(self.args['data_dir']).resolve()
         self.db_file = self.data_dir.joinpath(Conf.db_file_name)
 
-        if not self.save_dir.exists() or not self.save_dir.is_dir():
-            Screen.msg(f"save_dir does not exist or is not a directory: {self.save_dir}")
+        save_dirs: list[Path] | None = self._find_save_dirs(self.args['save_dirs'])
+
+        if save_dirs is None:
             return False
 
+        self.save_dirs = save_dirs
+
         if not self.data_dir.exists():
             # Screen.msg(f"data_dir does not exist yet: {self.data_dir}")
             # if input("create it now? [y/n]: ").strip().lower() != 'y':
@@ -94,371 +266,359 @@ class App:
         return True
 
 
-    def _init_db(self) -> bool:
-        self.Database = hylandbook.database.DatabaseSQLite(file=self.db_file)
-
-        if not self.db_file.exists():
-            con, cur = self.Database.connect()
-            try:
-                cur.executescript(Conf.db_schema)
-            except sqlite3.OperationalError as e:
-                Screen.msg(f"[BOO] failed to create database file: {e}")
-                con.close()
-                self.db_file.unlink(missing_ok=True)
-                return False
-            finally:
-                con.close()
+    def _monitor_sd(self) -> None:
+        if self.args['profile']:
+            self._toggle_profile()
 
-        return True
+        try:
+            asyncio.run(self._monitor_sd_async())
+        except asyncio.CancelledError:
+            # stopped with SIGTERM
+            pass
+        finally:
+            if self.WriterQueue:
+                self.WriterQueue.close()
+            if self.Watcher:
+                self.Watcher.close()
+            if self.OverlayServer:
+                self.OverlayServer.close()
+            self._close_sinks()
+            if self.Profiler:
+                self._toggle_profile()
+
+
+    async def _monitor_sd_async(self) -> None:
+        # reading, the database, exports and the countdown each run on their own,
+        # a slow commit or export target does not hold up reading the next save
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        loop.set_default_executor(concurrent.futures.ThreadPoolExecutor(max_workers=Conf.monitor_threads, thread_name_prefix='hylandbook-read'))
 
+        try:
+            # leave through the cleanup below like on [CTRL]+[C]
+            loop.add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+        except NotImplementedError:
+            pass
 
-    def _init_sd_profile(self) -> bool:
-        Screen.msg("loading save data profile ...")
+        # the database connection is only ever used by the thread of its stage
+        self.DbStage = hylandbook.pipeline.Stage(name='db', maxsize=Conf.monitor_db_queue_size)
+        self.ExportStage = hylandbook.pipeline.Stage(name='export', maxsize=Conf.monitor_export_queue_size)
+        self.DbStage.start()
+        self.ExportStage.start()
 
-        con, cur = self.Database.connect()
+        pending: list[hylandbook.savegame.SaveGame] = self.saves
 
         try:
-            self.sd_profile['save_dir'] = self.save_dir.name
-            self.sd_profile['organisation'] = self._sd('organisation')
-            self.sd_profile['seed'] = self._sd('seed')
+            await self.DbStage.call(self.Database.open)
 
-            if not self.sd_profile.get('save_dir'):
-                Screen.msg("[BOO] missing profile value 'save_dir'")
-                return False
-
-            if not self.sd_profile.get('organisation'):
-                Screen.msg("[BOO] missing profile value 'organisation'")
-                return False
+            while True:
+                tick_start: float = time.perf_counter()
+
+                if not self.args['headless']:
+                    Screen.begin_frame()
+                    Screen.msg(Conf.app_banner, end="\n\n")
+                    Screen.msg("parsing save game data ...", ts=True)
+
+                with self.Metrics.time('hylandbook_stage_seconds', stage='read'):
+                    await asyncio.gather(*[save.read_log_async() for save in pending])
+
+                for save in self.saves:
+                    if save in pending or not self.args['headless']:
+                        for e in save.errors:
+                            Screen.msg(e)
+                    if save in pending:
+                        self.Metrics.inc('hylandbook_read_errors_total', len(save.errors))
+
+                    previous: dict = {}
+
+                    if save.gave_up:
+                        save.compared = False
+                        Screen.msg(f"[BOO] {save.save_dir.name}: save files could not be read consistently, skipped until they change", ts=True)
+                    elif save.failed is not None:
+                        if not self.args['headless']:
+                            Screen.msg(f"{save.save_dir.name}: save files could not be read, waiting for them to change", ts=True)
+                    elif save in pending and not save.consistent:
+                        # compared once the game has written all files
+                        save.compared = False
+                        if not self.args['headless']:
+                            Screen.msg(f"{save.save_dir.name}: save files still being written, checking again", ts=True)
+                    elif save not in pending or (save.compared and not save.Cache.changed):
+                        if not self.args['headless']:
+                            Screen.msg(f"{save.save_dir.name}: no changes detected (save files unchanged)", ts=True)
+                    else:
+                        save.compared = True
+
+                        with self.Metrics.time('hylandbook_stage_seconds', stage='compare'):
+                            previous = save.last_log
+                            current: dict = {col: save.sd_log[col] for col in self.SdLogExtractor.compare_columns}
+                            changed: bool = previous != current
+
+                        if not changed:
+                            if not self.args['headless']:
+                                Screen.msg(f"{save.save_dir.name}: no changes detected", ts=True)
+                            self._derive(save)
+                            self._serve(save, changed=False)
+                            self._push(save, changed=False)
+                        else:
+                            if not self.args['headless']:
+                                Screen.msg(f"{save.save_dir.name}: changes detected", ts=True)
+                            else:
+                                Screen.log(event='change', save_dir=save.save_dir.name, save_id=save.sd_profile['save_id'], **{k: v for k, v in save.sd_log.items() if k not in save.last_values or save.last_values[k] != v})
+
+                            # queued with the values of this tick, the save may be read again before they are written
+                            row: dict = {
+                                'log_time': time.time(),
+                                **save.sd_profile,
+                                **save.sd_log,
+                            }
+                            await self.DbStage.put(self._insert_log, save, row)
+                            save.last_log = current
+                            save.last_values = dict(save.sd_log)
+
+                            self.Derived.append(save_id=save.sd_profile['save_id'], row={'_t': row['log_time'], **save.sd_log})
+                            self._derive(save)
+
+                            await self.ExportStage.put(self._export, save, {'_t': row['log_time'], **save.sd_profile, **save.sd_log, **save.derived})
+                            with self.Metrics.time('hylandbook_stage_seconds', stage='http'):
+                                self._serve(save, changed=True)
+                            self._push(save, changed=True)
+
+                    if not self.args['headless']:
+                        self._print_tick_summary(save=save, previous=previous)
+
+                await self.DbStage.put(self._maintain_db)
+
+                self._collect_metrics(tick_start=tick_start)
+                if self.args['metrics']:
+                    await self.ExportStage.put(self._write_metrics)
+
+                changed_dirs: set[Path] | None = await self._wait_for_next_tick()
+
+                pending = self.saves if changed_dirs is None else [save for save in self.saves if save.save_dir in changed_dirs]
+        finally:
+            try:
+                await self.ExportStage.close()
+            finally:
+                # queued rows are written and committed before the connection is closed
+                await self.DbStage.close(last=self.Database.close)
 
-            if not self.sd_profile.get('seed'):
-                Screen.msg("[BOO] missing profile value 'seed'")
-                return False
 
-            r: sqlite3.Cursor = cur.execute(
-                '''
-                SELECT save_id
-                FROM saves
-                WHERE
-                    save_dir = :save_dir
-                    AND organisation = :organisation
-                    AND seed = :seed
-                ORDER BY save_id DESC
-                LIMIT 1;
-                ''',
-                self.sd_profile
-            )
+    def _insert_log(self, save: hylandbook.savegame.SaveGame, row: dict) -> None:
+        # runs in the thread of the database stage
+        with self.Metrics.time('hylandbook_stage_seconds', stage='insert'):
+            if self.WriterQueue:
+                # the writer would wait for the write lock held by this instance's open transaction
+                self._commit(force=True)
+                log_id: int = self.WriterQueue.write(self.insert_log_sql, row)
+            else:
+                log_id: int = self.Database.write(self.insert_log_sql, row).fetchone()[0]
+        self.Metrics.inc('hylandbook_rows_inserted_total')
+
+        if self.Snapshots:
+            with self.Metrics.time('hylandbook_stage_seconds', stage='snapshot'):
+                self.Snapshots.store(log_id=log_id, save_dir=save.save_dir)
+            if self.WriterQueue:
+                # written by this instance itself, the writer would wait for the lock until the next row
+                self._commit(force=True)
+
+
+    def _collect_metrics(self, tick_start: float) -> None:
+        self.Metrics.observe('hylandbook_tick_seconds', time.perf_counter() - tick_start)
+        self.Metrics.inc('hylandbook_ticks_total')
+
+        # running totals are kept by the caches and the exporter
+        self.Metrics.set('hylandbook_files_read_total', sum([save.Cache.reads for save in self.saves]))
+        self.Metrics.set('hylandbook_bytes_read_total', sum([save.Cache.bytes_read for save in self.saves]))
+        self.Metrics.set('hylandbook_cache_hits_total', sum([save.Cache.hits for save in self.saves]))
+        self.Metrics.set('hylandbook_cache_misses_total', sum([save.Cache.misses for save in self.saves]))
+        self.Metrics.set('hylandbook_cache_bytes', sum([save.Cache.size for save in self.saves]))
+        self.Metrics.set('hylandbook_torn_reads_total', sum([save.retried for save in self.saves]))
+        self.Metrics.set('hylandbook_derived_computed_total', self.Derived.computed)
+        self.Metrics.set('hylandbook_derived_reused_total', self.Derived.reused)
+        self.Metrics.set('hylandbook_export_bytes_total', self.Exporter.bytes_written)
+        for sink in self.Sinks:
+            self.Metrics.set('hylandbook_sink_rows_sent_total', sink.sent, sink=sink.name)
+            self.Metrics.set('hylandbook_sink_rows_dropped_total', sink.dropped, sink=sink.name)
+            self.Metrics.set('hylandbook_sink_rows_coalesced_total', sink.coalesced, sink=sink.name)
+            self.Metrics.set('hylandbook_sink_errors_total', sink.errors, sink=sink.name)
+            self.Metrics.set('hylandbook_sink_queue_depth', sink.depth, sink=sink.name)
+        self.Metrics.set('hylandbook_db_busy_retries_total', self.Database.busy_waits)
+        if self.WriterQueue:
+            self.Metrics.set('hylandbook_writer_statements_total', self.WriterQueue.statements)
+            self.Metrics.set('hylandbook_writer_batches_total', self.WriterQueue.batches)
+        if self.Retention:
+            self.Metrics.set('hylandbook_retention_deleted_rows_total', self.Retention.deleted)
+        if self.Snapshots:
+            self.Metrics.set('hylandbook_snapshot_blobs_total', self.Snapshots.blobs_written)
+            self.Metrics.set('hylandbook_snapshot_bytes_total', self.Snapshots.bytes_written)
+            self.Metrics.set('hylandbook_snapshot_deltas_total', self.Snapshots.deltas_written)
+
+        self.Metrics.set('hylandbook_queue_depth', self.DbStage.Queue.qsize(), stage='db')
+        self.Metrics.set('hylandbook_queue_depth', self.ExportStage.Queue.qsize(), stage='export')
+        self.Metrics.set('hylandbook_queue_full_total', self.DbStage.full, stage='db')
+        self.Metrics.set('hylandbook_queue_full_total', self.ExportStage.full, stage='export')
+
+
+    def _write_metrics(self) -> None:
+        try:
+            self.Metrics.write(self.data_dir.joinpath(Conf.metrics_file_name))
+        except OSError as e:
+            Screen.msg(f"[BOO] failed to write metrics: {e}", ts=True)
 
-            existing_profile: sqlite3.Row | None = r.fetchone()
 
-            if not existing_profile:
-                cur.execute(
-                    '''
-                    INSERT INTO saves (save_dir, organisation, seed)
-                    VALUES (:save_dir, :organisation, :seed);
-                    ''',
-                    self.sd_profile
-                )
-                con.commit()
-                self.sd_profile['save_id'] = cur.lastrowid
-                Screen.msg("new save profile created")
-            else:
-                self.sd_profile['save_id'] = existing_profile['save_id']
-                Screen.msg("existing save profile found")
+    def _toggle_profile(self) -> None:
+        if not self.Profiler:
+            self.Profiler = cProfile.Profile()
+            self.Profiler.enable()
+            Screen.msg("profiling started", ts=True)
+            return
 
-            if not self.sd_profile.get('save_id'):
-                Screen.msg("[BOO] failed to get save_id")
-                return False
+        self.Profiler.disable()
+        file: Path = self.data_dir.joinpath(Conf.profile_file_name.format(time=time.strftime('%Y%m%d_%H%M%S')))
+        try:
+            self.Profiler.dump_stats(file)
+            Screen.msg(f"profile written to: {file}", ts=True)
+        except OSError as e:
+            Screen.msg(f"[BOO] failed to write profile: {e}", ts=True)
+        self.Profiler = None
 
-            # Screen.msg(f"save profile loaded")
-        finally:
-            con.close()
 
-        return True
+    def _print_tick_summary(self, save: hylandbook.savegame.SaveGame, previous: dict) -> None:
+        Screen.msg()
+        self._print_monitor_summary(save=save, previous=previous)
+        Screen.msg()
+        Screen.msg(f"save data cache: {save.Cache.hits} hits, {save.Cache.misses} misses, {len(save.Cache.entries)} files, {save.Cache.size / 1024:.0f} KiB", end="\n\n")
 
 
-    def _monitor_sd(self) -> None:
-        con, cur = self.Database.connect()
+    def _maintain_db(self) -> None:
+        if not self.Retention:
+            return
 
         try:
+            with self.Metrics.time('hylandbook_stage_seconds', stage='retention'):
+                deleted: int = self.Retention.run()
+            if deleted:
+                Screen.msg(f"retention: {deleted} old log rows thinned out", ts=True)
+
+            # released by the commit after the last maintenance
+            if self.Database.freed_pages > self.freed_pages:
+                Screen.msg(f"retention: {self.Database.freed_pages - self.freed_pages} free database pages released", ts=True)
+                self.freed_pages = self.Database.freed_pages
+
+            if time.monotonic() >= self.next_vacuum:
+                self.next_vacuum = time.monotonic() + Conf.db_vacuum_interval
+                self.Database.incremental_vacuum(pages=Conf.db_vacuum_pages)
+        except sqlite3.OperationalError as e:
+            Screen.msg(f"[BOO] failed to apply retention: {e}", ts=True)
+
+
+    async def _wait_for_next_tick(self) -> set[Path] | None:
+        if self.Watcher:
+            if not self.args['headless']:
+                Screen.msg("waiting for save data changes ...", ts=True)
+                Screen.end_frame()
+            # saves skipped while the game was writing them are read again without waiting for another change
+            unsettled: set[Path] = {save.save_dir for save in self.saves if not save.consistent and save.failed is None}
             while True:
-                Screen.clear()
-                Screen.msg(Conf.app_banner, end="\n\n")
-
-                Screen.msg("parsing save game data ...", ts=True)
-
-                self.sd_cache = {}
-
-                self.sd_log['gameversion'] = self._sd('gameversion')  # do not use for comparsion
-                self.sd_log['playtime'] = self._sd('playtime')  # do not use for comparsion
-                self.sd_log['timeofday'] = self._sd('timeofday')  # do not use for comparsion
-                self.sd_log['elapseddays'] = self._sd('elapseddays')
-                self.sd_log['onlinebalance'] = self._sd('onlinebalance')
-                self.sd_log['networth'] = self._sd('networth')
-                self.sd_log['lifetimeearnings'] = self._sd('lifetimeearnings')
-                self.sd_log['rank'] = self._sd('rank')
-                self.sd_log['tier'] = self._sd('tier')
-                self.sd_log['xp'] = self._sd('xp')
-                self.sd_log['totalxp'] = self._sd('totalxp')
-                self.sd_log['discoveredproducts'] = self._sd('discoveredproducts')
-                self.sd_log['ownedvehicles'] = self._sd('ownedvehicles')
-
-                r: sqlite3.Cursor = cur.execute(
-                    '''
-                    SELECT elapseddays, onlinebalance, networth, lifetimeearnings, rank, tier, xp, totalxp, discoveredproducts, ownedvehicles
-                    FROM logs
-                    WHERE save_id = :save_id
-                    ORDER BY log_id DESC
-                    LIMIT 1;
-                    ''',
-                    self.sd_profile
-                )
-
-                dump: sqlite3.Row | None = r.fetchone()
-
-                previous: dict = dict(dump) if dump else {}
-                current: dict = self.sd_log.copy()
-                del current['gameversion']
-                del current['playtime']
-                del current['timeofday']
-
-                if dict(previous or {}) == current:
-                    Screen.msg("no changes detected", ts=True)
-                else:
-                    Screen.msg("changes detected", ts=True)
-                    cur.execute(
-                        '''
-                        INSERT INTO logs (log_time, save_id, gameversion, playtime, timeofday, elapseddays, onlinebalance, networth, lifetimeearnings, rank, tier, xp, totalxp, discoveredproducts, ownedvehicles)
-                        VALUES (:log_time, :save_id, :gameversion, :playtime, :timeofday, :elapseddays, :onlinebalance, :networth, :lifetimeearnings, :rank, :tier, :xp, :totalxp, :discoveredproducts, :ownedvehicles);
-                        ''',
-                        {
-                            'log_time': time.time(),
-                            **self.sd_profile,
-                            **self.sd_log,
-                        }
-                    )
-                    con.commit()
-
-                    self._export()
-
-                Screen.msg()
-                self._print_monitor_summary(previous=previous)
-                Screen.msg()
-
-                Screen.msg("next check in", sleep=self.args['check_interval'])
+                # wake up for the group commit if rows are pending
+                timeout: float | None = self.Database.commit_due_in()
+                if unsettled:
+                    timeout = Conf.sd_read_settle if timeout is None else min(timeout, Conf.sd_read_settle)
+                timeout = Conf.monitor_wait_slice if timeout is None else min(timeout, Conf.monitor_wait_slice)
+                changed_dirs: set[Path] = await asyncio.to_thread(self.Watcher.wait, timeout)
+                if changed_dirs or unsettled:
+                    return changed_dirs | unsettled
+                await self.DbStage.call(self._commit)
+
+        await self.DbStage.call(self._commit, True)
+
+        delay: float = self.args['check_interval']
+        if self.Scheduler:
+            delay = self.Scheduler.update(changed=any([save.Cache.changed for save in self.saves]))
+            self.Metrics.set('hylandbook_check_interval_seconds', delay)
+
+        # exports and the countdown go on while waiting
+        countdown: asyncio.Task | None = None
+        if not self.args['headless']:
+            countdown = asyncio.create_task(Screen.countdown("next check in", sleep=delay))
+        try:
+            await asyncio.sleep(delay)
         finally:
-            con.close()
+            if countdown:
+                countdown.cancel()
+                await asyncio.gather(countdown, return_exceptions=True)
+        return None
 
 
-    def _print_monitor_summary(self, previous: dict):
-        indent: int = max([len(k) for k in self.sd_log])
+    def _commit(self, force: bool = False) -> None:
+        start: float = time.perf_counter()
 
-        Screen.msg(f"{'organisation':>{indent}}  {self.sd_profile['organisation']}")
-        for k, v in self.sd_log.items():
+        if self.Database.commit(force=force):
+            self.Metrics.observe('hylandbook_stage_seconds', time.perf_counter() - start, stage='commit')
+            self.Metrics.inc('hylandbook_commits_total')
+
+
+    def _print_monitor_summary(self, save: hylandbook.savegame.SaveGame, previous: dict):
+        indent: int = max([len(k) for k in [*save.sd_log, *save.derived]])
+
+        Screen.msg(f"{'organisation':>{indent}}  {save.sd_profile['organisation']}")
+        for k, v in save.sd_log.items():
             Screen.msg(f"{k:>{indent}}", end='  ')
             if k in previous.keys() and previous.get(k) != v:
                 Screen.msg(f"{previous[k]} -> {v}")
             else:
                 Screen.msg(f"{v}")
 
+        if save.derived:
+            Screen.msg()
+        for k, v in save.derived.items():
+            Screen.msg(f"{k:>{indent}}  {'-' if v is None else v}")
 
-    def _sd(self, col: str, /) -> str | int | float | None:
-        default_organisation: str = ''
-        default_seed: int = 0
-        default_gameversion: str = ''
-        default_playtime: int = 0
-        default_timeofday: int = 0
-        default_elapseddays: int = 0
-        default_onlinebalance: float = 0
-        default_networth: float = 0
-        default_lifetimeearnings: float = 0
-        default_rank: int = 0
-        default_tier: int = 0
-        default_xp: int = 0
-        default_totalxp: int = 0
-        default_discoveredproducts: int = 0
-        default_ownedvehicles: int = 0
-
-        data: dict = {}
-
-        if col == 'organisation':
-            data = self._sd_data('Game.json')
-            if not data.get('OrganisationName'):
-                return default_organisation
-            return str(data['OrganisationName'])
-
-        if col == 'seed':
-            data = self._sd_data('Game.json')
-            if not data.get('Seed'):
-                return default_seed
-            return int(data['Seed'])
-
-        if col == 'gameversion':
-            data = self._sd_data('Game.json')
-            if not data.get('GameVersion'):
-                return default_gameversion
-            return str(data['GameVersion'])
-
-        if col == 'playtime':
-            data = self._sd_data('Time.json')
-            if not data.get('Playtime'):
-                return default_playtime
-            return int(data['Playtime'])
-
-        if col == 'timeofday':
-            data = self._sd_data('Time.json')
-            if not data.get('TimeOfDay'):
-                return default_timeofday
-            return int(data['TimeOfDay'])
-
-        if col == 'elapseddays':
-            data = self._sd_data('Time.json')
-            if not data.get('ElapsedDays'):
-                return default_elapseddays
-            return int(data['ElapsedDays'])
-
-        if col == 'onlinebalance':
-            data = self._sd_data('Money.json')
-            if not data.get('OnlineBalance'):
-                return default_onlinebalance
-            return float(data['OnlineBalance'])
-
-        if col == 'networth':
-            data = self._sd_data('Money.json')
-            if not data.get('Networth'):
-                return default_networth
-            return float(data['Networth'])
-
-        if col == 'lifetimeearnings':
-            data = self._sd_data('Money.json')
-            if not data.get('LifetimeEarnings'):
-                return default_lifetimeearnings
-            return float(data['LifetimeEarnings'])
-
-        if col == 'rank':
-            data = self._sd_data('Rank.json')
-            if not data.get('Rank'):
-                return default_rank
-            return int(data['Rank'])
-
-        if col == 'tier':
-            data = self._sd_data('Rank.json')
-            if not data.get('Tier'):
-                return default_tier
-            return int(data['Tier'])
-
-        if col == 'xp':
-            data = self._sd_data('Rank.json')
-            if not data.get('XP'):
-                return default_xp
-            return int(data['XP'])
-
-        if col == 'totalxp':
-            data = self._sd_data('Rank.json')
-            if not data.get('TotalXP'):
-                return default_totalxp
-            return int(data['TotalXP'])
-
-        if col == 'discoveredproducts':
-            data = self._sd_data('Products.json')
-            if not data.get('DiscoveredProducts'):
-                return default_discoveredproducts
-            return len(data['DiscoveredProducts'])
-
-        if col == 'ownedvehicles':
-            data = self._sd_data('OwnedVehicles.json')
-            if not data.get('Vehicles'):
-                return default_ownedvehicles
-            return len(data['Vehicles'])
-
-        return None
 
+    def _export(self, save: hylandbook.savegame.SaveGame, row: dict | None = None) -> None:
+        if len(self.Exporter.types) == 0:
+            return
 
-    def _sd_data(self, sd_file: str, /) -> dict:
-        if self.sd_cache.get(sd_file):
-            return self.sd_cache[sd_file]
+        # one set of files per save when monitoring several
+        suffix: str = '' if len(self.saves) == 1 else f"_{save.sd_profile['save_id']}"
 
-        file: Path = self.save_dir.joinpath(sd_file)
+        try:
+            with self.Metrics.time('hylandbook_stage_seconds', stage='export'):
+                self.Exporter.export(
+                    # queued exports bring the values of their tick
+                    row=row or {
+                        '_t': time.time(),
+                        **save.sd_profile,
+                        **save.sd_log,
+                        **save.derived,
+                    },
+                    suffix=suffix,
+                )
+        except OSError as e:
+            Screen.msg(f"[BOO] failed to write export: {e}")
 
-        if not file.is_file():
-            return {}
 
-        if Conf.sd_file_read_throttle > 0:
-            time.sleep(Conf.sd_file_read_throttle)
+    def _serve(self, save: hylandbook.savegame.SaveGame, changed: bool) -> None:
+        if not self.OverlayServer:
+            return
 
-        try:
-            data: dict = json.loads(s=file.read_text())
-            self.sd_cache[sd_file] = data
-        except json.JSONDecodeError as e:
-            Screen.msg(f"[BOO] failed to load '{sd_file}': {e}")
-            return {}
+        # unchanged saves only need their first snapshot
+        if not changed and save.sd_profile['save_id'] in self.OverlayServer.snapshots:
+            return
 
-        if not data:
-            return {}
+        row: dict = {'_t': time.time(), **save.sd_profile, **save.sd_log, **save.derived}
+        self.OverlayServer.publish(save_id=save.sd_profile['save_id'], row={k: row.get(k) for k in self.Exporter.keys})
 
-        return data
 
+    def _push(self, save: hylandbook.savegame.SaveGame, changed: bool) -> None:
+        # never waits, a sink with a full queue drops or coalesces the row
+        row: dict | None = None
+        for sink in self.Sinks:
+            if changed or save.sd_profile['save_id'] not in sink.seen:
+                row = row or {'_t': time.time(), **save.sd_profile, **save.sd_log, **save.derived}
+                sink.offer(save_id=save.sd_profile['save_id'], row=row)
 
-    def _export(self) -> None:
-        if len(self.args['export_types']) == 0:
-            return
 
-        current_data: dict = {
-            '_t': time.time(),
-            **self.sd_profile,
-            **self.sd_log,
-        }
-
-        file: Path | None = None
-        data: str | None = None
-
-        for t in self.args['export_types']:
-            if t == 'json':
-                file = self.data_dir.joinpath('current.json')
-                if 'all' in self.args['export_keys']:
-                    data = json.dumps(obj=current_data, indent=4)
-                else:
-                    dump: dict = {}
-                    for k in self.args['export_keys']:
-                        if current_data.get(k):
-                            dump[k] = current_data[k]
-                    data = json.dumps(obj=dump, indent=4)
-
-            if t == 'txt':
-                file = self.data_dir.joinpath('current.txt')
-                indent: int = 0
-                if 'all' in self.args['export_keys']:
-                    indent = max([len(k) for k in current_data])
-                    data = '\n'.join([f"{k:>{indent}}  {v}" for k, v in current_data.items()])
-                else:
-                    dump: dict = {}
-                    for k in self.args['export_keys']:
-                        if current_data.get(k):
-                            dump[k] = current_data[k]
-                    indent = max([len(k) for k in dump])
-                    data = '\n'.join([f"{k:>{indent}}  {v}" for k, v in dump.items()])
-
-            if file and data:
-                file.write_text(data)
-
-
-
-
-
-        # # history test
-        # con, cur = self.Database.connect()
-        # try:
-        #     r: sqlite3.Cursor = cur.execute(
-        #         '''
-        #         SELECT *
-        #         FROM logs
-        #         WHERE save_id = :save_id
-        #         ORDER BY log_id DESC
-        #         LIMIT 100;
-        #         ''',
-        #         self.sd_profile
-        #     )
-        #     dump: list[sqlite3.Row] | None = r.fetchall()
-        #     for row in dump:
-        #         print(type(row), dict(row))
-        # finally:
-        #     con.close()
+    def _close_sinks(self) -> None:
+        for sink in self.Sinks:
+            sink.close(timeout=Conf.sink_close_timeout)
+        self.Sinks = []
@@ -14,8 +14,8 @@ class Argparser:
             self.Parser.add_argument(*v['name_or_flags'], **v['setup'])
 
 
-    def parse(self) -> dict:
-        args: argparse.Namespace = self.Parser.parse_args()
+    def parse(self, args_list: list[str] | None = None) -> dict:
+        args: argparse.Namespace = self.Parser.parse_args(args_list)
         self.args = args.__dict__
         return self.args
 
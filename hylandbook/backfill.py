@@ -0,0 +1,125 @@
+import concurrent.futures
+import datetime
+import json
+import os
+import re
+import zipfile
+from pathlib import Path, PurePosixPath
+from typing import Iterator
+
+import hylandbook.extractor
+
+
+
+
+# per worker process, set up once by _init_worker()
+_profile_extractor: hylandbook.extractor.Extractor | None = None
+_log_extractor: hylandbook.extractor.Extractor | None = None
+_archives: dict[str, zipfile.ZipFile] = {}
+
+# the name the game gives a save game directory, copies are often renamed around it, e.g. 'SaveGame_1 (backup)'
+save_dir_pattern: re.Pattern = re.compile(r'SaveGame_\d+')
+
+
+
+
+def _init_worker(profile_fields: dict[str, list[dict]], log_fields: dict[str, list[dict]]) -> None:
+    global _profile_extractor, _log_extractor
+    _profile_extractor = hylandbook.extractor.Extractor(fields=profile_fields)
+    _log_extractor = hylandbook.extractor.Extractor(fields=log_fields)
+
+
+def _save_dir(source: str, inner: str) -> str:
+    # the game's directory name from the closest part of the path that has one, monitoring logs the save under that name
+    parts: tuple[str, ...] = (*Path(source).parent.parts, Path(source).stem, *PurePosixPath(inner).parts) if inner else Path(source).parts
+
+    for part in reversed(parts):
+        found: re.Match | None = save_dir_pattern.search(part)
+        if found:
+            return found.group(0)
+
+    return (PurePosixPath(inner).name or Path(source).stem) if inner else Path(source).name
+
+
+def _read_snapshot(snapshot: tuple[str, str]) -> dict:
+    source, inner = snapshot
+    errors: list[str] = []
+    mtimes: list[float] = []
+    loaded: dict[str, dict] = {}
+
+    def load(sd_file: str) -> dict:
+        if sd_file not in loaded:
+            loaded[sd_file] = read(sd_file)
+        return loaded[sd_file]
+
+    def read(sd_file: str) -> dict:
+        try:
+            if not inner:
+                file: Path = Path(source, sd_file)
+                mtimes.append(file.stat().st_mtime)
+                return json.loads(file.read_bytes()) or {}
+
+            archive: zipfile.ZipFile | None = _archives.get(source)
+            if archive is None:
+                archive = _archives[source] = zipfile.ZipFile(source)
+            info: zipfile.ZipInfo = archive.getinfo(str(PurePosixPath(inner, sd_file)))
+            mtimes.append(datetime.datetime(*info.date_time).timestamp())
+            return json.loads(archive.read(info)) or {}
+        except (KeyError, FileNotFoundError):
+            errors.append(f"missing '{sd_file}'")
+        except (OSError, zipfile.BadZipFile, json.JSONDecodeError) as e:
+            errors.append(f"failed to load '{sd_file}': {e}")
+        return {}
+
+    assert _profile_extractor is not None and _log_extractor is not None, "_init_worker() was not run in this process"
+
+    profile: dict = _profile_extractor.extract(load)
+    log: dict = _log_extractor.extract(load)
+
+    return {
+        'source': f"{source}:{inner}" if inner else source,
+        'save_dir': _save_dir(source, inner),
+        'log_time': max(mtimes, default=0),
+        'profile': profile,
+        'log': log,
+        'errors': errors,
+    }
+
+
+
+
+class Backfill:
+    jobs: int
+
+
+    def __init__(self, jobs: int | None = None) -> None:
+        self.jobs = jobs or os.cpu_count() or 1
+
+
+    @staticmethod
+    def find(path: Path) -> list[tuple[str, str]]:
+        # (directory, '') or (zip archive, directory inside it) of every save game snapshot below path
+        snapshots: list[tuple[str, str]] = []
+
+        if path.is_file() and zipfile.is_zipfile(path):
+            with zipfile.ZipFile(path) as archive:
+                for name in archive.namelist():
+                    p: PurePosixPath = PurePosixPath(name)
+                    if p.name == 'Game.json':
+                        snapshots.append((str(path), str(p.parent)))
+            return sorted(snapshots)
+
+        for dir, _, files in os.walk(path):
+            if 'Game.json' in files:
+                snapshots.append((dir, ''))
+            for f in files:
+                if f.lower().endswith('.zip') and zipfile.is_zipfile(os.path.join(dir, f)):
+                    snapshots.extend(Backfill.find(Path(dir, f)))
+
+        return sorted(snapshots)
+
+
+    def read(self, snapshots: list[tuple[str, str]], profile_fields: dict[str, list[dict]], log_fields: dict[str, list[dict]]) -> Iterator[dict]:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=self.jobs, initializer=_init_worker, initargs=(profile_fields, log_fields)) as pool:
+            # big enough chunks that process round trips don't dominate, small enough to keep all workers busy
+            yield from pool.map(_read_snapshot, snapshots, chunksize=max(1, len(snapshots) // (self.jobs * 8)))
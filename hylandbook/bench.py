@@ -0,0 +1,74 @@
+import contextlib
+import json
+import platform
+import sqlite3
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Iterator
+
+
+
+
+class Benchmark:
+    timings: dict[str, list[float]]
+
+
+    def __init__(self) -> None:
+        self.timings = {}
+
+
+    @contextlib.contextmanager
+    def time(self, stage: str) -> Iterator[None]:
+        start: float = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings.setdefault(stage, []).append(time.perf_counter() - start)
+
+
+    def summary(self) -> dict[str, dict]:
+        summary: dict[str, dict] = {}
+
+        for stage, t in self.timings.items():
+            ordered: list[float] = sorted(t)
+            summary[stage] = {
+                'n': len(t),
+                'total': sum(t),
+                'mean': statistics.fmean(t),
+                'p50': ordered[len(t) // 2],
+                'p95': ordered[min(len(t) - 1, int(len(t) * 0.95))],
+                'max': ordered[-1],
+            }
+
+        return summary
+
+
+    def write(self, file: Path, params: dict) -> dict:
+        result: dict = {
+            'time': time.time(),
+            'python': sys.version.split()[0],
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'params': params,
+            'stages': self.summary(),
+        }
+
+        file.write_text(json.dumps(result, indent=4), encoding='utf-8')
+
+        return result
+
+
+    @staticmethod
+    def compare(result: dict, baseline: dict, max_regression: float) -> dict[str, tuple[float, float, bool]]:
+        # stage -> (baseline mean, mean, regressed), stages missing on either side are left out
+        compared: dict[str, tuple[float, float, bool]] = {}
+
+        for stage, s in result['stages'].items():
+            if stage not in baseline.get('stages', {}):
+                continue
+            base: float = baseline['stages'][stage]['mean']
+            compared[stage] = (base, s['mean'], base > 0 and s['mean'] > base * (1 + max_regression))
+
+        return compared
@@ -0,0 +1,136 @@
+import hashlib
+import json
+import os
+import stat
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable
+
+
+
+
+class SaveDataCache:
+    max_entries: int
+    # counted in bytes of the source files, parsed they take a few times as much memory
+    max_file_bytes: int
+    verify_hash: bool
+    read_throttle: float
+
+    entries: OrderedDict[Path, dict]
+    size: int = 0
+    # the files of one save are read at the same time, only the bookkeeping is locked, not reading and parsing
+    lock: threading.Lock
+
+    hits: int = 0
+    misses: int = 0
+    reads: int = 0
+    bytes_read: int = 0
+    changed: bool = False
+
+
+    def __init__(self, max_entries: int, max_file_bytes: int, verify_hash: bool = False, read_throttle: float = 0) -> None:
+        self.max_entries = max_entries
+        self.max_file_bytes = max_file_bytes
+        self.verify_hash = verify_hash
+        self.read_throttle = read_throttle
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+
+    def start_tick(self) -> None:
+        self.changed = False
+
+
+    def get(self, file: Path, scan: Callable[[Path], dict] | None = None) -> dict:
+        try:
+            st: os.stat_result = file.stat()
+        except OSError:
+            with self.lock:
+                self._drop(file)
+            return {}
+
+        if not stat.S_ISREG(st.st_mode):
+            with self.lock:
+                self._drop(file)
+            return {}
+
+        fingerprint: tuple[int, int] = (st.st_mtime_ns, st.st_size)
+
+        with self.lock:
+            entry: dict | None = self.entries.get(file)
+
+            if entry and entry['fingerprint'] == fingerprint:
+                self.entries.move_to_end(file)
+                self.hits += 1
+                return entry['data']
+
+        if self.read_throttle > 0:
+            time.sleep(self.read_throttle)
+
+        # streamed files are never held in memory as a whole, cache only the scan result
+        if scan:
+            data: dict = scan(file)
+            with self.lock:
+                self.misses += 1
+                self.reads += 1
+                self.bytes_read += st.st_size
+                self.changed = True
+                self._drop(file)
+                self.entries[file] = {
+                    'fingerprint': fingerprint,
+                    'digest': None,
+                    'size': 0,
+                    'data': data,
+                }
+                self._evict()
+            return data
+
+        raw: bytes = file.read_bytes()
+        digest: bytes | None = hashlib.blake2b(raw, digest_size=16).digest() if self.verify_hash else None
+
+        with self.lock:
+            self.reads += 1
+            self.bytes_read += len(raw)
+
+            # rewritten with identical content, e.g. a manual save without progress
+            if entry and digest is not None and entry['digest'] == digest:
+                entry['fingerprint'] = fingerprint
+                if file in self.entries:
+                    self.entries.move_to_end(file)
+                self.hits += 1
+                return entry['data']
+
+        data: dict = json.loads(raw) or {}
+
+        with self.lock:
+            self.misses += 1
+            self.changed = True
+            self._drop(file)
+
+            if len(raw) <= self.max_file_bytes:
+                self.entries[file] = {
+                    'fingerprint': fingerprint,
+                    'digest': digest,
+                    'size': len(raw),
+                    'data': data,
+                }
+                self.size += len(raw)
+                self._evict()
+
+        return data
+
+
+    def _evict(self) -> None:
+        while len(self.entries) > self.max_entries or self.size > self.max_file_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.size -= evicted['size']
+
+
+    def _drop(self, file: Path) -> None:
+        entry: dict | None = self.entries.pop(file, None)
+
+        if entry:
+            self.size -= entry['size']
+            self.changed = True
@@ -0,0 +1,135 @@
+import json
+import tempfile
+import time
+from pathlib import Path
+
+import hylandbook.bench
+import hylandbook.command
+import hylandbook.conf
+import hylandbook.export
+import hylandbook.screen
+import hylandbook.synthetic
+
+
+
+
+Conf = hylandbook.conf.Conf()
+Screen = hylandbook.screen.Screen()
+
+
+
+
+class BenchCommand(hylandbook.command.Command):
+    Exporter: hylandbook.export.Exporter
+
+
+    def run(self) -> int:
+        output: Path = Path(self.args['output']).resolve()
+        baseline: dict | None = None
+
+        if self.args['baseline']:
+            try:
+                baseline = json.loads(Path(self.args['baseline']).read_text(encoding='utf-8'))
+            except (OSError, json.JSONDecodeError) as e:
+                Screen.msg(f"[BOO] failed to load baseline: {e}")
+                return 1
+
+        Generator = hylandbook.synthetic.SaveGenerator(seed=self.args['seed'], products=self.args['products'], vehicles=self.args['vehicles'])
+        Bench = hylandbook.bench.Benchmark()
+
+        Screen.msg(Conf.app_banner, end="\n\n")
+
+        with tempfile.TemporaryDirectory(prefix='hb_bench_') as tmp:
+            self.save_dirs = Generator.create_saves(path=Path(tmp, 'Saves'), slots=self.args['slots'])
+            self.data_dir = Path(tmp, 'data')
+            self.data_dir.mkdir()
+            self.db_file = self.data_dir.joinpath(Conf.db_file_name)
+
+            if not self._init_db():
+                return 2
+
+            self.Exporter = hylandbook.export.Exporter(
+                data_dir=self.data_dir,
+                types=Conf.export_types_choices,
+                keys=Conf.default_export_keys,
+                all_keys=Conf.export_keys_choices,
+            )
+
+            if not self._init_sd_profiles():
+                return 3
+
+            # the generator has written every file before a tick starts
+            for save in self.saves:
+                save.settle = 0
+
+            Screen.msg(f"running {self.args['ticks']} ticks on {len(self.saves)} save games ...", start="\n")
+
+            self.Database.open()
+            try:
+                for _ in range(self.args['ticks']):
+                    for save in self.saves:
+                        Generator.advance(save.save_dir)
+
+                    with Bench.time('tick'):
+                        for save in self.saves:
+                            # same steps as a monitor tick, parsing first so extraction is timed on its own
+                            with Bench.time('parse'):
+                                for sd_file, _, targets in self.SdLogExtractor.plan:
+                                    if targets is not None:
+                                        save.sd_scan(sd_file, targets)
+                                    else:
+                                        save.sd_data(sd_file)
+
+                            # what read_log() does around the extraction, the files are parsed already
+                            with Bench.time('cache'):
+                                save.Cache.start_tick()
+                                before: list[tuple[int, int] | None] = save._fingerprints(save._log_files())
+                                loaded: dict[str, dict] = {sd_file: save._load(sd_file, targets) for sd_file, _, targets in self.SdLogExtractor.plan}
+                                save.consistent = save._fingerprints(save._log_files()) == before
+
+                            with Bench.time('extract'):
+                                save.sd_log = self.SdLogExtractor.extract(lambda sd_file: loaded[sd_file], lambda sd_file, targets: loaded[sd_file])
+
+                            with Bench.time('compare'):
+                                current: dict = {col: save.sd_log[col] for col in self.SdLogExtractor.compare_columns}
+                                changed: bool = save.last_log != current
+
+                            if changed:
+                                with Bench.time('insert'):
+                                    self.Database.write(self.insert_log_sql, {'log_time': time.time(), **save.sd_profile, **save.sd_log}).fetchone()
+                                save.last_log = current
+
+                                with Bench.time('derive'):
+                                    self.Derived.append(save_id=save.sd_profile['save_id'], row={'_t': time.time(), **save.sd_log})
+                                    self._derive(save)
+
+                                with Bench.time('export'):
+                                    self.Exporter.export(
+                                        row={'_t': time.time(), **save.sd_profile, **save.sd_log, **save.derived},
+                                        suffix='' if len(self.saves) == 1 else f"_{save.sd_profile['save_id']}",
+                                    )
+
+                        with Bench.time('commit'):
+                            self.Database.commit(force=True)
+            finally:
+                self.Database.close()
+
+        result: dict = Bench.write(file=output, params={k: self.args[k] for k in ('ticks', 'slots', 'products', 'vehicles', 'seed')})
+
+        Screen.msg(f"{'stage':>8}  {'n':>6}  {'mean ms':>9}  {'p95 ms':>9}  {'max ms':>9}", start="\n")
+        for stage, s in result['stages'].items():
+            Screen.msg(f"{stage:>8}  {s['n']:>6}  {s['mean'] * 1000:>9.3f}  {s['p95'] * 1000:>9.3f}  {s['max'] * 1000:>9.3f}")
+
+        Screen.msg(f"results written to: {output}", start="\n")
+
+        if not baseline:
+            return 0
+
+        regressed: bool = False
+
+        Screen.msg(f"compared with: {self.args['baseline']}", start="\n", end="\n\n")
+        for stage, (base, mean, slower) in hylandbook.bench.Benchmark.compare(result=result, baseline=baseline, max_regression=Conf.bench_max_regression).items():
+            regressed = regressed or slower
+            Screen.msg(f"{stage:>8}  {base * 1000:>9.3f} -> {mean * 1000:>9.3f} ms  {mean / base if base else 0:>5.2f}x{'  [BOO] slower' if slower else ''}")
+
+        return 1 if regressed else 0
@@ -0,0 +1,63 @@
+import sqlite3
+from pathlib import Path
+
+import hylandbook.command
+import hylandbook.conf
+import hylandbook.retention
+import hylandbook.screen
+import hylandbook.snapshots
+
+
+
+
+Conf = hylandbook.conf.Conf()
+Screen = hylandbook.screen.Screen()
+
+
+
+
+class CompactCommand(hylandbook.command.Command):
+    def run(self) -> int:
+        self.data_dir = Path(self.args['data_dir']).resolve()
+        self.db_file = self.data_dir.joinpath(Conf.db_file_name)
+        into: Path | None = Path(self.args['into']).resolve() if self.args['into'] else None
+
+        if not self.db_file.is_file():
+            Screen.msg(f"[BOO] database file does not exist: {self.db_file}")
+            return 1
+
+        if into and into.exists():
+            Screen.msg(f"[BOO] file already exists: {into}")
+            return 1
+
+        Screen.msg(Conf.app_banner, end="\n\n")
+
+        if not self._init_db():
+            return 2
+
+        size: int = self.db_file.stat().st_size
+
+        try:
+            if self.args['retention']:
+                Screen.msg("applying retention ...")
+                Retention: hylandbook.retention.Retention = self._new_retention()
+                while True:
+                    Retention.run(budget=1)
+                    if Retention.caught_up:
+                        break
+                Screen.msg(f"{Retention.deleted} old log rows removed")
+
+            deleted: int = hylandbook.snapshots.SnapshotStore(database=self.Database).collect_garbage()
+            if deleted:
+                Screen.msg(f"{deleted} unused snapshot blobs removed")
+            self.Database.close()
+
+            Screen.msg("compacting database ...")
+            self.Database.vacuum(into=into, auto_vacuum=None if into else Conf.db_auto_vacuum)
+        except sqlite3.OperationalError as e:
+            Screen.msg(f"[BOO] failed to compact database: {e}")
+            return 2
+
+        Screen.msg(f"{into or self.db_file}: {size / 1024:.0f} KiB -> {(into or self.db_file).stat().st_size / 1024:.0f} KiB")
+
+        return 0
@@ -0,0 +1,103 @@
+import datetime
+import gzip
+import sqlite3
+import sys
+from pathlib import Path
+
+import hylandbook.command
+import hylandbook.conf
+import hylandbook.database
+import hylandbook.history
+import hylandbook.screen
+
+
+
+
+Conf = hylandbook.conf.Conf()
+Screen = hylandbook.screen.Screen()
+
+
+
+
+class ExportHistoryCommand(hylandbook.command.Command):
+    def run(self) -> int:
+        self.data_dir = Path(self.args['data_dir']).resolve()
+        self.db_file = self.data_dir.joinpath(Conf.db_file_name)
+        format: str = self.args['format']
+        to_stdout: bool = self.args['output'] == '-'
+        compress: bool = self.args['gzip'] or self.args['output'].lower().endswith('.gz')
+
+        if not self.db_file.is_file():
+            Screen.msg(f"[BOO] database file does not exist: {self.db_file}")
+            return 1
+
+        if format == 'sqlite' and (to_stdout or compress):
+            Screen.msg("[BOO] sqlite can only be written to an uncompressed file")
+            return 1
+
+        output: Path | None = None if to_stdout else Path(self.args['output']).resolve()
+
+        if output and output.exists():
+            Screen.msg(f"[BOO] file already exists: {output}")
+            return 1
+
+        since_until: list[float | None] = []
+        for arg in ('since', 'until'):
+            value: str | None = self.args[arg]
+            try:
+                since_until.append(None if value is None else float(value))
+            except ValueError:
+                try:
+                    since_until.append(datetime.datetime.fromisoformat(value).timestamp())
+                except ValueError:
+                    Screen.msg(f"[BOO] invalid --{arg} time: {value}")
+                    return 1
+        since, until = since_until
+
+        self.Database = hylandbook.database.DatabaseSQLite(file=self.db_file)
+        History = hylandbook.history.HistoryExport(database=self.Database, fetch_size=Conf.export_history_fetch_size)
+
+        try:
+            available: list[str] = History.columns()
+        except sqlite3.OperationalError as e:
+            Screen.msg(f"[BOO] failed to read database: {e}")
+            return 2
+
+        columns: list[str] = list(dict.fromkeys(self.args['columns'])) or available
+        unknown: list[str] = [c for c in columns if c not in available]
+
+        if unknown:
+            Screen.msg(f"[BOO] unknown columns: {' '.join(unknown)}, available: {' '.join(available)}")
+            return 1
+
+        filters: dict = {
+            'columns': columns,
+            'save_ids': list(dict.fromkeys(self.args['save_id'])),
+            'since': since,
+            'until': until,
+        }
+
+        try:
+            if format == 'sqlite':
+                rows: int = History.attach(file=output, **filters)
+            elif to_stdout:
+                out = gzip.GzipFile(fileobj=sys.stdout.buffer, mode='wb', compresslevel=Conf.export_history_gzip_level) if compress else sys.stdout.buffer
+                rows: int = History.write(out=out, format=format, **filters)
+                out.flush()
+                if compress:
+                    out.close()
+            else:
+                with open(output, 'xb', buffering=Conf.export_history_buffer_size) as raw:
+                    if compress:
+                        with gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=Conf.export_history_gzip_level) as out:
+                            rows: int = History.write(out=out, format=format, **filters)
+                    else:
+                        rows: int = History.write(out=raw, format=format, **filters)
+        except (OSError, sqlite3.OperationalError) as e:
+            Screen.msg(f"[BOO] failed to export history: {e}")
+            return 2
+
+        if output:
+            Screen.msg(f"{rows} rows written to: {output}")
+
+        return 0
@@ -0,0 +1,31 @@
+from pathlib import Path
+
+import hylandbook.command
+import hylandbook.conf
+import hylandbook.screen
+import hylandbook.synthetic
+
+
+
+
+Conf = hylandbook.conf.Conf()
+Screen = hylandbook.screen.Screen()
+
+
+
+
+class GenerateCommand(hylandbook.command.Command):
+    def run(self) -> int:
+        path: Path = Path(self.args['path']).resolve()
+
+        Generator = hylandbook.synthetic.SaveGenerator(seed=self.args['seed'], products=self.args['products'], vehicles=self.args['vehicles'])
+
+        try:
+            save_dirs: list[Path] = Generator.create_saves(path=path, slots=self.args['slots'])
+        except OSError as e:
+            Screen.msg(f"[BOO] failed to write save games: {e}")
+            return 1
+
+        Screen.msg(f"{len(save_dirs)} save games written to: {path}")
+
+        return 0
@@ -0,0 +1,149 @@
+import sqlite3
+import time
+from pathlib import Path
+
+import hylandbook.backfill
+import hylandbook.command
+import hylandbook.conf
+import hylandbook.retention
+import hylandbook.screen
+
+
+
+
+Conf = hylandbook.conf.Conf()
+Screen = hylandbook.screen.Screen()
+
+
+
+
+class ImportCommand(hylandbook.command.Command):
+    import_log_sql: str
+
+
+    def __init__(self, args: dict | None = None) -> None:
+        super().__init__(args=args)
+
+        # like a live row, an imported row is only kept if its state differs from the rows next to it in time,
+        # a state the save returned to later is logged again
+        same_state: str = ' AND '.join(f'{col} IS :{col}' for col in self.SdLogExtractor.compare_columns)
+        self.import_log_sql = f'''
+            INSERT INTO logs (log_time, save_id, {', '.join(self.SdLogExtractor.columns)})
+            SELECT :log_time, :save_id, {', '.join(f':{col}' for col in self.SdLogExtractor.columns)}
+            WHERE
+                NOT EXISTS (
+                    SELECT 1
+                    FROM (SELECT * FROM logs WHERE save_id = :save_id AND log_time < :log_time ORDER BY log_time DESC LIMIT 1)
+                    WHERE {same_state}
+                )
+                AND NOT EXISTS (
+                    SELECT 1
+                    FROM (SELECT * FROM logs WHERE save_id = :save_id AND log_time > :log_time ORDER BY log_time LIMIT 1)
+                    WHERE {same_state}
+                )
+            ON CONFLICT (save_id, log_time) DO NOTHING;
+        '''
+
+
+    def run(self) -> int:
+        self.data_dir = Path(self.args['data_dir']).resolve()
+        self.db_file = self.data_dir.joinpath(Conf.db_file_name)
+
+        Screen.msg(Conf.app_banner, end="\n\n")
+
+        snapshots: list[tuple[str, str]] = []
+
+        for p in self.args['paths']:
+            path: Path = Path(p).resolve()
+
+            if not path.exists():
+                Screen.msg(f"[BOO] path does not exist: {path}")
+                return 1
+
+            found: list[tuple[str, str]] = hylandbook.backfill.Backfill.find(path)
+            Screen.msg(f"{len(found)} snapshots found in: {path}")
+            snapshots.extend([s for s in found if s not in snapshots])
+
+        if not snapshots:
+            Screen.msg("[BOO] no save game snapshots found")
+            return 1
+
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+
+        if not self._init_db():
+            return 2
+
+        Backfill = hylandbook.backfill.Backfill(jobs=self.args['jobs'])
+
+        Screen.msg(f"reading {len(snapshots)} snapshots with {Backfill.jobs} processes ...")
+
+        start: float = time.perf_counter()
+        by_save: dict[tuple, list[dict]] = {}
+        skipped: int = 0
+
+        for snapshot in Backfill.read(snapshots=snapshots, profile_fields=Conf.sd_profile_fields, log_fields=Conf.sd_log_fields):
+            for e in snapshot['errors']:
+                Screen.msg(f"[BOO] {snapshot['source']}: {e}")
+
+            profile: dict = {'save_dir': snapshot['save_dir'], **snapshot['profile']}
+
+            if not profile['organisation'] or not profile['seed'] or not snapshot['log_time']:
+                skipped += 1
+                continue
+
+            # copies of one save game can sit in differently named directories
+            by_save.setdefault((profile['organisation'], profile['seed']), []).append({
+                'log_time': snapshot['log_time'],
+                **profile,
+                **snapshot['log'],
+            })
+
+        Screen.msg(f"read in {time.perf_counter() - start:.2f}s, {skipped} incomplete snapshots skipped")
+
+        imported: int = 0
+        duplicates: int = 0
+
+        con, cur = self.Database.open()
+        try:
+            for (organisation, seed), rows in by_save.items():
+                # rows go to the save game logged last with this organisation and seed, whatever directory the copies were in
+                existing: sqlite3.Row | None = cur.execute(
+                    'SELECT save_id, save_dir FROM saves WHERE organisation = ? AND seed = ? ORDER BY save_id DESC LIMIT 1;',
+                    (organisation, seed),
+                ).fetchone()
+
+                if existing:
+                    save_id, save_dir = (existing['save_id'], existing['save_dir'])
+                else:
+                    save_id, created = self._upsert_save(con=con, cur=cur, sd_profile=rows[0])
+                    save_dir = rows[0]['save_dir']
+                    if created:
+                        Screen.msg(f"{save_dir}: new save profile created")
+
+                # in time order, each row is compared with the ones logged or imported right before and after it
+                rows.sort(key=lambda r: r['log_time'])
+                for row in rows:
+                    row['save_id'] = save_id
+
+                new: int = 0
+                for i in range(0, len(rows), Conf.import_batch_size):
+                    new += self.Database.write_many(self.import_log_sql, rows[i:i + Conf.import_batch_size]).rowcount
+                    self.Database.commit(force=True)
+
+                if new:
+                    # older than what --retention has thinned out already
+                    hylandbook.retention.Retention.rewind(database=self.Database, log_time=rows[0]['log_time'])
+                    self.Database.commit(force=True)
+
+                imported += new
+                duplicates += len(rows) - new
+                Screen.msg(f"{save_dir}: {new} rows imported")
+        except sqlite3.OperationalError as e:
+            Screen.msg(f"[BOO] failed to write database: {e}")
+            return 2
+        finally:
+            self.Database.close()
+
+        Screen.msg(f"{imported} rows imported, {duplicates} duplicates skipped, {time.perf_counter() - start:.2f}s")
+
+        return 0
@@ -0,0 +1,47 @@
+import sqlite3
+import time
+from pathlib import Path
+
+import hylandbook.command
+import hylandbook.conf
+import hylandbook.screen
+
+
+
+
+Conf = hylandbook.conf.Conf()
+Screen = hylandbook.screen.Screen()
+
+
+
+
+class RebuildRollupsCommand(hylandbook.command.Command):
+    def run(self) -> int:
+        self.data_dir = Path(self.args['data_dir']).resolve()
+        self.db_file = self.data_dir.joinpath(Conf.db_file_name)
+
+        if not self.db_file.is_file():
+            Screen.msg(f"[BOO] database file does not exist: {self.db_file}")
+            return 1
+
+        Screen.msg(Conf.app_banner, end="\n\n")
+
+        if not self._init_db():
+            return 2
+
+        Screen.msg("rebuilding per day and per session summaries ...")
+        start: float = time.perf_counter()
+
+        try:
+            self.Database.run_script(Conf.db_rollups_rebuild)
+            days: int = self.Database.execute('SELECT COUNT(*) FROM days;').fetchone()[0]
+            sessions: int = self.Database.execute('SELECT COUNT(*) FROM sessions;').fetchone()[0]
+        except sqlite3.OperationalError as e:
+            Screen.msg(f"[BOO] failed to rebuild summaries: {e}")
+            return 2
+        finally:
+            self.Database.close()
+
+        Screen.msg(f"{days} days and {sessions} sessions in {time.perf_counter() - start:.1f}s")
+
+        return 0
@@ -0,0 +1,47 @@
+import sqlite3
+from pathlib import Path
+
+import hylandbook.command
+import hylandbook.conf
+import hylandbook.screen
+import hylandbook.snapshots
+
+
+
+
+Conf = hylandbook.conf.Conf()
+Screen = hylandbook.screen.Screen()
+
+
+
+
+class RestoreCommand(hylandbook.command.Command):
+    def run(self) -> int:
+        self.data_dir = Path(self.args['data_dir']).resolve()
+        self.db_file = self.data_dir.joinpath(Conf.db_file_name)
+        dest: Path = Path(self.args['dest']).resolve()
+
+        if not self.db_file.is_file():
+            Screen.msg(f"[BOO] database file does not exist: {self.db_file}")
+            return 1
+
+        if dest.exists():
+            Screen.msg(f"[BOO] directory already exists: {dest}")
+            return 1
+
+        if not self._init_db():
+            return 2
+
+        try:
+            restored: list[Path] = hylandbook.snapshots.SnapshotStore(database=self.Database, cache_size=Conf.snapshot_keyframe_cache_size).restore(log_id=self.args['log_id'], dest=dest)
+        except (OSError, sqlite3.OperationalError) as e:
+            Screen.msg(f"[BOO] failed to restore snapshot: {e}")
+            return 2
+
+        if not restored:
+            Screen.msg(f"[BOO] no snapshot stored for log_id {self.args['log_id']}")
+            return 1
+
+        Screen.msg(f"{len(restored)} save files of log_id {self.args['log_id']} written to: {dest}")
+
+        return 0
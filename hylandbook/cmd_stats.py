@@ -0,0 +1,116 @@
+import csv
+import sqlite3
+import sys
+from pathlib import Path
+
+import hylandbook.command
+import hylandbook.conf
+import hylandbook.database
+import hylandbook.savegame
+import hylandbook.screen
+import hylandbook.stats
+
+
+
+
+Conf = hylandbook.conf.Conf()
+Screen = hylandbook.screen.Screen()
+
+
+
+
+class StatsCommand(hylandbook.command.Command):
+    def run(self) -> int:
+        self.data_dir = Path(self.args['data_dir']).resolve()
+        self.db_file = self.data_dir.joinpath(Conf.db_file_name)
+
+        if not self.db_file.is_file():
+            Screen.msg(f"[BOO] database file does not exist: {self.db_file}")
+            return 1
+
+        self.Database = hylandbook.database.DatabaseSQLite(file=self.db_file)
+        save_ids: list[int] = list(dict.fromkeys(self.args['save_id']))
+
+        # the per day and per session reports need the summary tables
+        try:
+            for v in self.Database.upgrade(migrations=Conf.db_migrations):
+                if self.args['format'] == 'table':
+                    Screen.msg(f"database schema upgraded to version {v}")
+        except sqlite3.OperationalError as e:
+            Screen.msg(f"[BOO] failed to upgrade database schema: {e}")
+            return 2
+
+        save_dirs: list[Path] | None = self._find_save_dirs(self.args['save_dirs'])
+
+        if save_dirs is None:
+            return 1
+
+        con, cur = self.Database.connect()
+        try:
+            for save_dir in save_dirs:
+                save: hylandbook.savegame.SaveGame = self._new_save(save_dir=save_dir)
+                save_id: int | None = self._find_save_id(cur=cur, sd_profile=save.read_profile())
+
+                if not save_id:
+                    Screen.msg(f"[BOO] {save_dir.name}: no save profile found in the database")
+                    return 1
+
+                if save_id not in save_ids:
+                    save_ids.append(save_id)
+
+            if not save_ids and not save_dirs:
+                save_ids = [row['save_id'] for row in cur.execute('SELECT save_id FROM saves ORDER BY save_id;')]
+
+            saves: dict[int, sqlite3.Row] = {
+                row['save_id']: row for row in cur.execute(
+                    f"SELECT save_id, save_dir, organisation FROM saves WHERE save_id IN ({', '.join(['?'] * len(save_ids))});",
+                    save_ids,
+                )
+            }
+        except sqlite3.OperationalError as e:
+            Screen.msg(f"[BOO] failed to read database: {e}")
+            return 2
+        finally:
+            con.close()
+
+        missing: list[int] = [save_id for save_id in save_ids if save_id not in saves]
+
+        if missing:
+            Screen.msg(f"[BOO] save_id not found in the database: {' '.join(map(str, missing))}")
+            return 1
+
+        Stats = hylandbook.stats.Stats(database=self.Database, fetch_size=Conf.stats_fetch_size)
+
+        if self.args['format'] == 'table':
+            Screen.msg(Conf.app_banner, end="\n\n")
+
+        writer = csv.writer(sys.stdout, lineterminator='\n')
+
+        try:
+            for save_id in save_ids:
+                for report in dict.fromkeys(self.args['reports']):
+                    columns, rows = Stats.run(report=report, save_id=save_id)
+
+                    if self.args['format'] == 'csv':
+                        writer.writerow(['save_id', 'report', *columns])
+                        writer.writerows([save_id, report, *row] for row in rows)
+                        continue
+
+                    Screen.msg(f"{saves[save_id]['save_dir']} ({saves[save_id]['organisation']}), save_id {save_id}: {Stats.reports[report]['title']}", end="\n\n")
+                    widths: list[int] = [max(len(col), Conf.stats_column_width) for col in columns]
+                    Screen.msg('  '.join([f"{col:>{w}}" for col, w in zip(columns, widths)]))
+
+                    empty: bool = True
+                    for row in rows:
+                        empty = False
+                        Screen.msg('  '.join([f"{'-' if v is None else v:>{w}}" for v, w in zip(row, widths)]))
+
+                    if empty:
+                        Screen.msg("no data yet")
+
+                    Screen.msg()
+        except sqlite3.OperationalError as e:
+            Screen.msg(f"[BOO] failed to read database: {e}")
+            return 2
+
+        return 0
@@ -0,0 +1,305 @@
+import abc
+import sqlite3
+import time
+from pathlib import Path
+
+import hylandbook.cache
+import hylandbook.conf
+import hylandbook.database
+import hylandbook.derived
+import hylandbook.extractor
+import hylandbook.jsonstream
+import hylandbook.retention
+import hylandbook.savegame
+import hylandbook.screen
+
+
+
+
+Conf = hylandbook.conf.Conf()
+Screen = hylandbook.screen.Screen()
+
+
+
+
+class Command(abc.ABC):
+    # what monitoring and the other commands share: the database, the save game profiles and how they are read
+    SdProfileExtractor: hylandbook.extractor.Extractor
+    SdLogExtractor: hylandbook.extractor.Extractor
+    JsonStream: hylandbook.jsonstream.JsonStream
+    Database: hylandbook.database.DatabaseSQLite
+    Derived: hylandbook.derived.DerivedMetrics
+
+    args: dict
+
+    save_dirs: list[Path]
+    data_dir: Path
+    db_file: Path
+
+    saves: list[hylandbook.savegame.SaveGame]
+
+    select_last_log_sql: str
+    select_history_sql: str
+    insert_log_sql: str
+
+
+    def __init__(self, args: dict | None = None) -> None:
+        self.args = args or {}
+        self.SdProfileExtractor = hylandbook.extractor.Extractor(fields=Conf.sd_profile_fields, stream_files=Conf.sd_stream_files)
+        self.SdLogExtractor = hylandbook.extractor.Extractor(fields=Conf.sd_log_fields, stream_files=Conf.sd_stream_files)
+        self.JsonStream = hylandbook.jsonstream.JsonStream(chunk_size=Conf.sd_stream_chunk_size)
+        self.Derived = hylandbook.derived.DerivedMetrics(
+            names=Conf.derived_metrics,
+            history_window=Conf.derived_history_window,
+            history_rows=Conf.derived_history_rows,
+            session_gap=Conf.rollup_session_gap,
+            tier_xp=Conf.rank_tier_xp,
+            tiers=Conf.rank_tiers,
+        )
+
+        self.select_last_log_sql = f'''
+            SELECT {', '.join(self.SdLogExtractor.columns)}
+            FROM logs
+            WHERE save_id = :save_id
+            ORDER BY log_time DESC, log_id DESC
+            LIMIT 1;
+        '''
+
+        # the newest rows of the sessions that ended within the history window, found through the sessions summary, newest first
+        self.select_history_sql = f'''
+            SELECT log_time AS _t, {', '.join(self.SdLogExtractor.columns)}
+            FROM logs
+            WHERE
+                save_id = :save_id
+                AND log_time >= (SELECT MIN(start_time) FROM sessions WHERE save_id = :save_id AND end_time >= :since)
+            ORDER BY log_time DESC, log_id DESC
+            LIMIT :history_rows;
+        '''
+
+        # the writer queue sends a row again if the writer went away before answering, it may have been committed already,
+        # the row keeps its log_id, its log_time is unique per save
+        self.insert_log_sql = f'''
+            INSERT INTO logs (log_time, save_id, {', '.join(self.SdLogExtractor.columns)})
+            VALUES (:log_time, :save_id, {', '.join(f':{col}' for col in self.SdLogExtractor.columns)})
+            ON CONFLICT (save_id, log_time) DO UPDATE SET log_time = excluded.log_time
+            RETURNING log_id;
+        '''
+
+
+    @abc.abstractmethod
+    def run(self) -> int:
+        # the exit code
+        pass
+
+
+    def _find_save_dirs(self, paths: list[str]) -> list[Path] | None:
+        save_dirs: list[Path] = []
+
+        for p in paths:
+            path: Path = Path(p).resolve()
+
+            if not path.exists() or not path.is_dir():
+                Screen.msg(f"save_dir does not exist or is not a directory: {path}")
+                return None
+
+            found: list[Path] = hylandbook.savegame.SaveGame.discover(path=path, sd_dir_glob=Conf.sd_dir_glob)
+
+            if not found:
+                Screen.msg(f"no save games found in: {path}")
+                return None
+
+            save_dirs.extend([d for d in found if d not in save_dirs])
+
+        return save_dirs
+
+
+    def _init_db(self) -> bool:
+        self.Database = self._new_database()
+
+        # another instance starting together may have created the file but not yet its tables
+        created: bool = not self.db_file.exists()
+        con, cur = self.Database.connect()
+        try:
+            cur.execute(f'PRAGMA auto_vacuum = {Conf.db_auto_vacuum};')
+            cur.executescript(Conf.db_schema)
+        except sqlite3.OperationalError as e:
+            Screen.msg(f"[BOO] failed to create database file: {e}")
+            con.close()
+            if created:
+                self.db_file.unlink(missing_ok=True)
+            return False
+        finally:
+            con.close()
+
+        try:
+            for v in self.Database.upgrade(migrations=Conf.db_migrations):
+                Screen.msg(f"database schema upgraded to version {v}")
+        except sqlite3.OperationalError as e:
+            Screen.msg(f"[BOO] failed to upgrade database schema: {e}")
+            return False
+
+        con, cur = self.Database.connect()
+        try:
+            # under the write lock, instances starting together add each column once
+            cur.execute('BEGIN IMMEDIATE;')
+            existing_cols: list[str] = [row['name'] for row in cur.execute('PRAGMA table_info(logs);')]
+            for col in self.SdLogExtractor.columns:
+                if col not in existing_cols:
+                    cur.execute(f"ALTER TABLE logs ADD COLUMN '{col}' {self.SdLogExtractor.column_types[col]} DEFAULT NULL;")
+                    Screen.msg(f"added new column to logs table: {col}")
+            con.commit()
+        except sqlite3.OperationalError as e:
+            Screen.msg(f"[BOO] failed to update database schema: {e}")
+            return False
+        finally:
+            con.close()
+
+        return True
+
+
+    def _init_sd_profiles(self) -> bool:
+        Screen.msg("loading save data profiles ...")
+
+        self.saves = []
+
+        con, cur = self.Database.connect()
+
+        try:
+            for save_dir in self.save_dirs:
+                save: hylandbook.savegame.SaveGame = self._new_save(save_dir=save_dir)
+
+                if self._init_sd_profile(con=con, cur=cur, save=save):
+                    self.saves.append(save)
+        finally:
+            con.close()
+
+        if not self.saves:
+            Screen.msg("[BOO] no usable save game found")
+            return False
+
+        return True
+
+
+    def _new_database(self) -> hylandbook.database.DatabaseSQLite:
+        return hylandbook.database.DatabaseSQLite(
+            file=self.db_file,
+            pragmas=Conf.db_pragmas,
+            cached_statements=Conf.db_cached_statements,
+            group_commit_window=self.args.get('group_commit', Conf.default_group_commit),
+            busy_retries=Conf.db_busy_retries,
+            busy_backoff=Conf.db_busy_backoff,
+        )
+
+
+    def _new_save(self, save_dir: Path) -> hylandbook.savegame.SaveGame:
+        return hylandbook.savegame.SaveGame(
+            save_dir=save_dir,
+            cache=hylandbook.cache.SaveDataCache(
+                max_entries=Conf.sd_cache_max_entries,
+                max_file_bytes=Conf.sd_cache_max_file_bytes,
+                verify_hash=Conf.sd_cache_verify_hash,
+                read_throttle=Conf.sd_file_read_throttle,
+            ),
+            profile_extractor=self.SdProfileExtractor,
+            log_extractor=self.SdLogExtractor,
+            json_stream=self.JsonStream,
+            settle=Conf.sd_read_settle,
+            retries=Conf.sd_read_retries,
+        )
+
+
+    def _new_retention(self) -> hylandbook.retention.Retention:
+        return hylandbook.retention.Retention(
+            database=self.Database,
+            tiers=Conf.retention_tiers,
+            batch_size=Conf.retention_batch_size,
+            time_budget=Conf.retention_time_budget,
+        )
+
+
+    def _init_sd_profile(self, con: sqlite3.Connection, cur: sqlite3.Cursor, save: hylandbook.savegame.SaveGame) -> bool:
+        sd_profile: dict = save.read_profile()
+
+        for e in save.errors:
+            Screen.msg(e)
+
+        if not sd_profile.get('save_dir'):
+            Screen.msg("[BOO] missing profile value 'save_dir'")
+            return False
+
+        if not sd_profile.get('organisation'):
+            Screen.msg(f"[BOO] {save.save_dir.name}: missing profile value 'organisation'")
+            return False
+
+        if not sd_profile.get('seed'):
+            Screen.msg(f"[BOO] {save.save_dir.name}: missing profile value 'seed'")
+            return False
+
+        sd_profile['save_id'], created = self._upsert_save(con=con, cur=cur, sd_profile=sd_profile)
+
+        if created:
+            Screen.msg(f"{save.save_dir.name}: new save profile created")
+        else:
+            Screen.msg(f"{save.save_dir.name}: existing save profile found")
+
+        if not sd_profile.get('save_id'):
+            Screen.msg(f"[BOO] {save.save_dir.name}: failed to get save_id")
+            return False
+
+        # change detection compares against this instead of querying logs every tick
+        last_log: sqlite3.Row | None = cur.execute(self.select_last_log_sql, sd_profile).fetchone()
+        save.last_values = dict(last_log) if last_log else {}
+        save.last_log = {col: save.last_values[col] for col in self.SdLogExtractor.compare_columns} if last_log else {}
+
+        # derived metrics need no database queries while monitoring
+        self.Derived.load(
+            save_id=sd_profile['save_id'],
+            rows=[dict(row) for row in cur.execute(self.select_history_sql, {
+                'save_id': sd_profile['save_id'],
+                'since': time.time() - Conf.derived_history_window,
+                'history_rows': Conf.derived_history_rows,
+            })][::-1],
+        )
+
+        return True
+
+
+    def _find_save_id(self, cur: sqlite3.Cursor, sd_profile: dict) -> int | None:
+        r: sqlite3.Cursor = cur.execute(
+            '''
+            SELECT save_id
+            FROM saves
+            WHERE
+                save_dir = :save_dir
+                AND organisation = :organisation
+                AND seed = :seed
+            ORDER BY save_id DESC
+            LIMIT 1;
+            ''',
+            sd_profile
+        )
+
+        existing_profile: sqlite3.Row | None = r.fetchone()
+
+        return existing_profile['save_id'] if existing_profile else None
+
+
+    def _upsert_save(self, con: sqlite3.Connection, cur: sqlite3.Cursor, sd_profile: dict) -> tuple[int | None, bool]:
+        # (save_id, created), another instance may create the same profile at the same time
+        cur.execute(
+            '''
+            INSERT INTO saves (save_dir, organisation, seed)
+            VALUES (:save_dir, :organisation, :seed)
+            ON CONFLICT (save_dir, organisation, seed) DO NOTHING;
+            ''',
+            sd_profile
+        )
+        created: bool = cur.rowcount > 0
+        con.commit()
+
+        return (self._find_save_id(cur=cur, sd_profile=sd_profile), created)
+
+
+    def _derive(self, save: hylandbook.savegame.SaveGame) -> None:
+        # unchanged inputs reuse the values of the last tick
+        save.derived = self.Derived.evaluate(save_id=save.sd_profile['save_id'], values={**save.sd_profile, **save.sd_log})
@@ -11,53 +11,585 @@ class Conf:
 
     db_file_name: str = 'book.db'
 
+    db_pragmas: dict[str, str | int] = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -16 * 1024,  # KiB
+        'mmap_size': 64 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 5000,  # ms
+    }
+    db_cached_statements: int = 128
+
+    # only applies to new database files, existing ones are converted by the compact command
+    db_auto_vacuum: str = 'INCREMENTAL'
+    db_vacuum_interval: int = 60 * 60
+    db_vacuum_pages: int = 1024
+
+    default_group_commit: float = 0
+
+    # after busy_timeout has run out, other instances holding the write lock
+    db_busy_retries: int = 5
+    db_busy_backoff: float = 0.05
+    # how often the --writer-queue writer looks for newly connected instances
+    writer_poll_interval: float = 0.05
+
     default_check_interval: int = 60
     min_check_interval: int = 10
 
+    # --adaptive, checks are cheap while nothing changed, only the save files are stat'ed
+    adaptive_min_interval: float = 2
+    adaptive_backoff: float = 1.5
+    # file changes closer together than this belong to the same save
+    adaptive_burst_gap: float = 30
+    # checked this long after the expected save at the latest
+    adaptive_margin: float = 2
+    adaptive_window_checks: int = 8
+
+    sd_dir_glob: str = 'SaveGame_*'
+
     sd_file_read_throttle: float = 0
+    # save files written less than this many seconds ago are read again once the game is done with them
+    sd_read_settle: float = 0.5
+    sd_read_retries: int = 5
+
+    monitor_threads: int = 8
+    # rows waiting for the database and exports waiting to be written, a full queue holds back the next tick
+    monitor_db_queue_size: int = 256
+    monitor_export_queue_size: int = 64
+    # longest blocking wait in a worker thread, so [CTRL]+[C] never waits for a thread stuck in a wait
+    monitor_wait_slice: float = 1
+
+    # save file -> fields to extract from it, 'path' is a dot separated key path into the file's JSON,
+    # falsy or missing values become 'default', 'aggregate' (len, sum) is applied before 'type',
+    # new log fields are added to the logs table automatically, 'compare': False excludes it from change detection
+    sd_profile_fields: dict[str, list[dict]] = {
+        'Game.json': [
+            {'col': 'organisation', 'path': 'OrganisationName', 'type': str, 'default': ''},
+            {'col': 'seed', 'path': 'Seed', 'type': int, 'default': 0},
+        ],
+    }
+
+    sd_log_fields: dict[str, list[dict]] = {
+        'Game.json': [
+            {'col': 'gameversion', 'path': 'GameVersion', 'type': str, 'default': '', 'compare': False},
+        ],
+        'Time.json': [
+            {'col': 'playtime', 'path': 'Playtime', 'type': int, 'default': 0, 'compare': False},
+            {'col': 'timeofday', 'path': 'TimeOfDay', 'type': int, 'default': 0, 'compare': False},
+            {'col': 'elapseddays', 'path': 'ElapsedDays', 'type': int, 'default': 0},
+        ],
+        'Money.json': [
+            {'col': 'onlinebalance', 'path': 'OnlineBalance', 'type': float, 'default': 0.0},
+            {'col': 'networth', 'path': 'Networth', 'type': float, 'default': 0.0},
+            {'col': 'lifetimeearnings', 'path': 'LifetimeEarnings', 'type': float, 'default': 0.0},
+        ],
+        'Rank.json': [
+            {'col': 'rank', 'path': 'Rank', 'type': int, 'default': 0},
+            {'col': 'tier', 'path': 'Tier', 'type': int, 'default': 0},
+            {'col': 'xp', 'path': 'XP', 'type': int, 'default': 0},
+            {'col': 'totalxp', 'path': 'TotalXP', 'type': int, 'default': 0},
+        ],
+        'Products.json': [
+            {'col': 'discoveredproducts', 'path': 'DiscoveredProducts', 'type': int, 'default': 0, 'aggregate': 'len'},
+        ],
+        'OwnedVehicles.json': [
+            {'col': 'ownedvehicles', 'path': 'Vehicles', 'type': int, 'default': 0, 'aggregate': 'len'},
+        ],
+    }
+
+    # only the extracted values are read from these, without loading the whole file
+    sd_stream_files: list[str] = [
+        'Products.json',
+        'OwnedVehicles.json',
+    ]
+    sd_stream_chunk_size: int = 64 * 1024
+
+    sd_files: list[str] = list(dict.fromkeys([*sd_profile_fields, *sd_log_fields]))
+
+    sd_cache_max_entries: int = 32
+    # size of the cached files on disk, not of the parsed data in memory
+    sd_cache_max_file_bytes: int = 64 * 1024 * 1024
+    sd_cache_verify_hash: bool = True
+
+    watch_debounce: float = 0.25
+    watch_poll_interval: float = 0.5
 
     default_export_types: list[str] =  []
     export_types_choices: list[str] = [
         'json',
         'txt',
+        'ndjson',
+        'csv',
+    ]
+
+    export_replace_retries: int = 10
+    export_replace_retry_delay: float = 0.05
+
+    # computed from the save's values and its recent history by the metrics in hylandbook.derived, exported after the log values
+    derived_metrics: list[str] = [
+        'session_earnings',
+        'earnings_per_ingame_hour',
+        'xp_to_next_tier',
+        'xp_to_next_rank',
+        'networth_delta_yesterday',
     ]
+    # rows logged in the last 12 hours are kept in memory, read once at start
+    derived_history_window: int = 12 * 60 * 60
+    derived_history_rows: int = 10000
+    # XP each tier of a rank takes, index is the rank from Rank.json, the last value is used for all higher ranks,
+    # adjust when the game changes its rank table
+    rank_tier_xp: list[int] = [200, 425, 650, 900, 1125, 1350, 1575, 1800, 2050, 2275, 2500]
+    rank_tiers: int = 5
 
     default_export_keys: list[str] = ['all']
     export_keys_choices: list[str] = [
         '_t',
         'save_dir',
-        'organisation',
-        'seed',
+        *[f['col'] for fields in sd_profile_fields.values() for f in fields],
         'save_id',
-        'gameversion',
-        'playtime',
-        'timeofday',
-        'elapseddays',
-        'onlinebalance',
-        'networth',
-        'lifetimeearnings',
-        'rank',
-        'tier',
+        *[f['col'] for fields in sd_log_fields.values() for f in fields],
+        *derived_metrics,
+    ]
+
+    # log rows older than 'age' seconds are thinned out to the first row per 'bucket' and save, a tier applies until the next older one,
+    # 'bucket' is an SQL expression over the logs table aliased as {t}
+    retention_tiers: list[dict] = [
+        {'age': 7 * 24 * 60 * 60, 'bucket': '{t}.elapseddays'},
+        {'age': 365 * 24 * 60 * 60, 'bucket': 'CAST({t}.log_time / 604800 AS INTEGER)'},
+    ]
+    retention_batch_size: int = 1000
+    retention_time_budget: float = 0.05
+
+    # seconds without a log row after which the next row starts a new session in the sessions table
+    rollup_session_gap: int = 30 * 60
+
+    http_host: str = '127.0.0.1'
+    default_http_port: int = 8765
+    http_cors_origin: str = '*'
+    http_keepalive: float = 15
+    http_long_poll_timeout: float = 30
+    http_event_backlog: int = 100
+
+    # sink kind -> what happens to rows while the sink's queue is full, 'coalesce' keeps only the latest row of each save game,
+    # 'drop' keeps every row in order and drops new ones
+    sink_policies: dict[str, str] = {
+        'fifo': 'coalesce',
+        'unix': 'drop',
+        'statsd': 'coalesce',
+        'line': 'drop',
+    }
+    sink_queue_size: int = 256
+    sink_accept_interval: float = 0.25
+    # seconds a fifo sink waits for the reader to take the rest of a long line
+    sink_fifo_write_timeout: float = 1
+    # fits into one Ethernet frame
+    sink_udp_max_datagram: int = 1432
+    sink_statsd_prefix: str = 'hylandbook'
+    sink_line_measurement: str = 'hylandbook'
+    sink_close_timeout: float = 2
+
+    # name -> (Prometheus type, help)
+    metrics: dict[str, tuple[str, str]] = {
+        'hylandbook_ticks_total': ('counter', 'Monitor ticks.'),
+        'hylandbook_tick_seconds': ('histogram', 'Duration of a monitor tick, without waiting for the next one.'),
+        'hylandbook_stage_seconds': ('histogram', 'Duration of each stage of a monitor tick.'),
+        'hylandbook_files_read_total': ('counter', 'Save files read from disk.'),
+        'hylandbook_bytes_read_total': ('counter', 'Bytes of save files read from disk.'),
+        'hylandbook_cache_hits_total': ('counter', 'Save files served from the save data cache.'),
+        'hylandbook_cache_misses_total': ('counter', 'Save files that had to be parsed.'),
+        'hylandbook_check_interval_seconds': ('gauge', 'Seconds until the next check chosen by --adaptive.'),
+        'hylandbook_cache_bytes': ('gauge', 'Bytes of save files held in the save data cache.'),
+        'hylandbook_read_errors_total': ('counter', 'Save files that failed to load.'),
+        'hylandbook_derived_computed_total': ('counter', 'Derived values computed again because their inputs changed.'),
+        'hylandbook_derived_reused_total': ('counter', 'Derived values reused because their inputs were unchanged.'),
+        'hylandbook_torn_reads_total': ('counter', 'Save games read again because the game was still writing their files.'),
+        'hylandbook_rows_inserted_total': ('counter', 'Rows inserted into the logs table.'),
+        'hylandbook_commits_total': ('counter', 'Database commits.'),
+        'hylandbook_export_bytes_total': ('counter', 'Bytes written to export files.'),
+        'hylandbook_sink_rows_sent_total': ('counter', 'Rows sent by each --sink.'),
+        'hylandbook_sink_rows_dropped_total': ('counter', 'Rows a --sink dropped because its queue was full or nobody received them.'),
+        'hylandbook_sink_rows_coalesced_total': ('counter', 'Rows a --sink replaced with a newer row of the same save game before sending.'),
+        'hylandbook_sink_errors_total': ('counter', 'Failed sends of each --sink.'),
+        'hylandbook_sink_queue_depth': ('gauge', 'Rows waiting in the queue of each --sink.'),
+        'hylandbook_db_busy_retries_total': ('counter', 'Database writes retried because another instance held the write lock.'),
+        'hylandbook_writer_statements_total': ('counter', 'Statements committed by this instance as --writer-queue writer.'),
+        'hylandbook_writer_batches_total': ('counter', 'Transactions committed by this instance as --writer-queue writer.'),
+        'hylandbook_queue_depth': ('gauge', 'Calls waiting in the database and export queues.'),
+        'hylandbook_queue_full_total': ('counter', 'Times a tick waited for room in the database or export queue.'),
+        'hylandbook_retention_deleted_rows_total': ('counter', 'Log rows removed by retention.'),
+        'hylandbook_snapshot_blobs_total': ('counter', 'New save file contents stored by --snapshots.'),
+        'hylandbook_snapshot_bytes_total': ('counter', 'Compressed bytes stored by --snapshots.'),
+        'hylandbook_snapshot_deltas_total': ('counter', 'Save file contents stored as patch by --snapshots.'),
+    }
+    metrics_buckets: list[float] = [0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+    metrics_file_name: str = 'metrics.prom'
+    profile_file_name: str = 'profile_{time}.pstats'
+
+    import_batch_size: int = 10000
+
+    snapshot_codecs_choices: list[str] = ['zlib', 'lzma', 'none']
+    default_snapshot_codec: str = 'zlib'
+    snapshot_glob: str = '**/*.json'
+    default_snapshot_keyframe_interval: int = 20
+    # smaller files are always stored whole, a patch would hardly be smaller
+    snapshot_delta_min_size: int = 4096
+    snapshot_keyframe_cache_size: int = 8
+
+    bench_file_name: str = 'hb_bench.json'
+    bench_max_regression: float = 0.2
+
+    synthetic_args: list[dict] = [
+        {
+            'name_or_flags': ['-n', '--slots'],
+            'setup': {
+                'metavar': 'N',
+                'type': int,
+                'default': 1,
+                'help': "number of SaveGame_* directories, default: 1",
+            },
+        },
+        {
+            'name_or_flags': ['--products'],
+            'setup': {
+                'metavar': 'N',
+                'type': int,
+                'default': 1000,
+                'help': "discovered products per save game, default: 1000",
+            },
+        },
+        {
+            'name_or_flags': ['--vehicles'],
+            'setup': {
+                'metavar': 'N',
+                'type': int,
+                'default': 10,
+                'help': "owned vehicles per save game, default: 10",
+            },
+        },
+        {
+            'name_or_flags': ['--seed'],
+            'setup': {
+                'metavar': 'N',
+                'type': int,
+                'default': 0,
+                'help': "random seed, the same seed generates the same save games, default: 0",
+            },
+        },
+    ]
+
+    data_dir_arg: dict = {
+        'name_or_flags': ['-d', '--data-dir'],
+        'setup': {
+            'metavar': 'PATH',
+            'type': str,
+            'default': default_data_dir,
+            'help': f"path to directory where {app_name} will save data, will be created automatically if it does not exist yet, default: <current directory from where you run hylandbook>\\hb_data, current: {default_data_dir}",
+        },
+    }
+
+    stats_reports_choices: list[str] = [
+        'earnings',
         'xp',
-        'totalxp',
-        'discoveredproducts',
-        'ownedvehicles',
+        'networth',
+        'rankups',
+        'sessions',
     ]
+    stats_fetch_size: int = 1000
+    stats_column_width: int = 10
+
+    export_history_formats_choices: list[str] = ['csv', 'ndjson', 'sqlite']
+    export_history_fetch_size: int = 10000
+    export_history_buffer_size: int = 1024 * 1024
+    # fast enough to keep up with the database, most of the size reduction of level 9
+    export_history_gzip_level: int = 6
+
+    # first argument that switches hylandbook from monitoring to another command
+    command_aliases: dict[str, str] = {
+        'history': 'stats',
+    }
+
+    commands: dict[str, dict] = {
+        'generate': {
+            'init': {
+                'prog': f'{app_name} generate',
+                'description': "Write synthetic save games for testing and benchmarking.",
+            },
+            'args': [
+                {
+                    'name_or_flags': ['path'],
+                    'setup': {
+                        'metavar': 'SAVES_PATH',
+                        'type': str,
+                        'help': "directory to create the SaveGame_* directories in, existing files in them are overwritten",
+                    },
+                },
+                *synthetic_args,
+            ],
+        },
+        'bench': {
+            'init': {
+                'prog': f'{app_name} bench',
+                'description': "Time each stage of the monitor tick on synthetic save games in a temporary directory and write the results as JSON.",
+            },
+            'args': [
+                {
+                    'name_or_flags': ['-t', '--ticks'],
+                    'setup': {
+                        'metavar': 'N',
+                        'type': int,
+                        'default': 20,
+                        'help': "number of monitor ticks, each save game is saved once per tick, default: 20",
+                    },
+                },
+                {
+                    'name_or_flags': ['-o', '--output'],
+                    'setup': {
+                        'metavar': 'FILE',
+                        'type': str,
+                        'default': bench_file_name,
+                        'help': f"file to write the results to, default: {bench_file_name}",
+                    },
+                },
+                {
+                    'name_or_flags': ['-b', '--baseline'],
+                    'setup': {
+                        'metavar': 'FILE',
+                        'type': str,
+                        'default': None,
+                        'help': f"results of an earlier run to compare with, exits with 1 if a stage got more than {bench_max_regression * 100:g}%% slower",
+                    },
+                },
+                *synthetic_args,
+            ],
+        },
+        'compact': {
+            'init': {
+                'prog': f'{app_name} compact',
+                'description': "Shrink the database file. Do not run this while hylandbook is monitoring with the same data directory.",
+            },
+            'args': [
+                {
+                    'name_or_flags': ['-R', '--retention'],
+                    'setup': {
+                        'action': 'store_true',
+                        'default': False,
+                        'help': "apply the --retention policy to the whole history first",
+                    },
+                },
+                {
+                    'name_or_flags': ['--into'],
+                    'setup': {
+                        'metavar': 'FILE',
+                        'type': str,
+                        'default': None,
+                        'help': "write a compacted copy of the database to FILE instead of compacting it in place, FILE must not exist yet",
+                    },
+                },
+                data_dir_arg,
+            ],
+        },
+        'rebuild-rollups': {
+            'init': {
+                'prog': f'{app_name} rebuild-rollups',
+                'description': f"Compute the per in-game day and per session summaries again from all log rows, e.g. after changing the session gap of {rollup_session_gap // 60} minutes. They are kept up to date while monitoring and importing, this is never needed otherwise.",
+            },
+            'args': [
+                data_dir_arg,
+            ],
+        },
+        'import': {
+            'init': {
+                'prog': f'{app_name} import',
+                'description': "Import copies of save games from earlier sessions into the database. Snapshots identical to an already logged row are skipped, so importing the same files again adds nothing.",
+            },
+            'args': [
+                {
+                    'name_or_flags': ['paths'],
+                    'setup': {
+                        'metavar': 'PATH',
+                        'type': str,
+                        'nargs': '+',
+                        'help': "directory or .zip archive to search for save game copies, every directory containing a Game.json is one snapshot, .zip archives inside directories are searched too",
+                    },
+                },
+                {
+                    'name_or_flags': ['-j', '--jobs'],
+                    'setup': {
+                        'metavar': 'N',
+                        'type': int,
+                        'default': None,
+                        'help': "number of processes reading snapshots in parallel, default: number of CPUs",
+                    },
+                },
+                data_dir_arg,
+            ],
+        },
+        'restore': {
+            'init': {
+                'prog': f'{app_name} restore',
+                'description': "Write the save files stored with --snapshots for one log row to a directory.",
+            },
+            'args': [
+                {
+                    'name_or_flags': ['log_id'],
+                    'setup': {
+                        'metavar': 'LOG_ID',
+                        'type': int,
+                        'help': "log_id of the row in the logs table",
+                    },
+                },
+                {
+                    'name_or_flags': ['dest'],
+                    'setup': {
+                        'metavar': 'DEST_PATH',
+                        'type': str,
+                        'help': "directory to write the save files to, must not exist yet",
+                    },
+                },
+                data_dir_arg,
+            ],
+        },
+        'stats': {
+            'init': {
+                'prog': f'{app_name} stats',
+                'description': "Print history statistics from the database. Without SAVEGAME_PATH or --save-id, all saves in the database are reported.",
+            },
+            'args': [
+                {
+                    'name_or_flags': ['save_dirs'],
+                    'setup': {
+                        'metavar': 'SAVEGAME_PATH',
+                        'type': str,
+                        'nargs': '*',
+                        'default': [],
+                        'help': "report the saves found in these paths, same as for monitoring",
+                    },
+                },
+                {
+                    'name_or_flags': ['-s', '--save-id'],
+                    'setup': {
+                        'metavar': 'ID',
+                        'type': int,
+                        'nargs': '*',
+                        'default': [],
+                        'help': "report these save_id values from the database",
+                    },
+                },
+                {
+                    'name_or_flags': ['-r', '--reports'],
+                    'setup': {
+                        'metavar': 'REPORTS',
+                        'type': str,
+                        'nargs': '*',
+                        'choices': stats_reports_choices,
+                        'default': stats_reports_choices,
+                        'help': f"reports to print, default: all, choices: {' '.join(stats_reports_choices)}",
+                    },
+                },
+                {
+                    'name_or_flags': ['-f', '--format'],
+                    'setup': {
+                        'type': str,
+                        'choices': ['table', 'csv'],
+                        'default': 'table',
+                        'help': "output format, default: table",
+                    },
+                },
+                data_dir_arg,
+            ],
+        },
+        'export-history': {
+            'init': {
+                'prog': f'{app_name} export-history',
+                'description': "Write the logged rows with their save columns to a CSV, NDJSON or SQLite file. Without filters, all rows of all saves are exported.",
+            },
+            'args': [
+                {
+                    'name_or_flags': ['output'],
+                    'setup': {
+                        'metavar': 'FILE',
+                        'type': str,
+                        'nargs': '?',
+                        'default': '-',
+                        'help': "file to write, must not exist yet, default: - (standard output, csv and ndjson only)",
+                    },
+                },
+                {
+                    'name_or_flags': ['-f', '--format'],
+                    'setup': {
+                        'type': str,
+                        'choices': export_history_formats_choices,
+                        'default': export_history_formats_choices[0],
+                        'help': f"output format, sqlite writes a logs table into a new database file, default: {export_history_formats_choices[0]}, choices: {' '.join(export_history_formats_choices)}",
+                    },
+                },
+                {
+                    'name_or_flags': ['-z', '--gzip'],
+                    'setup': {
+                        'action': 'store_true',
+                        'default': False,
+                        'help': "compress csv or ndjson with gzip, also enabled by a FILE ending in .gz",
+                    },
+                },
+                {
+                    'name_or_flags': ['-s', '--save-id'],
+                    'setup': {
+                        'metavar': 'ID',
+                        'type': int,
+                        'nargs': '*',
+                        'default': [],
+                        'help': "only export rows of these save_id values",
+                    },
+                },
+                {
+                    'name_or_flags': ['--since'],
+                    'setup': {
+                        'metavar': 'TIME',
+                        'type': str,
+                        'default': None,
+                        'help': "only export rows logged at or after TIME, a unix timestamp or local date and time like 2025-06-01 or 2025-06-01T18:30",
+                    },
+                },
+                {
+                    'name_or_flags': ['--until'],
+                    'setup': {
+                        'metavar': 'TIME',
+                        'type': str,
+                        'default': None,
+                        'help': "only export rows logged before TIME, same format as --since",
+                    },
+                },
+                {
+                    'name_or_flags': ['-c', '--columns'],
+                    'setup': {
+                        'metavar': 'COLUMN',
+                        'type': str,
+                        'nargs': '*',
+                        'default': [],
+                        'help': "columns to export in this order, default: all columns of the logs table with save_dir, organisation and seed",
+                    },
+                },
+                data_dir_arg,
+            ],
+        },
+    }
 
     argparser: dict = {
         'init': {
             'prog': app_name,
-            'description': "SAVEGAME_PATH is required, options are optional and will use their defaults if not set by you. For more help see the README.",
+            'description': f"at least one SAVEGAME_PATH is required, options are optional and will use their defaults if not set by you. Other commands: {', '.join([*commands, *command_aliases])}, e.g. '{app_name} stats --help'. For more help see the README.",
             'epilog': 'Cool links: scheduleonegame.com, github.com/etrusci-org/hylandbook',
         },
         'args': [
             {
-                'name_or_flags': ['save_dir'],
+                'name_or_flags': ['save_dirs'],
                 'setup': {
                     'metavar': 'SAVEGAME_PATH',
                     'type': str,
+                    'nargs': '+',
                     'default': None,
-                    'help': "path to a Schedule I 'SaveGame_*' directory, enclose it in quotes if it contains spaces, e.g. \"C:\\path to\\SaveGame_1\""
+                    'help': "path to a Schedule I 'SaveGame_*' directory, or to a 'Saves\\<SteamID>' directory to monitor all save games inside it, can be given multiple times, enclose it in quotes if it contains spaces, e.g. \"C:\\path to\\SaveGame_1\""
                 },
             },
             {
@@ -69,6 +601,92 @@ class Conf:
                     'help': f"how frequently to check the save data for changes, in seconds, default: {default_check_interval}, minimum: {min_check_interval}",
                 },
             },
+            {
+                'name_or_flags': ['-a', '--adaptive'],
+                'setup': {
+                    'action': 'store_true',
+                    'default': False,
+                    'help': f"check less often while the save data is unchanged, again every {adaptive_min_interval:g}s right after a save, and just after the next autosave once its timing is learned, --check-interval is then the longest time between checks",
+                },
+            },
+            {
+                'name_or_flags': ['-w', '--watch'],
+                'setup': {
+                    'action': 'store_true',
+                    'default': False,
+                    'help': f"watch the save data for changes instead of checking it every --check-interval seconds, reacts within about {watch_debounce + watch_poll_interval:g}s after the game has saved, uses inotify on Linux and a lightweight file stat scan elsewhere",
+                },
+            },
+            {
+                'name_or_flags': ['-g', '--group-commit'],
+                'setup': {
+                    'metavar': 'SECONDS',
+                    'type': float,
+                    'default': default_group_commit,
+                    'help': f"in --watch mode, collect new log rows for up to this many seconds and write them to the database in one transaction, default: {default_group_commit:g} (write immediately)",
+                },
+            },
+            {
+                'name_or_flags': ['-S', '--snapshots'],
+                'setup': {
+                    'metavar': 'CODEC',
+                    'type': str,
+                    'nargs': '?',
+                    'choices': snapshot_codecs_choices,
+                    'const': default_snapshot_codec,
+                    'default': None,
+                    'help': f"also store the complete save files with each new log row, each file content is stored only once and compressed, restore them with '{app_name} restore', default: off, CODEC default: {default_snapshot_codec}, choices: {' '.join(snapshot_codecs_choices)}",
+                },
+            },
+            {
+                'name_or_flags': ['--writer-queue'],
+                'setup': {
+                    'action': 'store_true',
+                    'default': False,
+                    'help': "when several instances use the same --data-dir, the first one started with this option writes the new log rows of all others that use it too, in shared transactions",
+                },
+            },
+            {
+                'name_or_flags': ['--keyframe-interval'],
+                'setup': {
+                    'metavar': 'N',
+                    'type': int,
+                    'default': default_snapshot_keyframe_interval,
+                    'help': f"with --snapshots, store changed JSON files of at least {snapshot_delta_min_size // 1024} KiB as patch against their previous content, and completely every N-th time, 1 stores every file completely, default: {default_snapshot_keyframe_interval}",
+                },
+            },
+            {
+                'name_or_flags': ['-R', '--retention'],
+                'setup': {
+                    'action': 'store_true',
+                    'default': False,
+                    'help': f"thin out old log rows while monitoring, all rows of the last {retention_tiers[0]['age'] // 86400} days are kept, older ones are reduced to one per in-game day, and after {retention_tiers[1]['age'] // 86400} days to one per week",
+                },
+            },
+            {
+                'name_or_flags': ['--headless'],
+                'setup': {
+                    'action': 'store_true',
+                    'default': False,
+                    'help': "run without prompts and screen updates, e.g. as a service, detected changes, errors and other messages are logged as one logfmt line each",
+                },
+            },
+            {
+                'name_or_flags': ['-M', '--metrics'],
+                'setup': {
+                    'action': 'store_true',
+                    'default': False,
+                    'help': f"write timings and counters of each monitor tick in Prometheus text format to {metrics_file_name} in the data directory, they are always available on /metrics with --http",
+                },
+            },
+            {
+                'name_or_flags': ['--profile'],
+                'setup': {
+                    'action': 'store_true',
+                    'default': False,
+                    'help': f"profile the monitor with cProfile and write the stats to {profile_file_name} in the data directory when it stops, on Linux/macOS the signal SIGUSR1 starts/stops profiling at any time",
+                },
+            },
             {
                 'name_or_flags': ['-e', '--export-types'],
                 'setup': {
@@ -77,36 +695,49 @@ class Conf:
                     'nargs': '*',
                     'choices': export_types_choices,
                     'default': default_export_types,
-                    'help': f"types of additional export files to create each time save data changes are detected, default: no export, choices: {' '.join(export_types_choices)}",
+                    'help': f"types of additional export files to create each time save data changes are detected, json and txt are replaced with the current values, ndjson and csv get a new line appended, default: no export, choices: {' '.join(export_types_choices)}",
                 },
             },
             {
-                'name_or_flags': ['-k', '--export-keys'],
+                'name_or_flags': ['-p', '--http'],
                 'setup': {
-                    'metavar': 'KEYS',
+                    'metavar': 'PORT',
+                    'type': int,
+                    'nargs': '?',
+                    'const': default_http_port,
+                    'default': None,
+                    'help': f"serve the current values for overlays on http://{http_host}:PORT, as JSON on /current.json and pushed on each detected change on /events (Server-Sent Events) and /poll (long-poll), uses the same --export-keys, default: off, PORT default: {default_http_port}",
+                },
+            },
+            {
+                'name_or_flags': ['--sink'],
+                'setup': {
+                    'metavar': 'SPEC',
                     'type': str,
                     'nargs': '*',
-                    'choices': export_keys_choices,
-                    'default': default_export_keys,
-                    'help': f"value keys of data to export, default: {' '.join(default_export_keys)}, choices: {' '.join(export_keys_choices)}",
+                    'default': [],
+                    'help': "push each detected change to other programs without waiting for them, fifo:PATH writes one JSON line into a named pipe, unix:PATH sends JSON lines to every program connected to a unix socket, statsd:HOST:PORT sends StatsD gauges and line:HOST:PORT InfluxDB line protocol over UDP, relative paths are in the data directory, uses the same --export-keys, default: off",
                 },
             },
             {
-                'name_or_flags': ['-d', '--data-dir'],
+                'name_or_flags': ['-k', '--export-keys'],
                 'setup': {
-                    'metavar': 'PATH',
+                    'metavar': 'KEYS',
                     'type': str,
-                    'default': default_data_dir,
-                    'help': f"path to directory where {app_name} will save data, will be created automatically if it does not exist yet, default: <current directory from where you run hylandbook>\\hb_data, current: {default_data_dir}",
+                    'nargs': '*',
+                    'choices': export_keys_choices,
+                    'default': default_export_keys,
+                    'help': f"value keys of data to export, default: {' '.join(default_export_keys)}, choices: {' '.join(export_keys_choices)}",
                 },
             },
+            data_dir_arg,
         ],
     }
 
     db_schema: str = '''
-        BEGIN TRANSACTION;
+        BEGIN IMMEDIATE TRANSACTION;
 
-        CREATE TABLE 'saves' (
+        CREATE TABLE IF NOT EXISTS 'saves' (
             'save_id' INTEGER NOT NULL,
 
             'save_dir' TEXT NOT NULL,
@@ -116,7 +747,7 @@ class Conf:
             PRIMARY KEY('save_id' AUTOINCREMENT)
         );
 
-        CREATE TABLE 'logs' (
+        CREATE TABLE IF NOT EXISTS 'logs' (
             'log_id' INTEGER NOT NULL,
 
             'log_time' REAL NOT NULL,
@@ -142,3 +773,415 @@ class Conf:
 
         COMMIT;
     '''
+
+    # summaries per in-game day and per session kept up to date by triggers on logs, they keep covering
+    # the rows thinned out by retention, first and last are the values of the rows with the lowest and highest log_time
+    db_rollups: str = f'''
+        CREATE TABLE IF NOT EXISTS 'days' (
+            'save_id' INTEGER NOT NULL,
+            'elapseddays' INTEGER NOT NULL,
+
+            'rows' INTEGER NOT NULL,
+            'first_log_id' INTEGER NOT NULL,
+            'last_log_id' INTEGER NOT NULL,
+            'first_time' REAL NOT NULL,
+            'last_time' REAL NOT NULL,
+
+            'networth_first' REAL DEFAULT NULL,
+            'networth_last' REAL DEFAULT NULL,
+            'networth_min' REAL DEFAULT NULL,
+            'networth_max' REAL DEFAULT NULL,
+            'onlinebalance_first' REAL DEFAULT NULL,
+            'onlinebalance_last' REAL DEFAULT NULL,
+            'onlinebalance_min' REAL DEFAULT NULL,
+            'onlinebalance_max' REAL DEFAULT NULL,
+            'lifetimeearnings_first' REAL DEFAULT NULL,
+            'lifetimeearnings_last' REAL DEFAULT NULL,
+            'lifetimeearnings_min' REAL DEFAULT NULL,
+            'lifetimeearnings_max' REAL DEFAULT NULL,
+            'xp_first' INTEGER DEFAULT NULL,
+            'xp_last' INTEGER DEFAULT NULL,
+            'xp_min' INTEGER DEFAULT NULL,
+            'xp_max' INTEGER DEFAULT NULL,
+
+            PRIMARY KEY('save_id', 'elapseddays'),
+            FOREIGN KEY ('save_id') REFERENCES 'saves'('save_id')
+        ) WITHOUT ROWID;
+
+        -- a session ends when a save has not been logged for rollup_session_gap seconds
+        CREATE TABLE IF NOT EXISTS 'sessions' (
+            'session_id' INTEGER NOT NULL,
+            'save_id' INTEGER NOT NULL,
+
+            'rows' INTEGER NOT NULL,
+            'first_log_id' INTEGER NOT NULL,
+            'last_log_id' INTEGER NOT NULL,
+            'start_time' REAL NOT NULL,
+            'end_time' REAL NOT NULL,
+
+            'networth_first' REAL DEFAULT NULL,
+            'networth_last' REAL DEFAULT NULL,
+            'networth_min' REAL DEFAULT NULL,
+            'networth_max' REAL DEFAULT NULL,
+            'onlinebalance_first' REAL DEFAULT NULL,
+            'onlinebalance_last' REAL DEFAULT NULL,
+            'onlinebalance_min' REAL DEFAULT NULL,
+            'onlinebalance_max' REAL DEFAULT NULL,
+            'lifetimeearnings_first' REAL DEFAULT NULL,
+            'lifetimeearnings_last' REAL DEFAULT NULL,
+            'lifetimeearnings_min' REAL DEFAULT NULL,
+            'lifetimeearnings_max' REAL DEFAULT NULL,
+            'xp_first' INTEGER DEFAULT NULL,
+            'xp_last' INTEGER DEFAULT NULL,
+            'xp_min' INTEGER DEFAULT NULL,
+            'xp_max' INTEGER DEFAULT NULL,
+
+            PRIMARY KEY('session_id' AUTOINCREMENT),
+            FOREIGN KEY ('save_id') REFERENCES 'saves'('save_id')
+        );
+
+        CREATE INDEX IF NOT EXISTS 'sessions_save_id' ON 'sessions' ('save_id', 'session_id');
+        CREATE INDEX IF NOT EXISTS 'sessions_save_id_end_time' ON 'sessions' ('save_id', 'end_time');
+        CREATE INDEX IF NOT EXISTS 'sessions_save_id_start_time' ON 'sessions' ('save_id', 'start_time');
+
+        -- scalar MIN() and MAX() are NULL if one argument is, a missing value keeps the other one
+        CREATE TRIGGER IF NOT EXISTS 'logs_rollup_days' AFTER INSERT ON 'logs'
+        WHEN NEW.elapseddays IS NOT NULL
+        BEGIN
+            INSERT INTO days (
+                save_id, elapseddays, rows, first_log_id, last_log_id, first_time, last_time,
+                networth_first, networth_last, networth_min, networth_max,
+                onlinebalance_first, onlinebalance_last, onlinebalance_min, onlinebalance_max,
+                lifetimeearnings_first, lifetimeearnings_last, lifetimeearnings_min, lifetimeearnings_max,
+                xp_first, xp_last, xp_min, xp_max
+            )
+            VALUES (
+                NEW.save_id, NEW.elapseddays, 1, NEW.log_id, NEW.log_id, NEW.log_time, NEW.log_time,
+                NEW.networth, NEW.networth, NEW.networth, NEW.networth,
+                NEW.onlinebalance, NEW.onlinebalance, NEW.onlinebalance, NEW.onlinebalance,
+                NEW.lifetimeearnings, NEW.lifetimeearnings, NEW.lifetimeearnings, NEW.lifetimeearnings,
+                NEW.xp, NEW.xp, NEW.xp, NEW.xp
+            )
+            -- rows can arrive out of log_time order, e.g. from import, first and last follow log_time
+            ON CONFLICT (save_id, elapseddays) DO UPDATE SET
+                rows = rows + 1,
+                first_log_id = CASE WHEN excluded.first_time < first_time THEN excluded.first_log_id ELSE first_log_id END,
+                last_log_id = CASE WHEN excluded.last_time >= last_time THEN excluded.last_log_id ELSE last_log_id END,
+                first_time = MIN(first_time, excluded.first_time),
+                last_time = MAX(last_time, excluded.last_time),
+                networth_first = CASE WHEN excluded.first_time < first_time THEN excluded.networth_first ELSE networth_first END,
+                networth_last = CASE WHEN excluded.last_time >= last_time THEN excluded.networth_last ELSE networth_last END,
+                networth_min = COALESCE(MIN(networth_min, excluded.networth_min), networth_min, excluded.networth_min),
+                networth_max = COALESCE(MAX(networth_max, excluded.networth_max), networth_max, excluded.networth_max),
+                onlinebalance_first = CASE WHEN excluded.first_time < first_time THEN excluded.onlinebalance_first ELSE onlinebalance_first END,
+                onlinebalance_last = CASE WHEN excluded.last_time >= last_time THEN excluded.onlinebalance_last ELSE onlinebalance_last END,
+                onlinebalance_min = COALESCE(MIN(onlinebalance_min, excluded.onlinebalance_min), onlinebalance_min, excluded.onlinebalance_min),
+                onlinebalance_max = COALESCE(MAX(onlinebalance_max, excluded.onlinebalance_max), onlinebalance_max, excluded.onlinebalance_max),
+                lifetimeearnings_first = CASE WHEN excluded.first_time < first_time THEN excluded.lifetimeearnings_first ELSE lifetimeearnings_first END,
+                lifetimeearnings_last = CASE WHEN excluded.last_time >= last_time THEN excluded.lifetimeearnings_last ELSE lifetimeearnings_last END,
+                lifetimeearnings_min = COALESCE(MIN(lifetimeearnings_min, excluded.lifetimeearnings_min), lifetimeearnings_min, excluded.lifetimeearnings_min),
+                lifetimeearnings_max = COALESCE(MAX(lifetimeearnings_max, excluded.lifetimeearnings_max), lifetimeearnings_max, excluded.lifetimeearnings_max),
+                xp_first = CASE WHEN excluded.first_time < first_time THEN excluded.xp_first ELSE xp_first END,
+                xp_last = CASE WHEN excluded.last_time >= last_time THEN excluded.xp_last ELSE xp_last END,
+                xp_min = COALESCE(MIN(xp_min, excluded.xp_min), xp_min, excluded.xp_min),
+                xp_max = COALESCE(MAX(xp_max, excluded.xp_max), xp_max, excluded.xp_max);
+        END;
+
+        -- rows can arrive out of log_time order, e.g. from import: a row joins the session it falls into or is
+        -- less than rollup_session_gap seconds away from, and a row closing the gap between two sessions merges them
+        CREATE TRIGGER IF NOT EXISTS 'logs_rollup_sessions' AFTER INSERT ON 'logs'
+        BEGIN
+            UPDATE sessions SET
+                rows = rows + 1,
+                first_log_id = CASE WHEN NEW.log_time < start_time THEN NEW.log_id ELSE first_log_id END,
+                last_log_id = CASE WHEN NEW.log_time >= end_time THEN NEW.log_id ELSE last_log_id END,
+                start_time = MIN(start_time, NEW.log_time),
+                end_time = MAX(end_time, NEW.log_time),
+                networth_first = CASE WHEN NEW.log_time < start_time THEN NEW.networth ELSE networth_first END,
+                networth_last = CASE WHEN NEW.log_time >= end_time THEN NEW.networth ELSE networth_last END,
+                networth_min = COALESCE(MIN(networth_min, NEW.networth), networth_min, NEW.networth),
+                networth_max = COALESCE(MAX(networth_max, NEW.networth), networth_max, NEW.networth),
+                onlinebalance_first = CASE WHEN NEW.log_time < start_time THEN NEW.onlinebalance ELSE onlinebalance_first END,
+                onlinebalance_last = CASE WHEN NEW.log_time >= end_time THEN NEW.onlinebalance ELSE onlinebalance_last END,
+                onlinebalance_min = COALESCE(MIN(onlinebalance_min, NEW.onlinebalance), onlinebalance_min, NEW.onlinebalance),
+                onlinebalance_max = COALESCE(MAX(onlinebalance_max, NEW.onlinebalance), onlinebalance_max, NEW.onlinebalance),
+                lifetimeearnings_first = CASE WHEN NEW.log_time < start_time THEN NEW.lifetimeearnings ELSE lifetimeearnings_first END,
+                lifetimeearnings_last = CASE WHEN NEW.log_time >= end_time THEN NEW.lifetimeearnings ELSE lifetimeearnings_last END,
+                lifetimeearnings_min = COALESCE(MIN(lifetimeearnings_min, NEW.lifetimeearnings), lifetimeearnings_min, NEW.lifetimeearnings),
+                lifetimeearnings_max = COALESCE(MAX(lifetimeearnings_max, NEW.lifetimeearnings), lifetimeearnings_max, NEW.lifetimeearnings),
+                xp_first = CASE WHEN NEW.log_time < start_time THEN NEW.xp ELSE xp_first END,
+                xp_last = CASE WHEN NEW.log_time >= end_time THEN NEW.xp ELSE xp_last END,
+                xp_min = COALESCE(MIN(xp_min, NEW.xp), xp_min, NEW.xp),
+                xp_max = COALESCE(MAX(xp_max, NEW.xp), xp_max, NEW.xp)
+            WHERE session_id = (
+                -- sessions don't overlap, only the two starting last before the row can be close enough
+                SELECT session_id
+                FROM (
+                    SELECT session_id, start_time, end_time
+                    FROM sessions
+                    WHERE save_id = NEW.save_id AND start_time <= NEW.log_time + {rollup_session_gap}
+                    ORDER BY start_time DESC
+                    LIMIT 2
+                )
+                WHERE end_time >= NEW.log_time - {rollup_session_gap}
+                ORDER BY start_time
+                LIMIT 1
+            );
+
+            -- the session starting after the row is now close enough to the one the row joined, its summary is merged in
+            INSERT INTO sessions (
+                session_id, save_id, rows, first_log_id, last_log_id, start_time, end_time,
+                networth_first, networth_last, networth_min, networth_max,
+                onlinebalance_first, onlinebalance_last, onlinebalance_min, onlinebalance_max,
+                lifetimeearnings_first, lifetimeearnings_last, lifetimeearnings_min, lifetimeearnings_max,
+                xp_first, xp_last, xp_min, xp_max
+            )
+            SELECT
+                joined.session_id, following.save_id, following.rows, following.first_log_id, following.last_log_id, following.start_time, following.end_time,
+                following.networth_first, following.networth_last, following.networth_min, following.networth_max,
+                following.onlinebalance_first, following.onlinebalance_last, following.onlinebalance_min, following.onlinebalance_max,
+                following.lifetimeearnings_first, following.lifetimeearnings_last, following.lifetimeearnings_min, following.lifetimeearnings_max,
+                following.xp_first, following.xp_last, following.xp_min, following.xp_max
+            FROM (
+                SELECT *
+                FROM sessions
+                WHERE save_id = NEW.save_id AND start_time > NEW.log_time AND start_time <= NEW.log_time + {rollup_session_gap}
+                ORDER BY start_time
+                LIMIT 1
+            ) AS following
+            JOIN (
+                SELECT session_id, end_time
+                FROM sessions
+                WHERE save_id = NEW.save_id AND start_time <= NEW.log_time
+                ORDER BY start_time DESC
+                LIMIT 1
+            ) AS joined ON joined.end_time >= NEW.log_time
+            WHERE true
+            ON CONFLICT (session_id) DO UPDATE SET
+                rows = rows + excluded.rows,
+                last_log_id = excluded.last_log_id,
+                end_time = excluded.end_time,
+                networth_last = excluded.networth_last,
+                networth_min = COALESCE(MIN(networth_min, excluded.networth_min), networth_min, excluded.networth_min),
+                networth_max = COALESCE(MAX(networth_max, excluded.networth_max), networth_max, excluded.networth_max),
+                onlinebalance_last = excluded.onlinebalance_last,
+                onlinebalance_min = COALESCE(MIN(onlinebalance_min, excluded.onlinebalance_min), onlinebalance_min, excluded.onlinebalance_min),
+                onlinebalance_max = COALESCE(MAX(onlinebalance_max, excluded.onlinebalance_max), onlinebalance_max, excluded.onlinebalance_max),
+                lifetimeearnings_last = excluded.lifetimeearnings_last,
+                lifetimeearnings_min = COALESCE(MIN(lifetimeearnings_min, excluded.lifetimeearnings_min), lifetimeearnings_min, excluded.lifetimeearnings_min),
+                lifetimeearnings_max = COALESCE(MAX(lifetimeearnings_max, excluded.lifetimeearnings_max), lifetimeearnings_max, excluded.lifetimeearnings_max),
+                xp_last = excluded.xp_last,
+                xp_min = COALESCE(MIN(xp_min, excluded.xp_min), xp_min, excluded.xp_min),
+                xp_max = COALESCE(MAX(xp_max, excluded.xp_max), xp_max, excluded.xp_max);
+
+            DELETE FROM sessions
+            WHERE session_id = (
+                SELECT session_id
+                FROM sessions
+                WHERE save_id = NEW.save_id AND start_time > NEW.log_time AND start_time <= NEW.log_time + {rollup_session_gap}
+                ORDER BY start_time
+                LIMIT 1
+            );
+
+            INSERT INTO sessions (
+                save_id, rows, first_log_id, last_log_id, start_time, end_time,
+                networth_first, networth_last, networth_min, networth_max,
+                onlinebalance_first, onlinebalance_last, onlinebalance_min, onlinebalance_max,
+                lifetimeearnings_first, lifetimeearnings_last, lifetimeearnings_min, lifetimeearnings_max,
+                xp_first, xp_last, xp_min, xp_max
+            )
+            SELECT
+                NEW.save_id, 1, NEW.log_id, NEW.log_id, NEW.log_time, NEW.log_time,
+                NEW.networth, NEW.networth, NEW.networth, NEW.networth,
+                NEW.onlinebalance, NEW.onlinebalance, NEW.onlinebalance, NEW.onlinebalance,
+                NEW.lifetimeearnings, NEW.lifetimeearnings, NEW.lifetimeearnings, NEW.lifetimeearnings,
+                NEW.xp, NEW.xp, NEW.xp, NEW.xp
+            WHERE NOT EXISTS (
+                SELECT 1
+                FROM (SELECT end_time FROM sessions WHERE save_id = NEW.save_id AND start_time <= NEW.log_time ORDER BY start_time DESC LIMIT 1)
+                WHERE end_time >= NEW.log_time
+            );
+        END;
+    '''
+
+    # the summaries computed from all log rows, for databases logged before they existed and after changing rollup_session_gap
+    db_rollups_rebuild: str = f'''
+        DELETE FROM days;
+        DELETE FROM sessions;
+
+        INSERT INTO days (
+            save_id, elapseddays, rows, first_log_id, last_log_id, first_time, last_time,
+            networth_first, networth_last, networth_min, networth_max,
+            onlinebalance_first, onlinebalance_last, onlinebalance_min, onlinebalance_max,
+            lifetimeearnings_first, lifetimeearnings_last, lifetimeearnings_min, lifetimeearnings_max,
+            xp_first, xp_last, xp_min, xp_max
+        )
+        SELECT
+            g.save_id, g.elapseddays, g.rows, g.first_log_id, g.last_log_id, f.log_time, l.log_time,
+            f.networth, l.networth, g.networth_min, g.networth_max,
+            f.onlinebalance, l.onlinebalance, g.onlinebalance_min, g.onlinebalance_max,
+            f.lifetimeearnings, l.lifetimeearnings, g.lifetimeearnings_min, g.lifetimeearnings_max,
+            f.xp, l.xp, g.xp_min, g.xp_max
+        FROM (
+            SELECT
+                save_id,
+                elapseddays,
+                COUNT(*) AS rows,
+                MIN(first_id) AS first_log_id,
+                MIN(last_id) AS last_log_id,
+                MIN(networth) AS networth_min,
+                MAX(networth) AS networth_max,
+                MIN(onlinebalance) AS onlinebalance_min,
+                MAX(onlinebalance) AS onlinebalance_max,
+                MIN(lifetimeearnings) AS lifetimeearnings_min,
+                MAX(lifetimeearnings) AS lifetimeearnings_max,
+                MIN(xp) AS xp_min,
+                MAX(xp) AS xp_max
+            FROM (
+                SELECT
+                    *,
+                    FIRST_VALUE(log_id) OVER w AS first_id,
+                    LAST_VALUE(log_id) OVER w AS last_id
+                FROM logs
+                WHERE elapseddays IS NOT NULL
+                WINDOW w AS (PARTITION BY save_id, elapseddays ORDER BY log_time, log_id ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING)
+            )
+            GROUP BY save_id, elapseddays
+        ) AS g
+        JOIN logs AS f ON f.log_id = g.first_log_id
+        JOIN logs AS l ON l.log_id = g.last_log_id;
+
+        INSERT INTO sessions (
+            save_id, rows, first_log_id, last_log_id, start_time, end_time,
+            networth_first, networth_last, networth_min, networth_max,
+            onlinebalance_first, onlinebalance_last, onlinebalance_min, onlinebalance_max,
+            lifetimeearnings_first, lifetimeearnings_last, lifetimeearnings_min, lifetimeearnings_max,
+            xp_first, xp_last, xp_min, xp_max
+        )
+        SELECT
+            g.save_id, g.rows, g.first_log_id, g.last_log_id, f.log_time, g.end_time,
+            f.networth, l.networth, g.networth_min, g.networth_max,
+            f.onlinebalance, l.onlinebalance, g.onlinebalance_min, g.onlinebalance_max,
+            f.lifetimeearnings, l.lifetimeearnings, g.lifetimeearnings_min, g.lifetimeearnings_max,
+            f.xp, l.xp, g.xp_min, g.xp_max
+        FROM (
+            SELECT
+                save_id,
+                COUNT(*) AS rows,
+                MIN(first_id) AS first_log_id,
+                MIN(last_id) AS last_log_id,
+                MAX(log_time) AS end_time,
+                MIN(networth) AS networth_min,
+                MAX(networth) AS networth_max,
+                MIN(onlinebalance) AS onlinebalance_min,
+                MAX(onlinebalance) AS onlinebalance_max,
+                MIN(lifetimeearnings) AS lifetimeearnings_min,
+                MAX(lifetimeearnings) AS lifetimeearnings_max,
+                MIN(xp) AS xp_min,
+                MAX(xp) AS xp_max
+            FROM (
+                SELECT
+                    *,
+                    FIRST_VALUE(log_id) OVER w AS first_id,
+                    LAST_VALUE(log_id) OVER w AS last_id
+                FROM (
+                    -- a new session after a gap to the row logged before it
+                    SELECT *, SUM(new_session) OVER (PARTITION BY save_id ORDER BY log_time, log_id) AS session
+                    FROM (
+                        SELECT
+                            log_id, log_time, save_id, networth, onlinebalance, lifetimeearnings, xp,
+                            COALESCE(log_time - LAG(log_time) OVER (PARTITION BY save_id ORDER BY log_time, log_id) > {rollup_session_gap}, 1) AS new_session
+                        FROM logs
+                    )
+                )
+                WINDOW w AS (PARTITION BY save_id, session ORDER BY log_time, log_id ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING)
+            )
+            GROUP BY save_id, session
+        ) AS g
+        JOIN logs AS f ON f.log_id = g.first_log_id
+        JOIN logs AS l ON l.log_id = g.last_log_id
+        ORDER BY f.log_time, g.first_log_id;
+    '''
+
+    # applied in order on top of db_schema, the database's user_version is the number of applied migrations
+    db_migrations: list[str] = [
+        # 1: change detection and history lookups per save, rows in log_time order for retention, imported rows are older than the ones logged before them
+        '''
+        CREATE INDEX IF NOT EXISTS 'logs_save_id_log_id' ON 'logs' ('save_id', 'log_id');
+        CREATE INDEX IF NOT EXISTS 'logs_save_id_log_time' ON 'logs' ('save_id', 'log_time');
+        CREATE INDEX IF NOT EXISTS 'logs_log_time' ON 'logs' ('log_time');
+        ''',
+        # 2: --snapshots, save files stored once per content hash and linked to the log rows
+        '''
+        CREATE TABLE IF NOT EXISTS 'blobs' (
+            'hash' BLOB NOT NULL,
+
+            'codec' TEXT NOT NULL,
+            'size' INTEGER NOT NULL,
+            'data' BLOB NOT NULL,
+
+            PRIMARY KEY('hash')
+        ) WITHOUT ROWID;
+
+        CREATE TABLE IF NOT EXISTS 'snapshots' (
+            'log_id' INTEGER NOT NULL,
+            'file' TEXT NOT NULL,
+            'hash' BLOB NOT NULL,
+
+            PRIMARY KEY('log_id', 'file'),
+            FOREIGN KEY ('log_id') REFERENCES 'logs'('log_id'),
+            FOREIGN KEY ('hash') REFERENCES 'blobs'('hash')
+        ) WITHOUT ROWID;
+
+        CREATE INDEX IF NOT EXISTS 'snapshots_hash' ON 'snapshots' ('hash');
+
+        CREATE TRIGGER IF NOT EXISTS 'logs_delete_snapshots' AFTER DELETE ON 'logs'
+        BEGIN
+            DELETE FROM 'snapshots' WHERE log_id = OLD.log_id;
+        END;
+        ''',
+        # 3: --snapshots, changed JSON files stored as patch against their previous content
+        '''
+        ALTER TABLE 'blobs' ADD COLUMN 'base' BLOB DEFAULT NULL REFERENCES 'blobs'('hash');
+        ALTER TABLE 'blobs' ADD COLUMN 'depth' INTEGER NOT NULL DEFAULT 0;
+
+        CREATE INDEX IF NOT EXISTS 'blobs_base' ON 'blobs' ('base') WHERE base IS NOT NULL;
+        ''',
+        # 4: one row per save profile, duplicates created by instances racing each other are merged into the oldest,
+        # one row per save and log_time, a row sent again through the writer queue is found by it
+        '''
+        CREATE TEMP TABLE 'saves_merge' AS
+        SELECT saves.save_id, MIN(first.save_id) AS first_save_id
+        FROM saves
+        JOIN saves AS first USING (save_dir, organisation, seed)
+        GROUP BY saves.save_id
+        HAVING saves.save_id != MIN(first.save_id);
+
+        UPDATE logs
+        SET save_id = (SELECT first_save_id FROM saves_merge WHERE saves_merge.save_id = logs.save_id)
+        WHERE save_id IN (SELECT save_id FROM saves_merge);
+
+        DELETE FROM saves WHERE save_id IN (SELECT save_id FROM saves_merge);
+
+        DROP TABLE saves_merge;
+
+        CREATE UNIQUE INDEX IF NOT EXISTS 'saves_profile' ON 'saves' ('save_dir', 'organisation', 'seed');
+
+        DELETE FROM logs
+        WHERE log_id NOT IN (SELECT MIN(log_id) FROM logs GROUP BY save_id, log_time);
+
+        DROP INDEX IF EXISTS 'logs_save_id_log_time';
+        CREATE UNIQUE INDEX 'logs_save_id_log_time' ON 'logs' ('save_id', 'log_time');
+        ''',
+        # 5: summaries per in-game day and per session, filled from the rows logged so far
+        db_rollups + db_rollups_rebuild,
+        # 6: small state kept across restarts, e.g. how far --retention got
+        '''
+        CREATE TABLE IF NOT EXISTS 'meta' (
+            'key' TEXT NOT NULL,
+            'value' NOT NULL,
+
+            PRIMARY KEY('key')
+        ) WITHOUT ROWID;
+        ''',
+    ]
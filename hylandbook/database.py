@@ -1,26 +1,224 @@
+import random
 import sqlite3
+import time
 from pathlib import Path
+from typing import Callable
 
 
 
 
 class DatabaseSQLite:
     file: Path
+    pragmas: dict[str, str | int]
+    cached_statements: int
+    group_commit_window: float
+    busy_retries: int
+    busy_backoff: float
 
+    con: sqlite3.Connection | None = None
+    cur: sqlite3.Cursor | None = None
+    pending: int = 0
+    pending_since: float = 0
+    # pages incremental_vacuum() asked the next commit to release
+    vacuum_pages: int = 0
 
-    def __init__(self, file: Path) -> None:
+    busy_waits: int = 0
+    freed_pages: int = 0
+
+
+    def __init__(self, file: Path, pragmas: dict[str, str | int] | None = None, cached_statements: int = 128, group_commit_window: float = 0, busy_retries: int = 5, busy_backoff: float = 0.05) -> None:
         self.file = file
+        self.pragmas = pragmas or {}
+        self.cached_statements = cached_statements
+        self.group_commit_window = group_commit_window
+        self.busy_retries = busy_retries
+        self.busy_backoff = busy_backoff
 
 
     def connect(self, row_factory: object | None = sqlite3.Row) -> tuple[sqlite3.Connection, sqlite3.Cursor]:
-        con = sqlite3.connect(database=self.file)
+        # write transactions take the write lock with their first statement, a transaction that has
+        # already read can't fail halfway through on the lock of another instance
+        con = sqlite3.connect(database=self.file, isolation_level='IMMEDIATE')
         if row_factory:
             con.row_factory = row_factory
         cur = con.cursor()
         return (con, cur)
 
 
-    def vacuum(self) -> None:
+    def open(self, row_factory: object | None = sqlite3.Row) -> tuple[sqlite3.Connection, sqlite3.Cursor]:
+        if self.con and self.cur:
+            return (self.con, self.cur)
+
+        # statements are prepared once per connection and reused from its cache
+        self.con = sqlite3.connect(database=self.file, cached_statements=self.cached_statements, isolation_level='IMMEDIATE')
+        if row_factory:
+            self.con.row_factory = row_factory
+        self.cur = self.con.cursor()
+
+        for k, v in self.pragmas.items():
+            self.cur.execute(f'PRAGMA {k} = {v};')
+
+        return (self.con, self.cur)
+
+
+    def execute(self, sql: str, params: dict | tuple = ()) -> sqlite3.Cursor:
+        con, cur = self.open()
+        return cur.execute(sql, params)
+
+
+    def retry(self, fn: Callable, *args) -> object:
+        # other instances writing to the same file, busy_timeout has already waited once
+        for attempt in range(self.busy_retries + 1):
+            try:
+                return fn(*args)
+            except sqlite3.OperationalError as e:
+                if attempt >= self.busy_retries or not any(m in str(e) for m in ('locked', 'busy')):
+                    raise
+                self.busy_waits += 1
+                time.sleep(self.busy_backoff * 2 ** attempt * random.uniform(0.5, 1.5))
+
+
+    def write(self, sql: str, params: dict | tuple = ()) -> sqlite3.Cursor:
+        con, cur = self.open()
+        self.retry(cur.execute, sql, params)
+
+        if not self.pending:
+            self.pending_since = time.monotonic()
+        self.pending += 1
+
+        return cur
+
+
+    def write_many(self, sql: str, params: list[dict] | list[tuple]) -> sqlite3.Cursor:
+        con, cur = self.open()
+        self.retry(cur.executemany, sql, params)
+
+        if not self.pending:
+            self.pending_since = time.monotonic()
+        self.pending += len(params)
+
+        return cur
+
+
+    def commit(self, force: bool = False) -> bool:
+        # a statement that failed may have opened the transaction, it would hold the write lock until the next write
+        if not self.con or not (self.pending or self.con.in_transaction):
+            return False
+
+        if not force and time.monotonic() - self.pending_since < self.group_commit_window:
+            return False
+
+        if self.vacuum_pages:
+            self._vacuum()
+
+        self.retry(self.con.commit)
+        self.pending = 0
+
+        return True
+
+
+    def commit_due_in(self) -> float | None:
+        if not self.pending:
+            return None
+
+        return max(0, self.pending_since + self.group_commit_window - time.monotonic())
+
+
+    def close(self) -> None:
+        if not self.con:
+            return
+
+        self.commit(force=True)
+        self.con.close()
+        self.con = None
+        self.cur = None
+
+
+    def upgrade(self, migrations: list[str]) -> list[int]:
+        applied: list[int] = []
+
+        con, cur = self.connect()
+        con.isolation_level = None
+        try:
+            while True:
+                # the version is read under the write lock, instances starting together apply each migration once
+                cur.execute('BEGIN IMMEDIATE;')
+                version: int = cur.execute('PRAGMA user_version;').fetchone()[0]
+                if version >= len(migrations):
+                    cur.execute('COMMIT;')
+                    break
+
+                try:
+                    for statement in self.statements(migrations[version]):
+                        cur.execute(statement)
+                    cur.execute(f'PRAGMA user_version = {version + 1};')
+                    cur.execute('COMMIT;')
+                except sqlite3.Error:
+                    cur.execute('ROLLBACK;')
+                    raise
+
+                applied.append(version + 1)
+        finally:
+            con.close()
+
+        return applied
+
+
+    def run_script(self, sql: str) -> None:
+        # all statements or none, executescript() would commit after each
         con, cur = self.connect()
-        cur.execute('VACUUM;')
+        con.isolation_level = None
+        try:
+            cur.execute('BEGIN IMMEDIATE;')
+            try:
+                for statement in self.statements(sql):
+                    cur.execute(statement)
+                cur.execute('COMMIT;')
+            except sqlite3.Error:
+                cur.execute('ROLLBACK;')
+                raise
+        finally:
+            con.close()
+
+
+    @staticmethod
+    def statements(sql: str) -> list[str]:
+        # executescript() would commit first, split the script so it runs inside one transaction
+        statements: list[str] = []
+        statement: str = ''
+
+        for line in sql.splitlines(keepends=True):
+            statement += line
+            if sqlite3.complete_statement(statement):
+                statements.append(statement.strip())
+                statement = ''
+
+        if statement.strip():
+            statements.append(statement.strip())
+
+        return statements
+
+
+    def vacuum(self, into: Path | None = None, auto_vacuum: str | None = None) -> None:
+        con, cur = self.connect()
+        if auto_vacuum:
+            # takes effect with the following VACUUM
+            cur.execute(f'PRAGMA auto_vacuum = {auto_vacuum};')
+        if into:
+            cur.execute('VACUUM INTO ?;', (str(into),))
+        else:
+            cur.execute('VACUUM;')
         con.close()
+
+
+    def incremental_vacuum(self, pages: int) -> None:
+        # runs with the next group commit, in the same transaction as the rows written since the last one
+        self.vacuum_pages = pages
+
+
+    def _vacuum(self) -> None:
+        # only frees pages if the database was created with auto_vacuum = INCREMENTAL
+        before: int = self.cur.execute('PRAGMA freelist_count;').fetchone()[0]
+        self.cur.execute(f'PRAGMA incremental_vacuum({self.vacuum_pages});').fetchall()
+        self.freed_pages += before - self.cur.execute('PRAGMA freelist_count;').fetchone()[0]
+        self.vacuum_pages = 0
@@ -0,0 +1,219 @@
+import time
+from collections import deque
+from typing import Callable
+
+
+
+
+# name -> {'fn', 'inputs', 'history', 'export'}, filled by @metric, also from outside this module
+registry: dict[str, dict] = {}
+
+
+
+
+def metric(name: str, inputs: list[str], history: bool = False, export: bool = True) -> Callable:
+    # fn(engine, values, history) -> value, values holds the save's log and profile values and the derived values
+    # listed in inputs, history the save's logged rows of the last history_window seconds, oldest first
+    def register(fn: Callable) -> Callable:
+        registry[name] = {'fn': fn, 'inputs': inputs, 'history': history, 'export': export}
+        return fn
+
+    return register
+
+
+
+
+class DerivedMetrics:
+    Clock: Callable[[], float] = time.time
+
+    names: list[str]
+    history_window: float
+    history_rows: int
+    session_gap: float
+    tier_xp: list[int]
+    tiers: int
+
+    # (name, fn, inputs, history), every metric after the ones it depends on
+    plan: list[tuple[str, Callable, list[str], bool]]
+    # save_id -> {'history': deque of rows, 'version': rows appended so far, 'inputs': name -> inputs, 'values': name -> value}
+    states: dict[int, dict]
+
+    computed: int = 0
+    reused: int = 0
+
+
+    def __init__(self, names: list[str], history_window: float = 12 * 60 * 60, history_rows: int = 10000, session_gap: float = 30 * 60, tier_xp: list[int] | None = None, tiers: int = 5) -> None:
+        self.names = names
+        self.history_window = history_window
+        self.history_rows = history_rows
+        self.session_gap = session_gap
+        self.tier_xp = tier_xp or [1000]
+        self.tiers = tiers
+        self.states = {}
+        self.plan = self._compile(names)
+
+
+    @property
+    def exported(self) -> list[str]:
+        return [name for name in self.names if registry[name]['export']]
+
+
+    def _compile(self, names: list[str]) -> list[tuple[str, Callable, list[str], bool]]:
+        plan: list[tuple[str, Callable, list[str], bool]] = []
+        done: set[str] = set()
+        visiting: set[str] = set()
+
+        def visit(name: str) -> None:
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"derived metric depends on itself: {name}")
+
+            visiting.add(name)
+            for i in registry[name]['inputs']:
+                # everything else comes from the save's values
+                if i in registry:
+                    visit(i)
+            visiting.discard(name)
+
+            done.add(name)
+            plan.append((name, registry[name]['fn'], registry[name]['inputs'], registry[name]['history']))
+
+        for name in names:
+            if name not in registry:
+                raise ValueError(f"unknown derived metric: {name}")
+            visit(name)
+
+        return plan
+
+
+    def _state(self, save_id: int) -> dict:
+        return self.states.setdefault(save_id, {'history': deque(maxlen=self.history_rows), 'version': 0, 'inputs': {}, 'values': {}})
+
+
+    def load(self, save_id: int, rows: list[dict]) -> None:
+        # the rows logged before, read once at start
+        state: dict = self._state(save_id)
+        state['history'].extend(rows)
+        state['version'] += 1
+        self._trim(state)
+
+
+    def append(self, save_id: int, row: dict) -> None:
+        # a row was logged, metrics using the history are computed again
+        state: dict = self._state(save_id)
+        state['history'].append(row)
+        state['version'] += 1
+        self._trim(state)
+
+
+    def _trim(self, state: dict) -> None:
+        history: deque = state['history']
+        since: float = self.Clock() - self.history_window
+        while len(history) > 1 and history[0]['_t'] < since:
+            history.popleft()
+
+
+    def evaluate(self, save_id: int, values: dict) -> dict:
+        # only metrics whose inputs changed since the last call for this save are computed
+        state: dict = self._state(save_id)
+        history: deque = state['history']
+        derived: dict = {}
+        merged: dict = {**values}
+
+        for name, fn, inputs, uses_history in self.plan:
+            key: tuple = (*[merged.get(i) for i in inputs], state['version'] if uses_history else None)
+
+            if name in state['values'] and state['inputs'].get(name) == key:
+                value: object = state['values'][name]
+                self.reused += 1
+            else:
+                try:
+                    value = fn(self, merged, history)
+                except (TypeError, ValueError, ZeroDivisionError, KeyError):
+                    value = None
+                state['inputs'][name] = key
+                state['values'][name] = value
+                self.computed += 1
+
+            merged[name] = value
+            derived[name] = value
+
+        return {name: derived[name] for name in self.exported}
+
+
+    def xp_per_tier(self, rank: int) -> int:
+        # the last entry is used for all higher ranks
+        return self.tier_xp[min(max(rank, 0), len(self.tier_xp) - 1)]
+
+
+
+
+def ingame_minutes(row: dict) -> int | None:
+    # timeofday is HHMM
+    if row.get('elapseddays') is None or row.get('timeofday') is None:
+        return None
+    return row['elapseddays'] * 24 * 60 + row['timeofday'] // 100 * 60 + row['timeofday'] % 100
+
+
+@metric('session_start', inputs=[], history=True, export=False)
+def session_start(engine: DerivedMetrics, values: dict, history: deque) -> dict | None:
+    # first row after the last gap of more than session_gap seconds, sessions longer than history_window start with its oldest row
+    start: dict | None = None
+
+    for row in reversed(history):
+        if start is not None and start['_t'] - row['_t'] > engine.session_gap:
+            break
+        start = row
+
+    if start is None or engine.Clock() - history[-1]['_t'] > engine.session_gap:
+        # nothing logged yet in this session
+        return None
+
+    return start
+
+
+@metric('session_earnings', inputs=['lifetimeearnings', 'session_start'])
+def session_earnings(engine: DerivedMetrics, values: dict, history: deque) -> float | None:
+    start: dict | None = values['session_start']
+    if start is None:
+        return 0.0
+    return round(values['lifetimeearnings'] - start['lifetimeearnings'], 2)
+
+
+@metric('earnings_per_ingame_hour', inputs=['session_earnings', 'session_start', 'elapseddays', 'timeofday'])
+def earnings_per_ingame_hour(engine: DerivedMetrics, values: dict, history: deque) -> float | None:
+    start: dict | None = values['session_start']
+    if start is None:
+        return None
+
+    minutes: int = ingame_minutes(values) - ingame_minutes(start)
+    if minutes <= 0:
+        return None
+
+    return round(values['session_earnings'] / (minutes / 60), 2)
+
+
+@metric('xp_to_next_tier', inputs=['rank', 'xp'])
+def xp_to_next_tier(engine: DerivedMetrics, values: dict, history: deque) -> int:
+    return max(0, engine.xp_per_tier(values['rank']) - values['xp'])
+
+
+@metric('xp_to_next_rank', inputs=['rank', 'tier', 'xp_to_next_tier'])
+def xp_to_next_rank(engine: DerivedMetrics, values: dict, history: deque) -> int:
+    # tiers count from 1
+    return values['xp_to_next_tier'] + max(0, engine.tiers - values['tier']) * engine.xp_per_tier(values['rank'])
+
+
+@metric('networth_delta_yesterday', inputs=['networth', 'elapseddays'], history=True)
+def networth_delta_yesterday(engine: DerivedMetrics, values: dict, history: deque) -> float | None:
+    # against the last row logged on the in-game day before
+    yesterday: int = values['elapseddays'] - 1
+
+    for row in reversed(history):
+        if row['elapseddays'] == yesterday:
+            return round(values['networth'] - row['networth'], 2)
+        if row['elapseddays'] < yesterday:
+            break
+
+    return None
@@ -0,0 +1,153 @@
+import csv
+import io
+import json
+import os
+import time
+from pathlib import Path
+
+
+
+
+class Exporter:
+    data_dir: Path
+    types: list[str]
+    keys: list[str]
+    # with chosen keys, current.json and current.txt leave out the keys without a value (0, '', None)
+    omit_empty: bool
+    replace_retries: int
+    replace_retry_delay: float
+
+    # (type, keys) -> template, one per set of keys that had a value
+    templates: dict[tuple[str, tuple[str, ...]], str]
+    last: dict[Path, bytes]
+    # csv files whose header was compared with keys, once per run
+    checked: set[Path]
+
+    bytes_written: int = 0
+
+
+    def __init__(self, data_dir: Path, types: list[str], keys: list[str], all_keys: list[str], replace_retries: int = 10, replace_retry_delay: float = 0.05) -> None:
+        self.data_dir = data_dir
+        self.types = types
+        self.keys = all_keys if 'all' in keys else list(dict.fromkeys(keys))
+        self.omit_empty = 'all' not in keys
+        self.replace_retries = replace_retries
+        self.replace_retry_delay = replace_retry_delay
+        self.last = {}
+        self.checked = set()
+        self.templates = {}
+
+
+    def _template(self, t: str, keys: tuple[str, ...]) -> str:
+        if (t, keys) in self.templates:
+            return self.templates[(t, keys)]
+
+        # values are filled in with % so the JSON braces need no escaping
+        template: str = ''
+        if t == 'json':
+            template = '{\n' + ',\n'.join([f'    {json.dumps(k)}: %s' for k in keys]) + '\n}' if keys else '{}'
+        if t == 'txt':
+            indent: int = max([len(k) for k in keys], default=0)
+            template = '\n'.join([f"{k:>{indent}}  %s" for k in keys])
+        if t == 'ndjson':
+            template = '{' + ', '.join([f'{json.dumps(k)}: %s' for k in keys]) + '}\n'
+
+        self.templates[(t, keys)] = template
+
+        return template
+
+
+    def export(self, row: dict, suffix: str = '') -> int:
+        written: int = 0
+        keys: tuple[str, ...] = tuple(self.keys)
+        current: tuple[str, ...] = tuple([k for k in keys if row.get(k)]) if self.omit_empty else keys
+
+        for t in self.types:
+            if t == 'json':
+                written += self._publish(
+                    self.data_dir.joinpath(f'current{suffix}.json'),
+                    self._template('json', current) % tuple([json.dumps(row.get(k)) for k in current]),
+                )
+
+            if t == 'txt':
+                written += self._publish(
+                    self.data_dir.joinpath(f'current{suffix}.txt'),
+                    self._template('txt', current) % tuple([row.get(k) for k in current]),
+                )
+
+            if t == 'ndjson':
+                written += self._append(
+                    self.data_dir.joinpath(f'history{suffix}.ndjson'),
+                    self._template('ndjson', keys) % tuple([json.dumps(row.get(k)) for k in keys]),
+                )
+
+            if t == 'csv':
+                file: Path = self.data_dir.joinpath(f'history{suffix}.csv')
+                header: str = self._csv_line(self.keys)
+                if file not in self.checked:
+                    self._rotate_csv(file, header)
+                    self.checked.add(file)
+                line: str = self._csv_line([row.get(k) for k in self.keys])
+                if not file.exists() or file.stat().st_size == 0:
+                    line = header + line
+                written += self._append(file, line)
+
+        self.bytes_written += written
+
+        return written
+
+
+    @staticmethod
+    def _csv_line(values: list) -> str:
+        buf = io.StringIO()
+        csv.writer(buf, lineterminator='\n').writerow(values)
+        return buf.getvalue()
+
+
+    def _rotate_csv(self, file: Path, header: str) -> None:
+        # a file written with other export keys is moved aside, its rows would not line up with the new columns
+        if not file.is_file() or file.stat().st_size == 0:
+            return
+
+        with file.open('rb') as f:
+            if f.readline() == header.encode('utf-8'):
+                return
+
+        file.rename(file.with_name(f"{file.stem}_{time.strftime('%Y%m%d_%H%M%S')}{file.suffix}"))
+
+
+    def _publish(self, file: Path, text: str) -> int:
+        data: bytes = text.encode('utf-8')
+
+        if file not in self.last and file.is_file():
+            self.last[file] = file.read_bytes()
+
+        if self.last.get(file) == data:
+            return 0
+
+        # readers like OBS must never see a half written file
+        tmp: Path = file.with_name(f'.{file.name}.{os.getpid()}.tmp')
+        tmp.write_bytes(data)
+
+        for attempt in range(self.replace_retries):
+            try:
+                os.replace(tmp, file)
+                break
+            except PermissionError:
+                # on Windows the target can be briefly locked by a reader
+                if attempt == self.replace_retries - 1:
+                    raise
+                time.sleep(self.replace_retry_delay)
+
+        self.last[file] = data
+
+        return len(data)
+
+
+    def _append(self, file: Path, text: str) -> int:
+        data: bytes = text.encode('utf-8')
+
+        with file.open('ab') as f:
+            f.write(data)
+
+        return len(data)
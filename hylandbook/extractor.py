@@ -0,0 +1,89 @@
+from typing import Callable
+
+
+
+
+class Extractor:
+    aggregates: dict[str, Callable] = {
+        'len': len,
+        'sum': sum,
+    }
+
+    sql_types: dict[type, str] = {
+        str: 'TEXT',
+        int: 'INTEGER',
+        float: 'REAL',
+    }
+
+    plan: list[tuple[str, list[tuple], dict[tuple[str, ...], str] | None]]
+    columns: list[str]
+    compare_columns: list[str]
+    column_types: dict[str, str]
+
+
+    def __init__(self, fields: dict[str, list[dict]], stream_files: list[str] | None = None) -> None:
+        self.plan = []
+        self.columns = []
+        self.compare_columns = []
+        self.column_types = {}
+
+        for sd_file, file_fields in fields.items():
+            steps: list[tuple] = []
+
+            for f in file_fields:
+                steps.append((
+                    f['col'],
+                    tuple(f['path'].split('.')),
+                    f['type'],
+                    f['default'],
+                    self.aggregates[f['aggregate']] if f.get('aggregate') else None,
+                ))
+
+                self.columns.append(f['col'])
+                self.column_types[f['col']] = self.sql_types[f['type']]
+                if f.get('compare', True):
+                    self.compare_columns.append(f['col'])
+
+            targets: dict[tuple[str, ...], str] | None = None
+            if stream_files and sd_file in stream_files:
+                # counted by the stream reader, no need to aggregate afterwards
+                targets = {path: 'len' if aggregate is len else 'value' for _, path, _, _, aggregate in steps}
+                steps = [(col, path, coerce, default, None if aggregate is len else aggregate) for col, path, coerce, default, aggregate in steps]
+
+            self.plan.append((sd_file, steps, targets))
+
+
+    def extract(self, load: Callable[[str], dict], scan: Callable[[str, dict], dict] | None = None) -> dict:
+        row: dict = {}
+
+        for sd_file, steps, targets in self.plan:
+            if targets is not None and scan:
+                row.update(self.extract_file(steps, scan(sd_file, targets), scanned=True))
+            else:
+                row.update(self.extract_file(steps, load(sd_file)))
+
+        return row
+
+
+    def extract_file(self, steps: list[tuple], data: dict, scanned: bool = False) -> dict:
+        row: dict = {}
+
+        for col, path, coerce, default, aggregate in steps:
+            value: object = data
+
+            if scanned:
+                value = data.get(path)
+            else:
+                for key in path:
+                    value = value.get(key) if isinstance(value, dict) else None
+
+            if not value:
+                row[col] = default
+                continue
+
+            try:
+                row[col] = coerce(aggregate(value) if aggregate else value)
+            except (TypeError, ValueError):
+                row[col] = default
+
+        return row
@@ -0,0 +1,120 @@
+import csv
+import io
+import sqlite3
+from pathlib import Path
+from typing import BinaryIO
+
+import hylandbook.database
+
+
+
+
+class HistoryExport:
+    formats: list[str] = ['csv', 'ndjson', 'sqlite']
+
+    Database: hylandbook.database.DatabaseSQLite
+    fetch_size: int
+
+    rows: int = 0
+
+
+    def __init__(self, database: hylandbook.database.DatabaseSQLite, fetch_size: int = 10000) -> None:
+        self.Database = database
+        self.fetch_size = fetch_size
+
+
+    def columns(self) -> list[str]:
+        # logs columns with the save columns after save_id
+        con, cur = self.Database.connect(row_factory=None)
+        try:
+            logs: list[str] = [row[1] for row in cur.execute("PRAGMA table_info('logs');")]
+            saves: list[str] = [row[1] for row in cur.execute("PRAGMA table_info('saves');") if row[1] != 'save_id']
+        finally:
+            con.close()
+
+        i: int = logs.index('save_id') + 1
+        return [*logs[:i], *saves, *logs[i:]]
+
+
+    def _query(self, select: str, save_ids: list[int] | None, since: float | None, until: float | None) -> tuple[str, list]:
+        where: list[str] = []
+        params: list = []
+
+        if save_ids:
+            where.append(f"logs.save_id IN ({', '.join(['?'] * len(save_ids))})")
+            params.extend(save_ids)
+        if since is not None:
+            where.append('logs.log_time >= ?')
+            params.append(since)
+        if until is not None:
+            where.append('logs.log_time < ?')
+            params.append(until)
+
+        sql: str = f'''
+            SELECT {select}
+            FROM logs
+            JOIN saves ON saves.save_id = logs.save_id
+            {'WHERE ' + ' AND '.join(where) if where else ''}
+            ORDER BY logs.log_time, logs.log_id;
+        '''
+
+        return (sql, params)
+
+
+    @staticmethod
+    def _column(column: str) -> str:
+        # save_id is the only column name in both tables
+        return 'logs.save_id' if column == 'save_id' else f'"{column}"'
+
+
+    def write(self, out: BinaryIO, format: str, columns: list[str], save_ids: list[int] | None = None, since: float | None = None, until: float | None = None) -> int:
+        # rows are passed on in fetchmany() batches of plain tuples, memory does not grow with the number of rows
+        if format == 'ndjson':
+            # SQLite builds the JSON lines, Python only joins and writes them
+            pairs: list[str] = [f"'{c}', {self._column(c)}" for c in columns]
+            select: str = f"json_object({', '.join(pairs)})"
+        else:
+            select: str = ', '.join(self._column(c) for c in columns)
+
+        sql, params = self._query(select, save_ids, since, until)
+
+        con, cur = self.Database.connect(row_factory=None)
+        try:
+            r: sqlite3.Cursor = cur.execute(sql, params)
+
+            if format == 'ndjson':
+                while batch := r.fetchmany(self.fetch_size):
+                    out.write(('\n'.join([row[0] for row in batch]) + '\n').encode())
+                    self.rows += len(batch)
+                return self.rows
+
+            # the C csv writer keeps up better than building quoted lines in SQL
+            text: io.TextIOWrapper = io.TextIOWrapper(out, encoding='utf-8', newline='')
+            writer = csv.writer(text, lineterminator='\n')
+            writer.writerow(columns)
+            while batch := r.fetchmany(self.fetch_size):
+                writer.writerows(batch)
+                self.rows += len(batch)
+            # flushes, out is left open for the caller
+            text.detach()
+        finally:
+            con.close()
+
+        return self.rows
+
+
+    def attach(self, file: Path, columns: list[str], save_ids: list[int] | None = None, since: float | None = None, until: float | None = None) -> int:
+        # copied from one database file to the other inside SQLite, no row ever becomes a Python object
+        sql, params = self._query(', '.join(f'{self._column(c)} AS "{c}"' for c in columns), save_ids, since, until)
+
+        con, cur = self.Database.connect(row_factory=None)
+        try:
+            cur.execute('ATTACH DATABASE ? AS export;', (str(file),))
+            cur.execute(f'CREATE TABLE export.logs AS {sql.strip().removesuffix(";")};', params)
+            con.commit()
+            self.rows = cur.execute('SELECT COUNT(*) FROM export.logs;').fetchone()[0]
+            cur.execute('DETACH DATABASE export;')
+        finally:
+            con.close()
+
+        return self.rows
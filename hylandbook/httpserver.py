@@ -0,0 +1,185 @@
+import collections
+import http.server
+import json
+import threading
+import urllib.parse
+from typing import Callable
+
+
+
+
+class OverlayServer:
+    host: str
+    port: int
+    cors_origin: str
+    keepalive: float
+    long_poll_timeout: float
+    metrics: Callable[[], str] | None
+
+    Server: http.server.ThreadingHTTPServer
+    Thread: threading.Thread
+
+    # save_id -> JSON of the latest row, serialized once and shared by all clients
+    snapshots: dict[int, bytes]
+    latest: int | None = None
+    events: collections.deque
+    event_id: int = 0
+    changed: threading.Condition
+    closed: bool = False
+
+
+    def __init__(self, host: str, port: int, cors_origin: str = '*', keepalive: float = 15, long_poll_timeout: float = 30, backlog: int = 100, metrics: Callable[[], str] | None = None) -> None:
+        self.host = host
+        self.port = port
+        self.cors_origin = cors_origin
+        self.keepalive = keepalive
+        self.long_poll_timeout = long_poll_timeout
+        self.metrics = metrics
+        self.snapshots = {}
+        self.events = collections.deque(maxlen=backlog)
+        self.changed = threading.Condition()
+
+
+    def start(self) -> None:
+        self.Server = http.server.ThreadingHTTPServer((self.host, self.port), OverlayRequestHandler)
+        self.Server.daemon_threads = True
+        self.Server.Overlay = self
+        self.port = self.Server.server_address[1]
+
+        self.Thread = threading.Thread(target=self.Server.serve_forever, name='overlay-http', daemon=True)
+        self.Thread.start()
+
+
+    def close(self) -> None:
+        with self.changed:
+            self.closed = True
+            self.changed.notify_all()
+
+        self.Server.shutdown()
+        self.Server.server_close()
+
+
+    def publish(self, save_id: int, row: dict) -> bool:
+        data: bytes = json.dumps(row).encode('utf-8')
+
+        with self.changed:
+            if self.snapshots.get(save_id) == data:
+                return False
+
+            self.snapshots[save_id] = data
+            self.latest = save_id
+            self.event_id += 1
+            self.events.append((self.event_id, save_id, data))
+            self.changed.notify_all()
+
+        return True
+
+
+    def snapshot(self, save_id: int | None = None) -> bytes | None:
+        with self.changed:
+            return self.snapshots.get(self.latest if save_id is None else save_id)
+
+
+    def wait(self, since: int, save_id: int | None, timeout: float) -> tuple[int, list[tuple[int, bytes]]]:
+        def pending() -> list[tuple[int, bytes]]:
+            return [(i, data) for i, sid, data in self.events if i > since and save_id in (None, sid)]
+
+        with self.changed:
+            # events older than the backlog are gone, the client gets what is left
+            self.changed.wait_for(lambda: self.closed or pending(), timeout=timeout)
+            return (self.event_id, pending())
+
+
+
+
+class OverlayRequestHandler(http.server.BaseHTTPRequestHandler):
+    server_version: str = 'hylandbook'
+
+    Overlay: OverlayServer
+
+
+    def do_GET(self) -> None:
+        self.Overlay = self.server.Overlay
+
+        url: urllib.parse.SplitResult = urllib.parse.urlsplit(self.path)
+        query: dict[str, list[str]] = urllib.parse.parse_qs(url.query)
+
+        try:
+            save_id: int | None = int(query['save_id'][0]) if 'save_id' in query else None
+            since: int | None = int(query['since'][0]) if 'since' in query else None
+        except ValueError:
+            self._send(400, b'{}')
+            return
+
+        if url.path in ('/', '/current.json'):
+            data: bytes | None = self.Overlay.snapshot(save_id)
+            self._send(200 if data else 404, data or b'{}')
+
+        elif url.path == '/saves.json':
+            # copied under the lock, a slow client must not block publish()
+            with self.Overlay.changed:
+                snapshots: list[bytes] = list(self.Overlay.snapshots.values())
+            self._send(200, b'[' + b', '.join(snapshots) + b']')
+
+        elif url.path == '/poll':
+            # long-poll: answers as soon as there are rows newer than 'since', or with no rows after the timeout
+            if since is None:
+                since = self.Overlay.event_id
+            event_id, events = self.Overlay.wait(since=since, save_id=save_id, timeout=self.Overlay.long_poll_timeout)
+            self._send(200, b'{"id": %d, "rows": [%s]}' % (event_id, b', '.join([data for _, data in events])))
+
+        elif url.path == '/events':
+            self._stream(save_id=save_id)
+
+        elif url.path == '/metrics' and self.Overlay.metrics:
+            self._send(200, self.Overlay.metrics().encode('utf-8'), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+        else:
+            self._send(404, b'{}')
+
+
+    def _send(self, status: int, body: bytes, content_type: str = 'application/json') -> None:
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-store')
+        self.send_header('Access-Control-Allow-Origin', self.Overlay.cors_origin)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+    def _stream(self, save_id: int | None) -> None:
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-store')
+        self.send_header('Access-Control-Allow-Origin', self.Overlay.cors_origin)
+        self.end_headers()
+
+        since: int = self.Overlay.event_id
+
+        try:
+            # browsers resend the last id when they reconnect, otherwise start with the current snapshot
+            if self.headers.get('Last-Event-ID', '').isdigit():
+                since = int(self.headers['Last-Event-ID'])
+            else:
+                current: bytes | None = self.Overlay.snapshot(save_id)
+                if current:
+                    self.wfile.write(b'id: %d\ndata: %s\n\n' % (since, current))
+                    self.wfile.flush()
+
+            while not self.Overlay.closed:
+                since, events = self.Overlay.wait(since=since, save_id=save_id, timeout=self.Overlay.keepalive)
+
+                if not events:
+                    # also notices clients that went away
+                    self.wfile.write(b': keepalive\n\n')
+                else:
+                    self.wfile.write(b''.join([b'id: %d\ndata: %s\n\n' % (i, data) for i, data in events]))
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+    def log_message(self, format: str, *args) -> None:
+        # requests would scroll the monitor screen away
+        pass
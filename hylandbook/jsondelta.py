@@ -0,0 +1,177 @@
+import bisect
+import json
+
+
+
+
+# Structural patches between two parsed JSON documents, themselves plain JSON:
+#   {"=": value}                           replace the value
+#   {"o": {key: patch}, "x": [key, ...]}   objects, changed or added keys and removed keys
+#   {"e": [[i, patch]], "s": [[i1, i2, [value, ...]]]}
+#                                          arrays, elements changed in place and splices, indices of the old array
+# Inputs are never modified, unchanged parts of the result are shared with the old document.
+
+
+
+
+def _same(a: object, b: object) -> bool:
+    # 1, 1.0 and true are equal in Python but not in the file, neither are objects with another key order
+    if type(a) is not type(b):
+        return False
+    if isinstance(a, dict):
+        return len(a) == len(b) and list(a) == list(b) and all(_same(v, b[k]) for k, v in a.items())
+    if isinstance(a, list):
+        return len(a) == len(b) and all(map(_same, a, b))
+    return a == b
+
+
+def _key(value: object) -> str:
+    return json.dumps(value, separators=(',', ':'))
+
+
+def diff(a: object, b: object) -> dict | None:
+    if _same(a, b):
+        return None
+
+    if isinstance(a, dict) and isinstance(b, dict):
+        # apply() keeps the old key order and adds new keys at the end
+        if list(b) != [k for k in a if k in b] + [k for k in b if k not in a]:
+            return {'=': b}
+
+        changed: dict = {}
+        for k, v in b.items():
+            if k not in a:
+                changed[k] = {'=': v}
+            elif (p := diff(a[k], v)) is not None:
+                changed[k] = p
+
+        delta: dict = {}
+        if changed:
+            delta['o'] = changed
+        if removed := [k for k in a if k not in b]:
+            delta['x'] = removed
+        return delta
+
+    if isinstance(a, list) and isinstance(b, list):
+        return _diff_list(a, b)
+
+    return {'=': b}
+
+
+def _diff_list(a: list, b: list) -> dict:
+    keys_a: list[str] = [_key(v) for v in a]
+    keys_b: list[str] = [_key(v) for v in b]
+
+    edits: list[list] = []
+    splices: list[list] = []
+
+    for i1, i2, j1, j2 in _changes(keys_a, keys_b):
+        if i2 - i1 == j2 - j1:
+            for i, j in zip(range(i1, i2), range(j1, j2)):
+                if isinstance(a[i], (dict, list)) and type(a[i]) is type(b[j]):
+                    edits.append([i, diff(a[i], b[j])])
+                else:
+                    splices.append([i, i + 1, [b[j]]])
+            continue
+
+        splices.append([i1, i2, b[j1:j2]])
+
+    delta: dict = {}
+    if edits:
+        delta['e'] = edits
+    if splices:
+        delta['s'] = splices
+    return delta
+
+
+def _changes(a: list[str], b: list[str]) -> list[tuple[int, int, int, int]]:
+    # (i1, i2, j1, j2) of the ranges that differ, in order, by patience matching: elements found exactly once
+    # in both ranges are matched in order and the ranges between them are matched again, so elements
+    # repeated many times, e.g. the same closing brace, can't make this quadratic like difflib
+    changes: list[tuple[int, int, int, int]] = []
+    ranges: list[tuple[int, int, int, int]] = [(0, len(a), 0, len(b))]
+
+    while ranges:
+        alo, ahi, blo, bhi = ranges.pop()
+
+        # most arrays only grow at the end or change a few elements, skip the common ends first
+        while alo < ahi and blo < bhi and a[alo] == b[blo]:
+            alo += 1
+            blo += 1
+        while alo < ahi and blo < bhi and a[ahi - 1] == b[bhi - 1]:
+            ahi -= 1
+            bhi -= 1
+
+        if alo == ahi and blo == bhi:
+            continue
+
+        anchors: list[tuple[int, int]] = _anchors(a, b, alo, ahi, blo, bhi)
+        if not anchors:
+            changes.append((alo, ahi, blo, bhi))
+            continue
+
+        # the ranges between the anchors, pushed last to first so they are taken in order
+        bounds: list[tuple[int, int]] = [(alo - 1, blo - 1), *anchors, (ahi, bhi)]
+        for (i1, j1), (i2, j2) in reversed(list(zip(bounds, bounds[1:]))):
+            ranges.append((i1 + 1, i2, j1 + 1, j2))
+
+    return changes
+
+
+def _anchors(a: list[str], b: list[str], alo: int, ahi: int, blo: int, bhi: int) -> list[tuple[int, int]]:
+    # pairs of indices of the elements unique in both ranges, the longest run in the same order in both
+    count: dict[str, int] = {}
+    for k in a[alo:ahi]:
+        count[k] = count.get(k, 0) + 1
+
+    in_a: dict[str, int] = {a[i]: i for i in range(alo, ahi) if count[a[i]] == 1}
+    seen_b: dict[str, int] = {}
+    for j in range(blo, bhi):
+        if b[j] in in_a:
+            seen_b[b[j]] = -1 if b[j] in seen_b else j
+
+    pairs: list[tuple[int, int]] = [(in_a[k], j) for k, j in seen_b.items() if j >= 0]
+    pairs.sort(key=lambda p: p[1])
+
+    # longest increasing subsequence of the indices in a, patience sorting with back links
+    tails: list[int] = []
+    tail_values: list[int] = []
+    links: list[int] = []
+    for n, (i, _) in enumerate(pairs):
+        pos: int = bisect.bisect_left(tail_values, i)
+        links.append(tails[pos - 1] if pos else -1)
+        if pos == len(tails):
+            tails.append(n)
+            tail_values.append(i)
+        else:
+            tails[pos] = n
+            tail_values[pos] = i
+
+    anchors: list[tuple[int, int]] = []
+    n = tails[-1] if tails else -1
+    while n >= 0:
+        anchors.append(pairs[n])
+        n = links[n]
+
+    return anchors[::-1]
+
+
+def apply(a: object, delta: dict) -> object:
+    if '=' in delta:
+        return delta['=']
+
+    if 'o' in delta or 'x' in delta:
+        b: dict = dict(a)
+        for k in delta.get('x', []):
+            b.pop(k, None)
+        for k, p in delta.get('o', {}).items():
+            b[k] = apply(b.get(k), p)
+        return b
+
+    b: list = list(a)
+    for i, p in delta.get('e', []):
+        b[i] = apply(b[i], p)
+    # from the back, so the indices of the old array stay valid
+    for i1, i2, values in reversed(delta.get('s', [])):
+        b[i1:i2] = values
+    return b
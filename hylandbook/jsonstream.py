@@ -0,0 +1,144 @@
+import codecs
+import json
+import re
+from pathlib import Path
+
+
+
+
+class JsonStream:
+    # a complete string or a structural character, a lone quote means the string continues in the next chunk
+    token: re.Pattern = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|["\[\]{}:,]', re.DOTALL)
+    string: re.Pattern = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+    # consecutive scalar array elements, each followed by its comma
+    scalar_run: re.Pattern = re.compile(r'(?:\s*(?:"[^"\\]*(?:\\.[^"\\]*)*"|[^\[\]{}",\s]+)\s*,)+', re.DOTALL)
+
+    decoder: json.JSONDecoder = json.JSONDecoder()
+
+    chunk_size: int
+
+
+    def __init__(self, chunk_size: int = 64 * 1024) -> None:
+        self.chunk_size = chunk_size
+
+
+    def scan(self, file: Path, targets: dict[tuple[str, ...], str]) -> dict[tuple[str, ...], object]:
+        # targets: key path -> 'len' to count the elements of the array/object there, or 'value' to decode only that value
+        results: dict[tuple[str, ...], object] = {}
+        prefixes: set[tuple[str, ...]] = {path[:i] for path in targets for i in range(len(path))}
+
+        # frame: [kind, path, commas, nonempty, expect_key, key, mode]
+        stack: list[list] = []
+        value_path: tuple[str, ...] | None = ()
+
+        with file.open('rb') as f:
+            decode = codecs.getincrementaldecoder('utf-8-sig')().decode
+            buf: str = ''
+            pos: int = 0
+            eof: bool = False
+
+            def refill(size: int) -> None:
+                nonlocal buf, pos, eof
+                raw: bytes = f.read(size)
+                eof = len(raw) < size
+                buf = buf[pos:] + decode(raw, final=eof)
+                pos = 0
+
+            refill(self.chunk_size)
+
+            while True:
+                if stack and stack[-1][0] == '[':
+                    run: re.Match | None = self.scalar_run.match(buf, pos)
+                    if run:
+                        stack[-1][2] += self.string.sub('""', run.group()).count(',')
+                        stack[-1][3] = True
+                        pos = run.end()
+
+                m: re.Match | None = self.token.search(buf, pos)
+
+                if m is None or m.group() == '"':
+                    if eof:
+                        if m is not None:
+                            raise json.JSONDecodeError('Unterminated string', buf, m.start())
+                        break
+                    refill(self.chunk_size)
+                    continue
+
+                gap: str = buf[pos:m.start()]
+                tok: str = m.group()
+                pos = m.end()
+
+                # numbers, true, false, null
+                if gap.strip():
+                    if stack:
+                        stack[-1][3] = True
+                    if value_path is not None and value_path in targets:
+                        results[value_path] = json.loads(gap)
+                    value_path = None
+
+                if tok[0] == '"':
+                    top: list | None = stack[-1] if stack else None
+                    if top and top[4]:
+                        top[4] = False
+                        top[5] = json.loads(tok) if top[1] is not None else None
+                    else:
+                        if top:
+                            top[3] = True
+                        if value_path is not None and value_path in targets:
+                            results[value_path] = json.loads(tok)
+                        value_path = None
+
+                elif tok == ':':
+                    top = stack[-1]
+                    value_path = top[1] + (top[5],) if top[1] is not None and top[5] is not None else None
+
+                elif tok == ',':
+                    top = stack[-1]
+                    top[2] += 1
+                    top[4] = top[0] == '{'
+                    value_path = None
+
+                elif tok in '[{':
+                    if stack:
+                        stack[-1][3] = True
+
+                    mode: str | None = targets.get(value_path) if value_path is not None else None
+
+                    # values without targets inside are skipped, and 'value' targets decoded, by the C decoder
+                    if mode == 'value' or (mode is None and value_path not in prefixes):
+                        start: int = m.start()
+                        if not eof and len(buf) - start < self.chunk_size // 2:
+                            pos = start
+                            refill(self.chunk_size)
+                            continue
+                        try:
+                            value, pos = self.decoder.raw_decode(buf, start)
+                            if mode == 'value':
+                                results[value_path] = value
+                            value_path = None
+                            continue
+                        except json.JSONDecodeError:
+                            if mode == 'value':
+                                if eof:
+                                    raise
+                                pos = start
+                                refill(max(self.chunk_size, len(buf)))
+                                continue
+
+                    # too large to decode at once, or targets inside, walk it token by token
+                    path: tuple[str, ...] | None = value_path if tok == '{' or mode else None
+                    stack.append([tok, path, 0, False, tok == '{', None, mode])
+                    value_path = None
+
+                else:
+                    if not stack:
+                        raise json.JSONDecodeError('Unexpected closing bracket', buf, m.start())
+                    _, path, commas, nonempty, _, _, mode = stack.pop()
+                    if mode == 'len':
+                        results[path] = commas + 1 if nonempty else 0
+                    value_path = None
+
+        if stack:
+            raise json.JSONDecodeError('Unexpected end of data', buf, pos)
+
+        return results
@@ -0,0 +1,106 @@
+import bisect
+import contextlib
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Iterator
+
+
+
+
+class Metrics:
+    definitions: dict[str, tuple[str, str]]
+    buckets: list[float]
+
+    # (name, labels) -> value, or [bucket counts ..., sum, count] for histograms
+    values: dict[tuple[str, tuple[tuple[str, str], ...]], float | list]
+    lock: threading.Lock
+
+
+    def __init__(self, definitions: dict[str, tuple[str, str]], buckets: list[float]) -> None:
+        self.definitions = definitions
+        self.buckets = sorted(buckets)
+        self.values = {}
+        self.lock = threading.Lock()
+
+
+    def inc(self, name: str, value: float = 1, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + value
+
+
+    def set(self, name: str, value: float, **labels: str) -> None:
+        # also for counters whose running total is kept elsewhere
+        with self.lock:
+            self.values[(name, tuple(sorted(labels.items())))] = value
+
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            h: list | None = self.values.get(key)
+            if h is None:
+                h = self.values[key] = [0] * (len(self.buckets) + 2)
+            h[bisect.bisect_left(self.buckets, value)] += 1
+            h[-2] += value
+            h[-1] += 1
+
+
+    @contextlib.contextmanager
+    def time(self, name: str, **labels: str) -> Iterator[None]:
+        start: float = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+
+    def render(self) -> str:
+        lines: list[str] = []
+
+        with self.lock:
+            values: list[tuple] = sorted(self.values.items(), key=lambda kv: kv[0])
+
+        for name, (type, help) in self.definitions.items():
+            series: list[tuple] = [(labels, v) for (n, labels), v in values if n == name]
+            if not series:
+                continue
+
+            lines.append(f'# HELP {name} {help}')
+            lines.append(f'# TYPE {name} {type}')
+
+            for labels, v in series:
+                if type != 'histogram':
+                    lines.append(f'{name}{self._labels(labels)} {v:g}')
+                    continue
+
+                cumulative: int = 0
+                for le, n in zip([*[f'{b:g}' for b in self.buckets], '+Inf'], v[:-2]):
+                    cumulative += n
+                    lines.append(f'{name}_bucket{self._labels((*labels, ("le", le)))} {cumulative}')
+                lines.append(f'{name}_sum{self._labels(labels)} {v[-2]:g}')
+                lines.append(f'{name}_count{self._labels(labels)} {v[-1]}')
+
+        return '\n'.join(lines) + '\n'
+
+
+    def write(self, file: Path) -> None:
+        # scrapers such as the node_exporter textfile collector must never see a half written file
+        tmp: Path = file.with_name(f'.{file.name}.{os.getpid()}.tmp')
+        tmp.write_text(self.render(), encoding='utf-8')
+        os.replace(tmp, file)
+
+
+    @staticmethod
+    def _labels(labels: tuple[tuple[str, str], ...]) -> str:
+        if not labels:
+            return ''
+
+        pairs: list[str] = []
+        for k, v in labels:
+            v = str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+            pairs.append(f'{k}="{v}"')
+
+        return '{' + ','.join(pairs) + '}'
@@ -0,0 +1,105 @@
+import asyncio
+import concurrent.futures
+import time
+from typing import Callable
+
+
+
+
+class Stage:
+    # a bounded queue in front of one worker thread, calls run one after the other in the order they were put,
+    # put() waits while the queue is full so a slow database or export target holds back the tick that feeds it
+    name: str
+    maxsize: int
+
+    Queue: asyncio.Queue
+    Executor: concurrent.futures.ThreadPoolExecutor
+    Task: asyncio.Task | None = None
+
+    # raised by the next put() or call(), the caller of put() does not wait for the result
+    error: BaseException | None = None
+
+    calls: int = 0
+    busy: float = 0
+    full: int = 0
+
+
+    def __init__(self, name: str, maxsize: int = 64) -> None:
+        self.name = name
+        self.maxsize = maxsize
+        self.Executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix=f'hylandbook-{name}')
+
+
+    def start(self) -> None:
+        # the queue belongs to the running event loop
+        self.Queue = asyncio.Queue(maxsize=self.maxsize)
+        self.Task = asyncio.get_running_loop().create_task(self._run(), name=self.name)
+
+
+    async def put(self, fn: Callable, *args) -> None:
+        self._raise()
+
+        if self.Queue.full():
+            self.full += 1
+        await self.Queue.put((fn, args, None))
+
+
+    async def call(self, fn: Callable, *args) -> object:
+        # waits for the calls already queued and this one
+        self._raise()
+
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        if self.Queue.full():
+            self.full += 1
+        await self.Queue.put((fn, args, future))
+
+        return await future
+
+
+    async def _run(self) -> None:
+        while True:
+            await self._step(*await self.Queue.get())
+
+
+    async def _step(self, fn: Callable, args: tuple, future: asyncio.Future | None) -> None:
+        start: float = time.perf_counter()
+        try:
+            result: object = await asyncio.get_running_loop().run_in_executor(self.Executor, fn, *args)
+        except Exception as e:
+            if future is None:
+                self.error = self.error or e
+            elif not future.done():
+                future.set_exception(e)
+        else:
+            if future is not None and not future.done():
+                future.set_result(result)
+        finally:
+            self.calls += 1
+            self.busy += time.perf_counter() - start
+            self.Queue.task_done()
+
+
+    def _raise(self) -> None:
+        if self.error:
+            error, self.error = (self.error, None)
+            raise error
+
+
+    async def close(self, last: Callable | None = None) -> None:
+        # everything queued before is done, then last() runs in the same thread, a failed call is raised here
+        if self.Task:
+            if not self.Task.done():
+                await self.Queue.join()
+                self.Task.cancel()
+                await asyncio.gather(self.Task, return_exceptions=True)
+            self.Task = None
+
+            # cancelled together with the other tasks on exit, finish what is left here
+            while not self.Queue.empty():
+                await self._step(*self.Queue.get_nowait())
+
+        if last:
+            await asyncio.get_running_loop().run_in_executor(self.Executor, last)
+
+        self.Executor.shutdown(wait=True)
+        self._raise()
@@ -0,0 +1,115 @@
+import ctypes
+import os
+import shutil
+import sys
+from typing import TextIO
+
+
+
+
+class TerminalRenderer:
+    out: TextIO
+    lines: list[str] | None = None
+    size: os.terminal_size | None = None
+    # the last frame was taller than the terminal and written out in full
+    scrolling: bool = False
+
+    bytes_written: int = 0
+
+
+    def __init__(self, out: TextIO = sys.stdout) -> None:
+        self.out = out
+
+
+    @staticmethod
+    def available(out: TextIO = sys.stdout) -> bool:
+        if not out.isatty():
+            return False
+
+        if os.name != 'nt':
+            return True
+
+        # ANSI escape sequences have to be switched on for the Windows console
+        try:
+            kernel32 = ctypes.windll.kernel32
+            handle = kernel32.GetStdHandle(-11)
+            mode = ctypes.c_uint32()
+            if not kernel32.GetConsoleMode(handle, ctypes.byref(mode)):
+                return False
+            return bool(kernel32.SetConsoleMode(handle, mode.value | 0x0004))
+        except (AttributeError, OSError):
+            return False
+
+
+    def render(self, lines: list[str]) -> None:
+        size: os.terminal_size = shutil.get_terminal_size()
+
+        if len(lines) >= size.lines:
+            self._scroll(lines, size)
+            return
+
+        # wrapped lines would shift every row below them
+        lines = [line[:size.columns - 1] for line in lines]
+
+        out: list[str] = []
+        previous: list[str] = self.lines or []
+
+        if self.lines is None or size != self.size or self.scrolling:
+            out.append('\033[H\033[2J\033[3J')
+            previous = []
+
+        for row, line in enumerate(lines):
+            old: str | None = previous[row] if row < len(previous) else None
+
+            if old == line:
+                continue
+
+            # only rewrite from the first cell that differs
+            col: int = 0
+            if old is not None:
+                while col < len(line) and col < len(old) and line[col] == old[col]:
+                    col += 1
+
+            out.append(f'\033[{row + 1};{col + 1}H{line[col:]}')
+            if old is not None and len(old) > len(line):
+                out.append('\033[K')
+
+        if len(previous) > len(lines):
+            out.append(f'\033[{len(lines) + 1};1H\033[J')
+
+        if out:
+            out.append(f'\033[{max(1, len(lines))};{len(lines[-1]) + 1 if lines else 1}H')
+            text: str = ''.join(out)
+            self.out.write(text)
+            self.out.flush()
+            self.bytes_written += len(text)
+
+        self.lines = lines
+        self.size = size
+        self.scrolling = False
+
+
+    def _scroll(self, lines: list[str], size: os.terminal_size) -> None:
+        # too tall to redraw in place, written out like plain output and scrolled by the terminal so nothing is cut off,
+        # while only the last line changes, e.g. the countdown, just that line is rewritten
+        text: str = ''
+
+        if self.scrolling and size == self.size and self.lines[:-1] == lines[:-1] and len(lines[-1]) < size.columns:
+            if self.lines[-1] != lines[-1]:
+                text = f'\r{lines[-1]}\033[K'
+        else:
+            text = '\033[H\033[2J\033[3J' + '\n'.join(lines)
+
+        if text:
+            self.out.write(text)
+            self.out.flush()
+            self.bytes_written += len(text)
+
+        self.lines = lines
+        self.size = size
+        self.scrolling = True
+
+
+    def reset(self) -> None:
+        self.lines = None
+        self.scrolling = False
@@ -0,0 +1,126 @@
+import math
+import time
+
+import hylandbook.database
+
+
+
+
+class Retention:
+    Database: hylandbook.database.DatabaseSQLite
+
+    tiers: list[dict]
+    batch_size: int
+    time_budget: float
+
+    delete_sql: list[str]
+    # meta keys of the cursors, by tier
+    keys: list[str]
+    cursors: list[float]
+
+    deleted: int = 0
+    caught_up: bool = False
+
+
+    def __init__(self, database: hylandbook.database.DatabaseSQLite, tiers: list[dict], batch_size: int = 1000, time_budget: float = 0.05) -> None:
+        self.Database = database
+        self.tiers = sorted(tiers, key=lambda t: t['age'])
+        self.batch_size = batch_size
+        self.time_budget = time_budget
+
+        # a row goes once the row logged before it for the same save falls into the same bucket,
+        # so the first row of each bucket stays and a row is never looked at again once decided,
+        # rows are walked in log_time order, imported rows get higher log_ids than newer rows logged before them
+        self.delete_sql = [
+            f'''
+            DELETE FROM logs
+            WHERE log_id IN (
+                SELECT l.log_id
+                FROM logs AS l
+                JOIN logs AS p ON p.log_id = (
+                    SELECT log_id
+                    FROM logs
+                    WHERE save_id = l.save_id AND (log_time, log_id) < (l.log_time, l.log_id)
+                    ORDER BY log_time DESC, log_id DESC
+                    LIMIT 1
+                )
+                WHERE
+                    l.log_time > :start AND l.log_time <= :end
+                    AND l.log_time >= :newer_than
+                    AND {t['bucket'].format(t='l')} = {t['bucket'].format(t='p')}
+            );
+            '''
+            for t in self.tiers
+        ]
+
+        # log_time up to which each tier is done, kept in the database across restarts, rewound by rows imported into the past
+        self.keys = [f"retention:{t['age']}:{t['bucket']}" for t in self.tiers]
+        self.cursors = [0.0] * len(self.tiers)
+
+
+    @staticmethod
+    def rewind(database: hylandbook.database.DatabaseSQLite, log_time: float) -> None:
+        # rows from log_time on are looked at again by every tier
+        database.write(
+            "UPDATE meta SET value = MIN(value, :start) WHERE key LIKE 'retention:%';",
+            {'start': math.nextafter(log_time, -math.inf)},
+        )
+
+
+    def run(self, budget: float | None = None) -> int:
+        deleted: int = 0
+        now: float = time.time()
+        until: float = time.monotonic() + (self.time_budget if budget is None else budget)
+
+        caught_up: bool = True
+
+        # another instance or an import may have moved them since the last run
+        stored: dict[str, float] = dict(self.Database.execute("SELECT key, value FROM meta WHERE key LIKE 'retention:%';").fetchall())
+        started: list[float] = [stored.get(key, 0.0) for key in self.keys]
+        self.cursors = list(started)
+
+        for i, tier in enumerate(self.tiers):
+            older_than: float = now - tier['age']
+            newer_than: float = now - self.tiers[i + 1]['age'] if i + 1 < len(self.tiers) else 0
+
+            while True:
+                if time.monotonic() >= until:
+                    caught_up = False
+                    break
+
+                start: float = self.cursors[i]
+
+                # the batch ends with the batch_size-th row old enough for this tier, or the last one
+                end: float | None = self.Database.execute(
+                    'SELECT log_time FROM logs WHERE log_time > :start AND log_time < :older_than ORDER BY log_time LIMIT 1 OFFSET :offset;',
+                    {'start': start, 'older_than': older_than, 'offset': self.batch_size - 1},
+                ).fetchone()
+                end = end[0] if end else self.Database.execute(
+                    'SELECT MAX(log_time) FROM logs WHERE log_time > :start AND log_time < :older_than;',
+                    {'start': start, 'older_than': older_than},
+                ).fetchone()[0]
+
+                if end is None:
+                    # rows from here on are too young for this tier yet
+                    break
+
+                deleted += self.Database.write(
+                    self.delete_sql[i],
+                    {'start': start, 'end': end, 'newer_than': newer_than},
+                ).rowcount
+
+                self.cursors[i] = end
+
+        # with the deletes, unless an import rewound the cursor in the meantime
+        moved: list[tuple[str, float, float]] = [(key, cursor, start) for key, cursor, start in zip(self.keys, self.cursors, started) if cursor != start]
+        if moved:
+            self.Database.write_many(
+                'INSERT INTO meta (key, value) VALUES (?1, ?2) ON CONFLICT (key) DO UPDATE SET value = excluded.value WHERE value = ?3;',
+                moved,
+            )
+
+        self.Database.commit()
+        self.deleted += deleted
+        self.caught_up = caught_up
+
+        return deleted
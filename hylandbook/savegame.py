@@ -0,0 +1,214 @@
+import asyncio
+import json
+import os
+import time
+from pathlib import Path
+
+import hylandbook.cache
+import hylandbook.extractor
+import hylandbook.jsonstream
+
+
+
+
+class SaveGame:
+    Cache: hylandbook.cache.SaveDataCache
+    SdProfileExtractor: hylandbook.extractor.Extractor
+    SdLogExtractor: hylandbook.extractor.Extractor
+    JsonStream: hylandbook.jsonstream.JsonStream
+
+    save_dir: Path
+    settle: float
+    retries: int
+
+    sd_profile: dict
+    sd_log: dict
+    last_log: dict
+    # all values of the last logged row, to show what changed
+    last_values: dict
+    # computed by hylandbook.derived from sd_log and the save's recent history
+    derived: dict
+    compared: bool = False
+    errors: list[str]
+    # the files did not change while they were read and none was partly written
+    consistent: bool = True
+    torn: bool = False
+    retried: int = 0
+    # fingerprints of files still inconsistent after all retries, e.g. a corrupt file, not read again until they change
+    failed: list[tuple[int, int] | None] | None = None
+    # this read gave up, reported once
+    gave_up: bool = False
+
+
+    def __init__(self, save_dir: Path, cache: hylandbook.cache.SaveDataCache, profile_extractor: hylandbook.extractor.Extractor, log_extractor: hylandbook.extractor.Extractor, json_stream: hylandbook.jsonstream.JsonStream, settle: float = 0, retries: int = 0) -> None:
+        self.save_dir = save_dir
+        self.Cache = cache
+        self.SdProfileExtractor = profile_extractor
+        self.SdLogExtractor = log_extractor
+        self.JsonStream = json_stream
+        self.settle = settle
+        self.retries = retries
+        self.sd_profile = {}
+        self.sd_log = {}
+        self.last_log = {}
+        self.last_values = {}
+        self.derived = {}
+        self.errors = []
+
+
+    @staticmethod
+    def discover(path: Path, sd_dir_glob: str) -> list[Path]:
+        if path.joinpath('Game.json').is_file():
+            return [path]
+
+        return sorted([p for p in path.glob(sd_dir_glob) if p.is_dir()])
+
+
+    def read_profile(self) -> dict:
+        self.errors = []
+        self.sd_profile['save_dir'] = self.save_dir.name
+        self.sd_profile.update(self.SdProfileExtractor.extract(self.sd_data, self.sd_scan))
+        return self.sd_profile
+
+
+    def read_log(self) -> dict:
+        # the game writes one file after the other, a read in between would mix old and new values
+        self.Cache.start_tick()
+
+        if self._still_failed():
+            return self.sd_log
+
+        for attempt in range(self.retries + 1):
+            before, wait = self._begin_read(attempt)
+            if wait > 0:
+                time.sleep(wait)
+                continue
+
+            self.sd_log = self.SdLogExtractor.extract(self.sd_data, self.sd_scan)
+
+            if not self._end_read(before, attempt):
+                break
+            time.sleep(self.settle)
+
+        return self.sd_log
+
+
+    async def read_log_async(self) -> dict:
+        # same as read_log(), the files are read at the same time in worker threads
+        self.Cache.start_tick()
+
+        if self._still_failed():
+            return self.sd_log
+
+        for attempt in range(self.retries + 1):
+            before, wait = self._begin_read(attempt)
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+
+            plan: list[tuple] = self.SdLogExtractor.plan
+            loaded: dict[str, dict] = dict(zip(
+                [sd_file for sd_file, _, _ in plan],
+                await asyncio.gather(*[asyncio.to_thread(self._load, sd_file, targets) for sd_file, _, targets in plan]),
+            ))
+            self.sd_log = self.SdLogExtractor.extract(lambda sd_file: loaded[sd_file], lambda sd_file, targets: loaded[sd_file])
+
+            if not self._end_read(before, attempt):
+                break
+            await asyncio.sleep(self.settle)
+
+        return self.sd_log
+
+
+    def _still_failed(self) -> bool:
+        # True while the files that could not be read consistently are unchanged
+        self.gave_up = False
+
+        if self.failed is None:
+            return False
+
+        if self._fingerprints(self._log_files()) == self.failed:
+            self.errors = []
+            return True
+
+        self.failed = None
+        return False
+
+
+    def _begin_read(self, attempt: int) -> tuple[list[tuple[int, int] | None], float]:
+        # (fingerprints, seconds to wait before reading)
+        self.errors = []
+        self.torn = False
+
+        before: list[tuple[int, int] | None] = self._fingerprints(self._log_files())
+        # written a moment ago, more files of the same save may follow
+        wait: float = max([fp[0] / 1e9 for fp in before if fp], default=0) + self.settle - time.time()
+        if wait > 0 and attempt < self.retries:
+            self.retried += 1
+            return (before, min(wait, self.settle))
+
+        return (before, 0)
+
+
+    def _end_read(self, before: list[tuple[int, int] | None], attempt: int) -> bool:
+        # True to read again after the settle time
+        after: list[tuple[int, int] | None] = self._fingerprints(self._log_files())
+        self.consistent = not self.torn and after == before
+        if self.consistent:
+            return False
+
+        if attempt >= self.retries:
+            self.failed = after
+            self.gave_up = True
+            return False
+
+        self.retried += 1
+        return True
+
+
+    def _log_files(self) -> list[Path]:
+        return [self.save_dir.joinpath(sd_file) for sd_file, _, _ in self.SdLogExtractor.plan]
+
+
+    def _load(self, sd_file: str, targets: dict[tuple[str, ...], str] | None) -> dict:
+        if targets is not None:
+            return self.sd_scan(sd_file, targets)
+        return self.sd_data(sd_file)
+
+
+    @staticmethod
+    def _fingerprints(files: list[Path]) -> list[tuple[int, int] | None]:
+        fingerprints: list[tuple[int, int] | None] = []
+
+        for file in files:
+            try:
+                st: os.stat_result = file.stat()
+                fingerprints.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                fingerprints.append(None)
+
+        return fingerprints
+
+
+    def sd_data(self, sd_file: str, /) -> dict:
+        try:
+            return self.Cache.get(self.save_dir.joinpath(sd_file))
+        except json.JSONDecodeError as e:
+            self.torn = True
+            self.errors.append(f"[BOO] failed to load '{sd_file}': {e}")
+            return {}
+        except OSError as e:
+            self.errors.append(f"[BOO] failed to load '{sd_file}': {e}")
+            return {}
+
+
+    def sd_scan(self, sd_file: str, targets: dict[tuple[str, ...], str], /) -> dict:
+        try:
+            return self.Cache.get(self.save_dir.joinpath(sd_file), scan=lambda file: self.JsonStream.scan(file, targets))
+        except json.JSONDecodeError as e:
+            self.torn = True
+            self.errors.append(f"[BOO] failed to load '{sd_file}': {e}")
+            return {}
+        except OSError as e:
+            self.errors.append(f"[BOO] failed to load '{sd_file}': {e}")
+            return {}
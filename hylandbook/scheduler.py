@@ -0,0 +1,90 @@
+import statistics
+import time
+from collections import deque
+
+
+
+
+class AdaptiveScheduler:
+    # the game writes its save files in bursts, an autosave or a manual save, and nothing in between
+    min_interval: float
+    max_interval: float
+    backoff: float
+    burst_gap: float
+    margin: float
+    window_checks: int
+
+    interval: float
+    # start of the last burst and the time between the starts of the recent ones
+    burst_start: float | None = None
+    last_change: float | None = None
+    last_check: float | None = None
+    cadences: deque[float]
+    started: bool = False
+
+    next_expected: float | None = None
+
+
+    def __init__(self, min_interval: float, max_interval: float, backoff: float = 1.5, burst_gap: float = 30, margin: float = 2, window_checks: int = 8, samples: int = 8) -> None:
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.backoff = backoff
+        self.burst_gap = burst_gap
+        self.margin = margin
+        self.window_checks = window_checks
+        self.interval = min_interval
+        self.cadences = deque(maxlen=samples)
+
+
+    def cadence(self) -> tuple[float, float] | None:
+        # (median, spread), a missed or an extra manual save does not throw it off
+        if len(self.cadences) < 3:
+            return None
+
+        median: float = statistics.median(self.cadences)
+        spread: float = max(self.margin, statistics.median([abs(c - median) for c in self.cadences]) * 2)
+
+        return (median, spread)
+
+
+    def update(self, changed: bool, now: float | None = None) -> float:
+        # seconds until the next check
+        now = time.monotonic() if now is None else now
+
+        if not self.started:
+            # the first check reads everything, that's not a save
+            self.started = True
+        elif changed:
+            if self.last_change is None or now - self.last_change > self.burst_gap:
+                # saved some time since the previous check, taking the middle keeps late checks from stretching the cadence
+                burst_start: float = (self.last_check + now) / 2
+                if self.burst_start is not None:
+                    self.cadences.append(burst_start - self.burst_start)
+                self.burst_start = burst_start
+            self.last_change = now
+            # more files of the same burst may follow
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.interval * self.backoff, self.max_interval)
+
+        self.last_check = now
+        delay: float = self.interval
+        self.next_expected = None
+
+        cadence: tuple[float, float] | None = self.cadence()
+        # saves too irregular to predict, e.g. mostly manual ones
+        if cadence and self.burst_start is not None and cadence[1] <= cadence[0] / 3:
+            median, spread = cadence
+            expected: float = self.burst_start + median
+            while expected + spread + self.margin <= now:
+                expected += median
+            self.next_expected = expected
+
+            if now < expected - spread:
+                # first check at the start of the window the next save is expected in
+                delay = min(delay, max(self.min_interval, expected - spread - now))
+            else:
+                # and often within it, a wide window is checked less often
+                delay = min(delay, max(self.min_interval, spread / self.window_checks))
+
+        return delay
@@ -1,55 +1,161 @@
+import asyncio
 import datetime
+import json
 import os
 import subprocess
 import sys
 import time
+from typing import Iterator
+
+import hylandbook.renderer
 
 
 
 
 class Screen:
-    @staticmethod
-    def clear() -> None:
-        if os.name == 'nt':
+    headless: bool = False
+    Renderer: hylandbook.renderer.TerminalRenderer | None = None
+    frame: str | None = None
+
+
+    @classmethod
+    def setup(cls, headless: bool = False) -> None:
+        cls.headless = headless
+        cls.Renderer = None
+
+        if not headless and hylandbook.renderer.TerminalRenderer.available(sys.stdout):
+            cls.Renderer = hylandbook.renderer.TerminalRenderer(sys.stdout)
+
+
+    @classmethod
+    def clear(cls) -> None:
+        if cls.headless or not sys.stdout.isatty():
+            return
+
+        if cls.Renderer:
+            sys.stdout.write('\033[H\033[2J\033[3J')
+            sys.stdout.flush()
+            cls.Renderer.reset()
+        elif os.name == 'nt':
+            # consoles without ANSI support
             subprocess.run(['cls'], shell=True)
-        elif os.name == 'posix':
-            subprocess.run(['/usr/bin/clear'], shell=True)
         else:
             print('\033c', end='')
 
 
-    @staticmethod
-    def prompt_to_exit(exit_code: int = 0, /):
-        input("\npress [Enter] to exit")
+    @classmethod
+    def begin_frame(cls) -> None:
+        # collect the output until end_frame() and let the renderer redraw only what changed
+        if cls.Renderer:
+            cls.frame = ''
+        else:
+            cls.clear()
+
+
+    @classmethod
+    def end_frame(cls) -> None:
+        if cls.frame is None or not cls.Renderer:
+            return
+
+        cls.Renderer.render(cls.frame.removesuffix('\n').split('\n'))
+        cls.frame = None
+
+
+    @classmethod
+    def prompt_to_exit(cls, exit_code: int = 0, /):
+        if not cls.headless:
+            input("\npress [Enter] to exit")
         sys.exit(exit_code)
 
 
     @staticmethod
-    def msg(msg: str = '', /, start: str = '', end: str = "\n", level: int = 0, level_indent: int = 4, sleep: float = 0, sleep_cd: bool = True, ts: bool = False) -> None:
+    def log(level: str = 'info', **fields: object) -> None:
+        # logfmt, one line per record
+        parts: list[str] = [f"ts={datetime.datetime.now().isoformat(timespec='milliseconds')}", f"level={level}"]
+
+        for k, v in fields.items():
+            v = str(v)
+            if not v or any(c in v for c in ' ="\\'):
+                v = json.dumps(v)
+            parts.append(f"{k}={v}")
+
+        sys.stdout.write(' '.join(parts) + "\n")
+        sys.stdout.flush()
+
+
+    @classmethod
+    def msg(cls, msg: str = '', /, start: str = '', end: str = "\n", level: int = 0, level_indent: int = 4, sleep: float = 0, sleep_cd: bool = True, ts: bool = False) -> None:
+        if cls.headless:
+            text: str = msg.strip()
+            if text.startswith('[BOO]'):
+                cls.log(level='error', msg=text.removeprefix('[BOO]').strip())
+            elif text:
+                cls.log(msg=text)
+            if sleep > 0:
+                time.sleep(sleep)
+            return
+
         if level > 0:
             msg = f"{' ' * (level * level_indent)}{msg}"
 
         if ts:
             msg = f"[{datetime.datetime.now().strftime('%H:%M:%S.%f')[:-3]}] {msg}"
 
-        if sleep <= 0:
-            sys.stdout.write(f'{start}{msg}{end}')
-            sys.stdout.flush()
-        else:
-            until: float = time.time() + sleep
+        if cls.frame is None and cls.Renderer:
+            # written around the renderer, the next frame is drawn from scratch
+            cls.Renderer.reset()
 
-            while time.time() <= until:
-                if not sleep_cd:
-                    frame: str = f"{start}{msg} "
-                else:
-                    frame: str = f"{start}{msg} {int(until - time.time())}s "
+        for wait in cls._countdown(msg, start=start, sleep=sleep, sleep_cd=sleep_cd):
+            time.sleep(wait)
 
-                sys.stdout.write(frame)
-                sys.stdout.flush()
+        cls._countdown_end(msg, start=start, end=end, sleep=sleep)
+
+
+    @classmethod
+    async def countdown(cls, msg: str = '', /, start: str = '', end: str = "\n", sleep: float = 0, sleep_cd: bool = True) -> None:
+        # msg(sleep=...) as a task of its own, cancelled when the wait it shows is over
+        if cls.headless:
+            return
+
+        if cls.frame is None and cls.Renderer:
+            cls.Renderer.reset()
 
-                time.sleep(1)
+        try:
+            for wait in cls._countdown(msg, start=start, sleep=sleep, sleep_cd=sleep_cd):
+                await asyncio.sleep(wait)
+        finally:
+            cls._countdown_end(msg, start=start, end=end, sleep=sleep)
 
+
+    @classmethod
+    def _countdown(cls, msg: str, start: str, sleep: float, sleep_cd: bool) -> Iterator[float]:
+        # draws the message with the seconds left, the caller waits the yielded seconds in between
+        until: float = time.time() + sleep
+
+        while sleep > 0 and time.time() <= until:
+            if not sleep_cd:
+                frame: str = f"{start}{msg} "
+            else:
+                frame: str = f"{start}{msg} {int(until - time.time())}s "
+
+            if cls.frame is not None:
+                # the renderer only rewrites the digits that changed
+                cls.Renderer.render(f"{cls.frame}{frame}".split('\n'))
+                yield 1
+            else:
+                sys.stdout.write(frame)
+                sys.stdout.flush()
+                yield 1
                 sys.stdout.write('\b' * len(frame))
 
+
+    @classmethod
+    def _countdown_end(cls, msg: str, start: str, end: str, sleep: float) -> None:
+        if cls.frame is not None:
+            cls.frame += f'{start}{msg}{end}'
+        elif sleep <= 0:
+            sys.stdout.write(f'{start}{msg}{end}')
+            sys.stdout.flush()
+        else:
             sys.stdout.write(end)
             sys.stdout.flush()
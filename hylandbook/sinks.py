@@ -0,0 +1,492 @@
+import abc
+import collections
+import errno
+import json
+import os
+import select
+import socket
+import stat
+import threading
+from pathlib import Path
+
+
+
+
+class Sink(abc.ABC):
+    # rows are handed over without waiting and sent by a thread of the sink,
+    # a consumer that is slow or gone costs dropped rows, never a stalled monitor
+    kind: str = ''
+    usage: str = ''
+    policies: tuple[str, ...] = ('coalesce', 'drop')
+
+    target: str
+    keys: list[str]
+    # 'coalesce' keeps only the latest row of each save game, 'drop' keeps every row in order and drops new ones while the queue is full
+    policy: str
+    maxsize: int
+    # seconds between calls of idle() while no rows arrive, None to only wake up for rows
+    poll_interval: float | None = None
+
+    pending: collections.OrderedDict | collections.deque
+    ready: threading.Condition
+    Thread: threading.Thread | None = None
+    closed: bool = False
+    # save_ids a row was offered for, a save game's first row is offered even if unchanged
+    seen: set[int]
+
+    # updated by offer() and the sink's thread, only under the lock of ready
+    sent: int = 0
+    dropped: int = 0
+    coalesced: int = 0
+    errors: int = 0
+
+
+    def __init__(self, target: str, keys: list[str], policy: str = 'coalesce', maxsize: int = 256) -> None:
+        if policy not in self.policies:
+            raise ValueError(f"unknown sink policy: {policy}")
+
+        self.target = target
+        self.keys = keys
+        self.policy = policy
+        self.maxsize = maxsize
+        self.pending = collections.OrderedDict() if policy == 'coalesce' else collections.deque()
+        self.ready = threading.Condition()
+        self.seen = set()
+
+
+    @staticmethod
+    def create(spec: str, keys: list[str], data_dir: Path, policies: dict[str, str], maxsize: int = 256, **options) -> 'Sink':
+        # KIND:TARGET, e.g. fifo:current.pipe, unix:/run/hb.sock, statsd:127.0.0.1:8125, line:127.0.0.1:8089
+        kind, _, target = spec.partition(':')
+        kinds: dict[str, type] = {sink.kind: sink for sink in (FifoSink, UnixSocketSink, StatsdSink, LineProtocolSink)}
+
+        if kind not in kinds or not target:
+            raise ValueError(f"expected one of {', '.join([sink.usage for sink in kinds.values()])}")
+
+        return kinds[kind](target=target, keys=keys, data_dir=data_dir, policy=policies.get(kind, 'coalesce'), maxsize=maxsize, **options)
+
+
+    @property
+    def name(self) -> str:
+        return f'{self.kind}:{self.target}'
+
+
+    @property
+    def depth(self) -> int:
+        with self.ready:
+            return len(self.pending)
+
+
+    def start(self) -> None:
+        # errors of open() are raised here, later ones are only counted
+        self.open()
+        self.Thread = threading.Thread(target=self._run, name=f'hylandbook-sink-{self.kind}', daemon=True)
+        self.Thread.start()
+
+
+    def offer(self, save_id: int, row: dict) -> bool:
+        with self.ready:
+            self.seen.add(save_id)
+
+            if self.policy == 'coalesce':
+                if save_id in self.pending:
+                    self.coalesced += 1
+                    self.pending.move_to_end(save_id)
+                elif len(self.pending) >= self.maxsize:
+                    self.dropped += 1
+                    return False
+                self.pending[save_id] = row
+            else:
+                if len(self.pending) >= self.maxsize:
+                    self.dropped += 1
+                    return False
+                self.pending.append((save_id, row))
+
+            self.ready.notify()
+
+        return True
+
+
+    def _run(self) -> None:
+        while True:
+            with self.ready:
+                self.ready.wait_for(lambda: self.closed or self.pending, timeout=self.poll_interval)
+                rows: list[tuple[int, dict]] = list(self.pending.items()) if self.policy == 'coalesce' else list(self.pending)
+                self.pending.clear()
+                closed: bool = self.closed
+
+            try:
+                if rows:
+                    self.send([(save_id, row, {k: row.get(k) for k in self.keys}) for save_id, row in rows])
+                else:
+                    self.idle()
+            except OSError:
+                self.count(dropped=len(rows), errors=1)
+
+            if closed:
+                return
+
+
+    def count(self, sent: int = 0, dropped: int = 0, errors: int = 0) -> None:
+        with self.ready:
+            self.sent += sent
+            self.dropped += dropped
+            self.errors += errors
+
+
+    def close(self, timeout: float | None = None) -> None:
+        # rows already queued are still sent
+        with self.ready:
+            self.closed = True
+            self.ready.notify()
+
+        if self.Thread:
+            self.Thread.join(timeout)
+
+        self.shutdown()
+
+
+    def open(self) -> None:
+        pass
+
+
+    @abc.abstractmethod
+    def send(self, rows: list[tuple[int, dict, dict]]) -> None:
+        # (save_id, row, values of keys), oldest first
+        pass
+
+
+    def idle(self) -> None:
+        pass
+
+
+    def shutdown(self) -> None:
+        pass
+
+
+
+
+class FifoSink(Sink):
+    # one JSON line per row into a named pipe, rows are dropped while no program has the pipe open for reading
+    kind: str = 'fifo'
+    usage: str = 'fifo:PATH'
+
+    path: Path
+    fd: int | None = None
+    created: bool = False
+    # seconds to wait for the reader to take the rest of a line that did not fit into the pipe at once
+    write_timeout: float
+
+
+    def __init__(self, target: str, keys: list[str], data_dir: Path, policy: str = 'coalesce', maxsize: int = 256, fifo_write_timeout: float = 1, **options) -> None:
+        super().__init__(target=target, keys=keys, policy=policy, maxsize=maxsize)
+        self.path = data_dir.joinpath(target)
+        self.write_timeout = fifo_write_timeout
+
+
+    def open(self) -> None:
+        if not hasattr(os, 'mkfifo'):
+            raise OSError("named pipes are only supported on Linux and macOS")
+
+        if not self.path.exists():
+            os.mkfifo(self.path)
+            self.created = True
+        elif not stat.S_ISFIFO(self.path.stat().st_mode):
+            raise OSError(f"not a named pipe: {self.path}")
+
+
+    def send(self, rows: list[tuple[int, dict, dict]]) -> None:
+        if self.fd is None:
+            try:
+                self.fd = os.open(self.path, os.O_WRONLY | os.O_NONBLOCK)
+            except OSError as e:
+                if e.errno != errno.ENXIO:
+                    raise
+                # no reader
+                self.count(dropped=len(rows))
+                return
+
+        for i, (_, _, values) in enumerate(rows):
+            line: bytes = json.dumps(values).encode('utf-8') + b'\n'
+
+            # a line up to PIPE_BUF bytes is written in one piece or not at all
+            try:
+                written: int = os.write(self.fd, line)
+            except BlockingIOError:
+                # the reader is behind
+                self.count(dropped=1)
+                continue
+            except BrokenPipeError:
+                written = 0
+
+            # a longer line can be taken in parts, the reader must not be left with half a line
+            if 0 < written < len(line):
+                written += self._write_rest(line[written:])
+
+            if written < len(line):
+                # the reader went away or is stuck in the middle of a line, the next row opens the pipe again
+                os.close(self.fd)
+                self.fd = None
+                self.count(dropped=len(rows) - i)
+                return
+
+            self.count(sent=1)
+
+
+    def _write_rest(self, data: bytes) -> int:
+        written: int = 0
+
+        while written < len(data):
+            if not select.select([], [self.fd], [], self.write_timeout)[1]:
+                break
+            try:
+                written += os.write(self.fd, data[written:])
+            except BlockingIOError:
+                continue
+            except BrokenPipeError:
+                break
+
+        return written
+
+
+    def shutdown(self) -> None:
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+        if self.created:
+            self.path.unlink(missing_ok=True)
+
+
+
+
+class UnixSocketSink(Sink):
+    # broadcasts one JSON line per row to every connected subscriber, new subscribers first get the latest row of each save game,
+    # a subscriber too slow to take the next line is disconnected instead of holding back the others
+    kind: str = 'unix'
+    usage: str = 'unix:PATH'
+
+    path: Path
+    Server: socket.socket | None = None
+    subscribers: list[socket.socket]
+    # save_id -> latest line
+    latest: dict[int, bytes]
+
+    disconnected: int = 0
+
+
+    def __init__(self, target: str, keys: list[str], data_dir: Path, policy: str = 'drop', maxsize: int = 256, accept_interval: float = 0.25, **options) -> None:
+        super().__init__(target=target, keys=keys, policy=policy, maxsize=maxsize)
+        self.path = data_dir.joinpath(target)
+        self.poll_interval = accept_interval
+        self.subscribers = []
+        self.latest = {}
+
+
+    def open(self) -> None:
+        if not hasattr(socket, 'AF_UNIX'):
+            raise OSError("unix sockets are not supported on this system")
+
+        if self.path.exists():
+            if not stat.S_ISSOCK(self.path.stat().st_mode):
+                raise OSError(f"not a socket: {self.path}")
+            # left behind by an instance that did not stop cleanly, unless it is still running
+            probe: socket.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(str(self.path))
+            except (ConnectionRefusedError, FileNotFoundError):
+                self.path.unlink(missing_ok=True)
+            else:
+                raise OSError(f"socket already in use: {self.path}")
+            finally:
+                probe.close()
+
+        self.Server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.Server.bind(str(self.path))
+        self.Server.listen()
+        self.Server.setblocking(False)
+
+
+    def idle(self) -> None:
+        self._accept()
+
+
+    def _accept(self) -> None:
+        while True:
+            try:
+                subscriber, _ = self.Server.accept()
+            except BlockingIOError:
+                return
+
+            subscriber.setblocking(False)
+            self.subscribers.append(subscriber)
+            if self.latest:
+                self._broadcast(b''.join(self.latest.values()), [subscriber])
+
+
+    def send(self, rows: list[tuple[int, dict, dict]]) -> None:
+        self._accept()
+
+        lines: list[bytes] = []
+        for save_id, _, values in rows:
+            line: bytes = json.dumps(values).encode('utf-8') + b'\n'
+            self.latest[save_id] = line
+            lines.append(line)
+
+        if self.subscribers:
+            self._broadcast(b''.join(lines), self.subscribers)
+        self.count(sent=len(rows))
+
+
+    def _broadcast(self, data: bytes, subscribers: list[socket.socket]) -> None:
+        for subscriber in list(subscribers):
+            try:
+                # a partial write would leave half a line behind
+                if subscriber.send(data) == len(data):
+                    continue
+            except (BlockingIOError, BrokenPipeError, ConnectionResetError):
+                pass
+
+            subscriber.close()
+            self.subscribers.remove(subscriber)
+            self.disconnected += 1
+
+
+    def shutdown(self) -> None:
+        for subscriber in self.subscribers:
+            subscriber.close()
+        self.subscribers = []
+
+        if self.Server:
+            self.Server.close()
+            self.Server = None
+            self.path.unlink(missing_ok=True)
+
+
+
+
+class DatagramSink(Sink):
+    # numeric values as UDP datagrams, as many lines as fit into one datagram, nothing waits for the receiver
+    address: tuple
+    family: int
+    max_datagram: int
+    Socket: socket.socket | None = None
+
+
+    def __init__(self, target: str, keys: list[str], data_dir: Path, policy: str = 'coalesce', maxsize: int = 256, max_datagram: int = 1432, **options) -> None:
+        super().__init__(target=target, keys=keys, policy=policy, maxsize=maxsize)
+        self.max_datagram = max_datagram
+
+        # HOST:PORT, IPv6 addresses in brackets
+        host, _, port = target.rpartition(':')
+        if not host or not port.isdigit():
+            raise ValueError(f"expected HOST:PORT: {target}")
+        self.family, _, _, _, self.address = socket.getaddrinfo(host.strip('[]'), int(port), type=socket.SOCK_DGRAM)[0]
+
+
+    def open(self) -> None:
+        self.Socket = socket.socket(self.family, socket.SOCK_DGRAM)
+        self.Socket.setblocking(False)
+
+
+    def send(self, rows: list[tuple[int, dict, dict]]) -> None:
+        # (datagram, indexes of the rows in it), a row counts as dropped if any part of it was
+        datagrams: list[tuple[bytes, set[int]]] = []
+        datagram: bytes = b''
+        parts: set[int] = set()
+
+        for i, (save_id, row, values) in enumerate(rows):
+            for line in self.format(save_id, row, values):
+                if datagram and len(datagram) + 1 + len(line) > self.max_datagram:
+                    datagrams.append((datagram, parts))
+                    datagram, parts = (b'', set())
+                datagram = datagram + b'\n' + line if datagram else line
+                parts.add(i)
+        if datagram:
+            datagrams.append((datagram, parts))
+
+        lost: set[int] = set()
+        for datagram, parts in datagrams:
+            try:
+                self.Socket.sendto(datagram, self.address)
+            except (BlockingIOError, ConnectionRefusedError):
+                # the send buffer is full, or nothing listens on a local port
+                lost |= parts
+
+        self.count(sent=len(rows) - len(lost), dropped=len(lost))
+
+
+    @abc.abstractmethod
+    def format(self, save_id: int, row: dict, values: dict) -> list[bytes]:
+        # the lines of one row
+        pass
+
+
+    @staticmethod
+    def numeric(values: dict) -> dict:
+        return {k: v for k, v in values.items() if isinstance(v, (int, float)) and not isinstance(v, bool) and k not in ('_t', 'save_id')}
+
+
+    def shutdown(self) -> None:
+        if self.Socket:
+            self.Socket.close()
+            self.Socket = None
+
+
+
+
+class StatsdSink(DatagramSink):
+    # one gauge per value, PREFIX.SAVE_ID.KEY:VALUE|g
+    kind: str = 'statsd'
+    usage: str = 'statsd:HOST:PORT'
+
+    prefix: str
+
+
+    def __init__(self, target: str, keys: list[str], data_dir: Path, policy: str = 'coalesce', maxsize: int = 256, statsd_prefix: str = 'hylandbook', **options) -> None:
+        super().__init__(target=target, keys=keys, data_dir=data_dir, policy=policy, maxsize=maxsize, **options)
+        self.prefix = statsd_prefix
+
+
+    def format(self, save_id: int, row: dict, values: dict) -> list[bytes]:
+        lines: list[bytes] = []
+
+        for k, v in self.numeric(values).items():
+            # a signed gauge changes the current value, a negative one is set by going through zero
+            if v < 0:
+                lines.append(f'{self.prefix}.{save_id}.{k}:0|g'.encode('utf-8'))
+            lines.append(f'{self.prefix}.{save_id}.{k}:{v}|g'.encode('utf-8'))
+
+        return lines
+
+
+
+
+class LineProtocolSink(DatagramSink):
+    # one InfluxDB line protocol point per row, tagged with save_id and organisation, timestamped with the row's time
+    kind: str = 'line'
+    usage: str = 'line:HOST:PORT'
+
+    measurement: str
+
+
+    def __init__(self, target: str, keys: list[str], data_dir: Path, policy: str = 'drop', maxsize: int = 256, line_measurement: str = 'hylandbook', **options) -> None:
+        super().__init__(target=target, keys=keys, data_dir=data_dir, policy=policy, maxsize=maxsize, **options)
+        self.measurement = line_measurement
+
+
+    @staticmethod
+    def escape(value: str) -> str:
+        return value.replace('\\', '\\\\').replace(',', '\\,').replace('=', '\\=').replace(' ', '\\ ')
+
+
+    def format(self, save_id: int, row: dict, values: dict) -> list[bytes]:
+        fields: list[str] = [f"{self.escape(k)}={v}i" if isinstance(v, int) else f"{self.escape(k)}={v!r}" for k, v in self.numeric(values).items()]
+        if not fields:
+            return []
+
+        tags: str = f',save_id={save_id}'
+        if row.get('organisation'):
+            tags += f",organisation={self.escape(str(row['organisation']))}"
+
+        return [f"{self.escape(self.measurement)}{tags} {','.join(fields)} {int(row.get('_t', 0) * 1e9)}".encode('utf-8')]
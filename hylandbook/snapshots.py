@@ -0,0 +1,239 @@
+import hashlib
+import json
+import lzma
+import os
+import re
+import stat
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+
+import hylandbook.database
+import hylandbook.jsondelta
+
+
+
+
+class SnapshotStore:
+    codecs: dict[str, tuple] = {
+        # name -> (compress, decompress)
+        'none': (lambda data: data, lambda data: data),
+        'zlib': (lambda data: zlib.compress(data, 6), zlib.decompress),
+        'lzma': (lambda data: lzma.compress(data, preset=6), lzma.decompress),
+    }
+
+    # a file is patched as the list of its pieces up to each comma and line break, whatever wrote it,
+    # so one changed value is one changed piece and the pieces join back to exactly the same bytes
+    pieces_pattern: re.Pattern = re.compile(r'(?<=[,\n])')
+
+    Database: hylandbook.database.DatabaseSQLite
+    codec: str
+    glob: str
+    keyframe_interval: int
+    delta_min_size: int
+    cache_size: int
+
+    # save_dir -> relative file -> (mtime_ns, size, hash), so unchanged files are neither read nor hashed again
+    files: dict[Path, dict[str, tuple[int, int, bytes]]]
+    # hashes already in the blobs table -> number of patches to apply from the last keyframe
+    stored: dict[bytes, int]
+    # (save_dir, relative file) -> (hash, depth, pieces), the base of the next patch
+    documents: dict[tuple[Path, str], tuple[bytes, int, list[str]]]
+    # pieces of decoded keyframes, least recently used first
+    keyframes: OrderedDict[bytes, list[str]]
+
+    blobs_written: int = 0
+    bytes_written: int = 0
+    deltas_written: int = 0
+
+
+    def __init__(self, database: hylandbook.database.DatabaseSQLite, codec: str = 'zlib', glob: str = '**/*.json', keyframe_interval: int = 1, delta_min_size: int = 0, cache_size: int = 8) -> None:
+        self.Database = database
+        self.codec = codec
+        self.glob = glob
+        self.keyframe_interval = keyframe_interval
+        self.delta_min_size = delta_min_size
+        self.cache_size = cache_size
+        self.files = {}
+        self.stored = {}
+        self.documents = {}
+        self.keyframes = OrderedDict()
+
+
+    @staticmethod
+    def digest(data: bytes) -> bytes:
+        return hashlib.blake2b(data, digest_size=16).digest()
+
+
+    def pieces(self, raw: bytes) -> list[str]:
+        # latin-1 maps every byte to one character and back, the file needs no particular encoding
+        return self.pieces_pattern.split(raw.decode('latin-1'))
+
+
+    def store(self, log_id: int, save_dir: Path) -> int:
+        # links every save file to the log row, only contents not seen before are compressed and written
+        written: int = 0
+        known: dict[str, tuple[int, int, bytes]] = self.files.setdefault(save_dir, {})
+        current: dict[str, tuple[int, int, bytes]] = {}
+
+        for file in sorted(save_dir.glob(self.glob)):
+            try:
+                st: os.stat_result = file.stat()
+                if not stat.S_ISREG(st.st_mode):
+                    continue
+
+                name: str = file.relative_to(save_dir).as_posix()
+                fingerprint: tuple[int, int] = (st.st_mtime_ns, st.st_size)
+
+                if name in known and known[name][:2] == fingerprint:
+                    current[name] = known[name]
+                    continue
+
+                raw: bytes = file.read_bytes()
+            except OSError:
+                continue
+
+            digest: bytes = self.digest(raw)
+            current[name] = (*fingerprint, digest)
+
+            if digest not in self.stored:
+                row = self.Database.execute('SELECT depth FROM blobs WHERE hash = ?;', (digest,)).fetchone()
+                if row:
+                    self.stored[digest] = row[0]
+                else:
+                    base, depth, payload = self._encode((save_dir, name), raw, digest)
+                    data: bytes = self.codecs[self.codec][0](payload)
+                    if self.Database.write(
+                        'INSERT OR IGNORE INTO blobs (hash, codec, size, data, base, depth) VALUES (?, ?, ?, ?, ?, ?);',
+                        (digest, self.codec, len(raw), data, base, depth),
+                    ).rowcount:
+                        self.stored[digest] = depth
+                        written += 1
+                        self.blobs_written += 1
+                        self.bytes_written += len(data)
+                        if base:
+                            self.deltas_written += 1
+                        continue
+                    # another instance logging the same save stored it a moment ago
+                    self.stored[digest] = self.Database.execute('SELECT depth FROM blobs WHERE hash = ?;', (digest,)).fetchone()[0]
+
+            if self.keyframe_interval > 1 and len(raw) >= self.delta_min_size:
+                # content seen before, e.g. a save loaded again, patch the next change against it
+                self._remember((save_dir, name), raw, digest, self.stored[digest])
+
+        self.Database.write_many(
+            'INSERT OR REPLACE INTO snapshots (log_id, file, hash) VALUES (?, ?, ?);',
+            [(log_id, name, digest) for name, (_, _, digest) in current.items()],
+        )
+
+        self.files[save_dir] = current
+
+        return written
+
+
+    def _encode(self, key: tuple[Path, str], raw: bytes, digest: bytes) -> tuple[bytes | None, int, bytes]:
+        # (base hash, depth, payload), a patch against the previous content of the file, or the file itself as keyframe
+        if self.keyframe_interval <= 1 or len(raw) < self.delta_min_size:
+            return (None, 0, raw)
+
+        previous: tuple[bytes, int, list[str]] | None = self.documents.get(key)
+        pieces: list[str] = self._remember(key, raw, digest, 0)
+
+        if not previous or previous[1] + 1 >= self.keyframe_interval:
+            return (None, 0, raw)
+
+        base, depth, base_pieces = previous
+        payload: bytes = json.dumps(
+            {'p': hylandbook.jsondelta.diff(base_pieces, pieces) or {}},
+            ensure_ascii=False,
+            separators=(',', ':'),
+        ).encode()
+
+        # mostly rewritten, e.g. another save copied over this one
+        if len(payload) > len(raw) // 2:
+            return (None, 0, raw)
+
+        self.documents[key] = (digest, depth + 1, pieces)
+        return (base, depth + 1, payload)
+
+
+    def _remember(self, key: tuple[Path, str], raw: bytes, digest: bytes, depth: int) -> list[str]:
+        if key in self.documents and self.documents[key][0] == digest:
+            return self.documents[key][2]
+
+        pieces: list[str] = self.pieces(raw)
+        self.documents[key] = (digest, depth, pieces)
+        return pieces
+
+
+    def _pieces(self, cur, digest: bytes) -> list[str]:
+        if digest in self.keyframes:
+            self.keyframes.move_to_end(digest)
+            return self.keyframes[digest]
+
+        codec, base, data = cur.execute('SELECT codec, base, data FROM blobs WHERE hash = ?;', (digest,)).fetchone()
+        data = self.codecs[codec][1](data)
+
+        if base is None:
+            pieces: list[str] = self.pieces(data)
+            self.keyframes[digest] = pieces
+            while len(self.keyframes) > self.cache_size:
+                self.keyframes.popitem(last=False)
+            return pieces
+
+        # patches never modify the list they are applied to, so cached keyframes stay intact
+        return hylandbook.jsondelta.apply(self._pieces(cur, base), json.loads(data)['p'])
+
+
+    def read(self, cur, digest: bytes) -> bytes:
+        codec, base, data = cur.execute('SELECT codec, base, data FROM blobs WHERE hash = ?;', (digest,)).fetchone()
+        data = self.codecs[codec][1](data)
+
+        if base is None:
+            return data
+
+        return ''.join(hylandbook.jsondelta.apply(self._pieces(cur, base), json.loads(data)['p'])).encode('latin-1')
+
+
+    def restore(self, log_id: int, dest: Path) -> list[Path]:
+        restored: list[Path] = []
+
+        con, cur = self.Database.connect(row_factory=None)
+        try:
+            snapshot: list[tuple[str, bytes]] = cur.execute(
+                'SELECT file, hash FROM snapshots WHERE log_id = ? ORDER BY file;',
+                (log_id,)
+            ).fetchall()
+
+            for name, digest in snapshot:
+                file: Path = dest.joinpath(*name.split('/'))
+                file.parent.mkdir(parents=True, exist_ok=True)
+                file.write_bytes(self.read(cur, digest))
+                restored.append(file)
+        finally:
+            con.close()
+
+        return restored
+
+
+    def collect_garbage(self) -> int:
+        # blobs of log rows removed by retention, keyframes and patches still needed by a later patch are kept
+        deleted: int = 0
+
+        while True:
+            n: int = self.Database.write(
+                '''
+                DELETE FROM blobs
+                WHERE hash NOT IN (SELECT hash FROM snapshots)
+                AND hash NOT IN (SELECT base FROM blobs WHERE base IS NOT NULL);
+                '''
+            ).rowcount
+            if n <= 0:
+                break
+            deleted += n
+
+        self.Database.commit(force=True)
+        self.stored.clear()
+        self.documents.clear()
+        self.keyframes.clear()
+        return deleted
@@ -0,0 +1,118 @@
+import sqlite3
+from typing import Iterator
+
+import hylandbook.database
+
+
+
+
+class Stats:
+    # all aggregation happens in SQLite, rows are streamed out in batches,
+    # per day and per session reports read the summaries kept by the rollup triggers instead of all log rows
+    reports: dict[str, dict] = {
+        'earnings': {
+            'title': 'earnings per in-game day',
+            'sql': '''
+                SELECT
+                    elapseddays AS day,
+                    lifetimeearnings_max AS lifetimeearnings,
+                    ROUND(lifetimeearnings_max - LAG(lifetimeearnings_max, 1, lifetimeearnings_min) OVER (ORDER BY elapseddays), 2) AS earnings
+                FROM days
+                WHERE save_id = :save_id
+                ORDER BY elapseddays;
+            ''',
+        },
+        'xp': {
+            'title': 'xp per playtime hour',
+            'sql': '''
+                SELECT
+                    playtime / 3600 AS hour,
+                    MAX(totalxp) AS totalxp,
+                    MAX(totalxp) - LAG(MAX(totalxp), 1, MIN(totalxp)) OVER (ORDER BY playtime / 3600) AS xp
+                FROM logs
+                WHERE save_id = :save_id
+                GROUP BY playtime / 3600
+                ORDER BY hour;
+            ''',
+        },
+        'networth': {
+            'title': 'networth growth per in-game day',
+            'sql': '''
+                SELECT
+                    elapseddays AS day,
+                    networth_last AS networth,
+                    ROUND(networth_last - LAG(networth_last) OVER w, 2) AS growth,
+                    ROUND(100.0 * (networth_last - LAG(networth_last) OVER w) / NULLIF(LAG(networth_last) OVER w, 0), 2) AS growth_pct
+                FROM days
+                WHERE save_id = :save_id
+                WINDOW w AS (ORDER BY elapseddays)
+                ORDER BY elapseddays;
+            ''',
+        },
+        'sessions': {
+            'title': 'sessions',
+            'sql': '''
+                SELECT
+                    datetime(start_time, 'unixepoch', 'localtime') AS start,
+                    ROUND((end_time - start_time) / 60) AS minutes,
+                    rows,
+                    ROUND(lifetimeearnings_last - lifetimeearnings_first, 2) AS earnings,
+                    ROUND(networth_last - networth_first, 2) AS growth,
+                    ROUND(networth_min, 2) AS networth_min,
+                    ROUND(networth_max, 2) AS networth_max
+                FROM sessions
+                WHERE save_id = :save_id
+                ORDER BY start_time, session_id;
+            ''',
+        },
+        'rankups': {
+            'title': 'rank-ups',
+            'sql': '''
+                SELECT
+                    datetime(log_time, 'unixepoch', 'localtime') AS time,
+                    elapseddays AS day,
+                    playtime,
+                    rank,
+                    tier
+                FROM (
+                    SELECT
+                        log_time,
+                        elapseddays,
+                        playtime,
+                        rank,
+                        tier,
+                        LAG(rank) OVER w AS previous_rank,
+                        LAG(tier) OVER w AS previous_tier
+                    FROM logs
+                    WHERE save_id = :save_id
+                    WINDOW w AS (ORDER BY log_time, log_id)
+                )
+                WHERE (rank, tier) > (previous_rank, previous_tier)
+                ORDER BY time;
+            ''',
+        },
+    }
+
+    Database: hylandbook.database.DatabaseSQLite
+    fetch_size: int
+
+
+    def __init__(self, database: hylandbook.database.DatabaseSQLite, fetch_size: int = 1000) -> None:
+        self.Database = database
+        self.fetch_size = fetch_size
+
+
+    def run(self, report: str, save_id: int) -> tuple[list[str], Iterator[tuple]]:
+        con, cur = self.Database.connect(row_factory=None)
+
+        r: sqlite3.Cursor = cur.execute(self.reports[report]['sql'], {'save_id': save_id})
+        columns: list[str] = [d[0] for d in r.description]
+
+        def rows() -> Iterator[tuple]:
+            try:
+                while batch := r.fetchmany(self.fetch_size):
+                    yield from batch
+            finally:
+                con.close()
+
+        return (columns, rows())
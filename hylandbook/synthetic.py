@@ -0,0 +1,178 @@
+import json
+import random
+import uuid
+from pathlib import Path
+
+
+
+
+class SaveGenerator:
+    game_version: str = '0.4.0f5'
+
+    ingredients: list[str] = ['cuke', 'banana', 'paracetamol', 'donut', 'viagra', 'mouthwash', 'flumedicine', 'gasoline', 'energydrink', 'motoroil', 'megabean', 'chili', 'battery', 'iodine', 'addy', 'horsesemen']
+    bases: list[str] = ['ogkush', 'sourdiesel', 'greencrack', 'granddaddypurple', 'meth', 'cocaine']
+    vehicles: list[str] = ['shitbox', 'veeper', 'bruiser', 'dinkler', 'hounddog', 'cheetah']
+
+    Random: random.Random
+    products: int
+    owned_vehicles: int
+    indent: int | None
+
+    state: dict[Path, dict]
+
+
+    def __init__(self, seed: int = 0, products: int = 1000, vehicles: int = 10, indent: int | None = 4) -> None:
+        self.Random = random.Random(seed)
+        self.products = products
+        self.owned_vehicles = vehicles
+        self.indent = indent
+        self.state = {}
+
+
+    def create_saves(self, path: Path, slots: int) -> list[Path]:
+        save_dirs: list[Path] = []
+
+        for slot in range(1, slots + 1):
+            save_dir: Path = path.joinpath(f'SaveGame_{slot}')
+            self.create(save_dir=save_dir, slot=slot)
+            save_dirs.append(save_dir)
+
+        return save_dirs
+
+
+    def create(self, save_dir: Path, slot: int) -> None:
+        save_dir.mkdir(parents=True, exist_ok=True)
+
+        self.state[save_dir] = {
+            'slot': slot,
+            'seed': self.Random.randrange(1, 2**31),
+            'playtime': 0,
+            'timeofday': 700,
+            'elapseddays': 0,
+            'onlinebalance': 0.0,
+            'networth': 500.0,
+            'lifetimeearnings': 0.0,
+            'rank': 0,
+            'tier': 1,
+            'xp': 0,
+            'totalxp': 0,
+            'products': [self._product_id(i) for i in range(self.products)],
+            'vehicles': [self._vehicle() for _ in range(self.owned_vehicles)],
+        }
+
+        self._write(save_dir)
+
+
+    def advance(self, save_dir: Path) -> None:
+        # one in-game save: time moves on, some money and xp are made, now and then a product is discovered
+        s: dict = self.state[save_dir]
+        r: random.Random = self.Random
+
+        s['playtime'] += r.randint(60, 600)
+        s['timeofday'] = (s['timeofday'] + r.randint(10, 300)) % 2400
+        if s['timeofday'] < 400 and r.random() < 0.5:
+            s['elapseddays'] += 1
+
+        earned: float = round(r.uniform(0, 2000), 2)
+        s['lifetimeearnings'] = round(s['lifetimeearnings'] + earned, 2)
+        s['onlinebalance'] = round(s['onlinebalance'] + earned * r.uniform(0, 0.5), 2)
+        s['networth'] = round(s['networth'] + earned * r.uniform(0.2, 0.9), 2)
+
+        s['xp'] += r.randint(0, 200)
+        s['totalxp'] += s['xp']
+        if s['xp'] >= 1000:
+            s['xp'] -= 1000
+            s['tier'] += 1
+            if s['tier'] > 5:
+                s['tier'] = 1
+                s['rank'] += 1
+
+        if r.random() < 0.1:
+            s['products'].append(self._product_id(len(s['products'])))
+
+        self._write(save_dir)
+
+
+    def _product_id(self, i: int) -> str:
+        return f"{self.Random.choice(self.bases)}{''.join(self.Random.sample(self.ingredients, 2))}{i}"
+
+
+    def _vehicle(self) -> dict:
+        r: random.Random = self.Random
+
+        return {
+            'DataType': 'VehicleData',
+            'DataVersion': 0,
+            'GameVersion': self.game_version,
+            'VehicleCode': r.choice(self.vehicles),
+            'GUID': str(uuid.UUID(int=r.getrandbits(128))),
+            'Position': {'x': r.uniform(-200, 200), 'y': r.uniform(0, 5), 'z': r.uniform(-200, 200)},
+            'Rotation': {'x': 0.0, 'y': r.uniform(-1, 1), 'z': 0.0, 'w': r.uniform(-1, 1)},
+            'Color': r.choice(['White', 'Black', 'Red', 'Blue', 'Green']),
+            'VehicleContents': {
+                'Items': [json.dumps({'DataType': 'ItemData', 'ID': r.choice(self.ingredients), 'Quantity': r.randint(1, 20)}) for _ in range(r.randint(0, 16))],
+            },
+        }
+
+
+    def _write(self, save_dir: Path) -> None:
+        s: dict = self.state[save_dir]
+        r: random.Random = self.Random
+
+        files: dict[str, dict] = {
+            'Game.json': {
+                'DataType': 'GameData',
+                'DataVersion': 0,
+                'GameVersion': self.game_version,
+                'Seed': s['seed'],
+                'OrganisationName': f"Synthetic Org {s['slot']}",
+                'Settings': {'ConsoleEnabled': False},
+            },
+            'Time.json': {
+                'DataType': 'TimeData',
+                'DataVersion': 0,
+                'GameVersion': self.game_version,
+                'TimeOfDay': s['timeofday'],
+                'ElapsedDays': s['elapseddays'],
+                'Playtime': s['playtime'],
+            },
+            'Money.json': {
+                'DataType': 'MoneyData',
+                'DataVersion': 0,
+                'GameVersion': self.game_version,
+                'OnlineBalance': s['onlinebalance'],
+                'Networth': s['networth'],
+                'LifetimeEarnings': s['lifetimeearnings'],
+                'WeeklyDepositSum': 0.0,
+            },
+            'Rank.json': {
+                'DataType': 'RankData',
+                'DataVersion': 0,
+                'GameVersion': self.game_version,
+                'Rank': s['rank'],
+                'Tier': s['tier'],
+                'XP': s['xp'],
+                'TotalXP': s['totalxp'],
+            },
+            'Products.json': {
+                'DataType': 'ProductManagerData',
+                'DataVersion': 0,
+                'GameVersion': self.game_version,
+                'DiscoveredProducts': s['products'],
+                'ListedProducts': s['products'][::3],
+                'ActiveMixOperation': {'ProductID': '', 'IngredientID': ''},
+                'IsMixComplete': False,
+                'MixRecipes': [{'Product': p, 'Mixer': r.choice(self.ingredients), 'Output': p} for p in s['products']],
+                'ProductPrices': [{'String': p, 'Int': r.randint(20, 200)} for p in s['products']],
+                'FavouritedProducts': s['products'][:5],
+            },
+            'OwnedVehicles.json': {
+                'DataType': 'VehicleCollectionData',
+                'DataVersion': 0,
+                'GameVersion': self.game_version,
+                'Vehicles': s['vehicles'],
+            },
+        }
+
+        for name, data in files.items():
+            save_dir.joinpath(name).write_text(json.dumps(data, indent=self.indent), encoding='utf-8')
@@ -0,0 +1,232 @@
+import abc
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from pathlib import Path
+
+
+
+
+class Watcher(abc.ABC):
+    name: str = ''
+
+    dirs: list[Path]
+    files: list[str]
+    debounce: float
+
+
+    def __init__(self, dirs: list[Path], files: list[str], debounce: float) -> None:
+        self.dirs = dirs
+        self.files = files
+        self.debounce = debounce
+
+
+    @staticmethod
+    def create(dirs: list[Path], files: list[str], debounce: float, poll_interval: float) -> 'Watcher':
+        if sys.platform.startswith('linux'):
+            try:
+                return InotifyWatcher(dirs=dirs, files=files, debounce=debounce, poll_interval=poll_interval)
+            except OSError:
+                pass
+
+        return StatWatcher(dirs=dirs, files=files, debounce=debounce, poll_interval=poll_interval)
+
+
+    @abc.abstractmethod
+    def wait(self, timeout: float | None = None) -> set[Path]:
+        # the save directories with changed files, an empty set after the timeout
+        pass
+
+
+    def close(self) -> None:
+        pass
+
+
+
+
+class InotifyWatcher(Watcher):
+    name: str = 'inotify'
+
+    IN_MODIFY: int = 0x00000002
+    IN_CLOSE_WRITE: int = 0x00000008
+    IN_MOVED_TO: int = 0x00000080
+    IN_CREATE: int = 0x00000100
+    IN_DELETE: int = 0x00000200
+    IN_DELETE_SELF: int = 0x00000400
+    IN_MOVE_SELF: int = 0x00000800
+    # always reported, without being in the mask
+    IN_Q_OVERFLOW: int = 0x00004000
+    IN_IGNORED: int = 0x00008000
+
+    event_header: struct.Struct = struct.Struct('iIII')
+
+    libc: ctypes.CDLL
+    mask: int
+    poll_interval: float
+
+    fd: int
+    wds: dict[int, Path]
+    # directories deleted or moved away, e.g. a save game replaced by the game, watched again once they are back
+    missing: set[Path]
+
+
+    def __init__(self, dirs: list[Path], files: list[str], debounce: float, poll_interval: float = 1) -> None:
+        super().__init__(dirs=dirs, files=files, debounce=debounce)
+        self.poll_interval = poll_interval
+
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+
+        self.mask = self.IN_MODIFY | self.IN_CLOSE_WRITE | self.IN_MOVED_TO | self.IN_CREATE | self.IN_DELETE | self.IN_DELETE_SELF | self.IN_MOVE_SELF
+
+        self.wds = {}
+        self.missing = set()
+        for dir in self.dirs:
+            try:
+                self._add_watch(dir)
+            except OSError:
+                os.close(self.fd)
+                raise
+
+
+    def _add_watch(self, dir: Path) -> None:
+        wd: int = self.libc.inotify_add_watch(self.fd, os.fsencode(dir), self.mask)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed: {dir}")
+        self.wds[wd] = dir
+
+
+    def _rewatch(self) -> set[Path]:
+        # directories that are back, their files may have changed in the meantime
+        back: set[Path] = set()
+
+        for dir in list(self.missing):
+            try:
+                self._add_watch(dir)
+            except OSError:
+                continue
+            self.missing.discard(dir)
+            back.add(dir)
+
+        return back
+
+
+    def wait(self, timeout: float | None = None) -> set[Path]:
+        deadline: float | None = None if timeout is None else time.monotonic() + timeout
+        changed: set[Path] = set()
+
+        while not changed:
+            if deadline is not None and time.monotonic() >= deadline:
+                return changed
+            changed = self._rewatch()
+            if changed:
+                break
+            wait: float | None = None if deadline is None else max(0, deadline - time.monotonic())
+            if self.missing:
+                wait = self.poll_interval if wait is None else min(wait, self.poll_interval)
+            changed = self._read_events(wait)
+
+        # the game writes several files per save, wait until it is done
+        while settling := self._read_events(self.debounce):
+            changed |= settling
+
+        return changed
+
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+    def _read_events(self, timeout: float | None) -> set[Path]:
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        changed: set[Path] = set()
+
+        if not readable:
+            return changed
+
+        buf: bytes = os.read(self.fd, 64 * 1024)
+        offset: int = 0
+
+        while offset < len(buf):
+            wd, event_mask, _, name_len = self.event_header.unpack_from(buf, offset)
+            offset += self.event_header.size
+            name: str = os.fsdecode(buf[offset:offset + name_len].rstrip(b'\0'))
+            offset += name_len
+
+            if event_mask & self.IN_Q_OVERFLOW:
+                # events were lost, every save is read again
+                changed |= set(self.dirs)
+            elif event_mask & (self.IN_IGNORED | self.IN_DELETE_SELF | self.IN_MOVE_SELF):
+                # the watch is gone or follows the directory to where it was moved
+                if wd in self.wds:
+                    self.missing.add(self.wds.pop(wd))
+                    if not event_mask & self.IN_IGNORED:
+                        self.libc.inotify_rm_watch(self.fd, wd)
+            elif name in self.files and wd in self.wds:
+                changed.add(self.wds[wd])
+
+        return changed
+
+
+
+
+class StatWatcher(Watcher):
+    name: str = 'stat'
+
+    poll_interval: float
+    fingerprint: dict[Path, tuple[int, int] | None]
+
+
+    def __init__(self, dirs: list[Path], files: list[str], debounce: float, poll_interval: float) -> None:
+        super().__init__(dirs=dirs, files=files, debounce=debounce)
+        self.poll_interval = poll_interval
+        self.fingerprint = self._scan()
+
+
+    def wait(self, timeout: float | None = None) -> set[Path]:
+        deadline: float | None = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            if deadline is not None and time.monotonic() >= deadline:
+                return set()
+
+            time.sleep(self.poll_interval if deadline is None else min(self.poll_interval, max(0, deadline - time.monotonic())))
+
+            current: dict[Path, tuple[int, int] | None] = self._scan()
+            if current != self.fingerprint:
+                break
+
+        # the game writes several files per save, wait until it is done
+        while True:
+            time.sleep(self.debounce)
+            settled: dict[Path, tuple[int, int] | None] = self._scan()
+            if settled == current:
+                break
+            current = settled
+
+        changed: set[Path] = {file.parent for file, fp in current.items() if self.fingerprint.get(file) != fp}
+        self.fingerprint = current
+
+        return changed
+
+
+    def _scan(self) -> dict[Path, tuple[int, int] | None]:
+        fingerprint: dict[Path, tuple[int, int] | None] = {}
+
+        for dir in self.dirs:
+            for f in self.files:
+                file: Path = dir.joinpath(f)
+                try:
+                    st: os.stat_result = file.stat()
+                    fingerprint[file] = (st.st_mtime_ns, st.st_size)
+                except OSError:
+                    fingerprint[file] = None
+
+        return fingerprint
@@ -0,0 +1,208 @@
+import hashlib
+import multiprocessing.connection
+import os
+import secrets
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import hylandbook.database
+
+
+
+
+class WriterQueue:
+    # the first instance on a data directory becomes the writer, the others hand their statements to it,
+    # everything that arrived while the previous transaction was committed goes into the next one
+    data_dir: Path
+    Database: hylandbook.database.DatabaseSQLite
+    poll_interval: float
+
+    address: str
+    family: str
+    authkey: bytes
+
+    role: str | None = None
+    Listener: multiprocessing.connection.Listener | None = None
+    Client: multiprocessing.connection.Connection | None = None
+    clients: list[multiprocessing.connection.Connection]
+    lock: threading.Lock
+    closed: threading.Event
+    Thread: threading.Thread | None = None
+
+    batches: int = 0
+    statements: int = 0
+
+
+    def __init__(self, data_dir: Path, database: hylandbook.database.DatabaseSQLite, poll_interval: float = 0.05) -> None:
+        self.data_dir = data_dir
+        self.Database = database
+        self.poll_interval = poll_interval
+        self.clients = []
+        self.lock = threading.Lock()
+        self.closed = threading.Event()
+
+        name: str = f"hylandbook-{hashlib.blake2b(str(data_dir).encode(), digest_size=8).hexdigest()}"
+        if os.name == 'nt':
+            self.address, self.family = (rf'\\.\pipe\{name}', 'AF_PIPE')
+        else:
+            # socket paths are limited to about 100 characters, data_dir may be longer
+            self.address, self.family = (os.path.join(tempfile.gettempdir(), f'{name}.sock'), 'AF_UNIX')
+
+        self.authkey = self._authkey()
+
+
+    def _authkey(self) -> bytes:
+        # shared by every instance able to read the data directory
+        file: Path = self.data_dir.joinpath('writer.key')
+        try:
+            fd: int = os.open(file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(secrets.token_bytes(32))
+        except FileExistsError:
+            pass
+
+        # written by another instance a moment ago
+        for _ in range(10):
+            key: bytes = file.read_bytes()
+            if key:
+                return key
+            time.sleep(0.01)
+
+        return key
+
+
+    def start(self) -> str:
+        for _ in range(3):
+            try:
+                self.Client = multiprocessing.connection.Client(self.address, family=self.family, authkey=self.authkey)
+                self.role = 'client'
+                return self.role
+            except (OSError, EOFError, multiprocessing.AuthenticationError):
+                pass
+
+            # left behind by a writer that did not exit cleanly
+            if self.family == 'AF_UNIX':
+                Path(self.address).unlink(missing_ok=True)
+
+            try:
+                self.Listener = multiprocessing.connection.Listener(self.address, family=self.family, authkey=self.authkey)
+            except OSError:
+                # another instance became the writer in the meantime
+                time.sleep(0.1)
+                continue
+
+            # the writer's own statements take the same way, only the serving thread uses its database connection
+            self.Client, con = multiprocessing.connection.Pipe()
+            with self.lock:
+                self.clients.append(con)
+
+            self.role = 'writer'
+            threading.Thread(target=self._accept, daemon=True).start()
+            self.Thread = threading.Thread(target=self._serve, daemon=True)
+            self.Thread.start()
+            return self.role
+
+        raise OSError(f"failed to connect to or start the writer queue at {self.address}")
+
+
+    def write(self, sql: str, params: dict | tuple = ()) -> int | None:
+        # the first column of the row the statement returned, e.g. RETURNING log_id, otherwise lastrowid,
+        # once the row is committed, None if the statement changed no rows
+        try:
+            self.Client.send((sql, params))
+            ok, result = self.Client.recv()
+        except (OSError, EOFError):
+            # the writer has exited, take over or connect to the new one
+            self.Client.close()
+            self.start()
+            return self.write(sql, params)
+
+        if not ok:
+            raise sqlite3.OperationalError(result)
+
+        return result
+
+
+    def _accept(self) -> None:
+        while not self.closed.is_set():
+            try:
+                con: multiprocessing.connection.Connection = self.Listener.accept()
+            except (OSError, EOFError, multiprocessing.AuthenticationError):
+                if self.closed.is_set():
+                    return
+                continue
+
+            with self.lock:
+                self.clients.append(con)
+
+
+    def _serve(self) -> None:
+        while not self.closed.is_set():
+            with self.lock:
+                clients: list = list(self.clients)
+
+            if not clients:
+                time.sleep(self.poll_interval)
+                continue
+
+            ready: list = multiprocessing.connection.wait(clients, timeout=self.poll_interval)
+            if not ready:
+                continue
+
+            replies: list[tuple] = []
+
+            for con in ready:
+                try:
+                    while con.poll():
+                        sql, params = con.recv()
+                        try:
+                            cur: sqlite3.Cursor = self.Database.write(sql, params)
+                            if cur.description:
+                                returned: tuple | None = cur.fetchone()
+                                replies.append((con, (True, returned[0] if returned else None)))
+                            else:
+                                replies.append((con, (True, cur.lastrowid if cur.rowcount else None)))
+                        except sqlite3.Error as e:
+                            replies.append((con, (False, str(e))))
+                except (OSError, EOFError):
+                    con.close()
+                    with self.lock:
+                        self.clients.remove(con)
+
+            try:
+                self.Database.commit(force=True)
+            except sqlite3.Error as e:
+                replies = [(con, (False, str(e))) for con, _ in replies]
+
+            self.batches += 1
+            self.statements += len(replies)
+
+            for con, reply in replies:
+                try:
+                    con.send(reply)
+                except (OSError, EOFError):
+                    pass
+
+        with self.lock:
+            for con in self.clients:
+                con.close()
+            self.clients = []
+
+        self.Database.close()
+
+
+    def close(self) -> None:
+        self.closed.set()
+
+        if self.Client:
+            self.Client.close()
+
+        if self.Listener:
+            self.Listener.close()
+
+        # the last batch is committed before the other instances are disconnected
+        if self.Thread:
+            self.Thread.join(timeout=5)
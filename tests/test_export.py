@@ -0,0 +1,50 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+import hylandbook.export
+
+
+
+
+class ExportTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.dir = Path(self.tmp.name)
+
+
+    def exporter(self, keys: list[str]) -> hylandbook.export.Exporter:
+        return hylandbook.export.Exporter(data_dir=self.dir, types=['json', 'txt', 'ndjson'], keys=keys, all_keys=['organisation', 'networth', 'rank', 'xp'])
+
+
+    def test_chosen_keys(self) -> None:
+        Exporter = self.exporter(keys=['networth', 'rank', 'xp'])
+
+        # keys without a value are left out, as json.dumps() of the rest would write them
+        row: dict = {'organisation': 'Org', 'networth': 12.5, 'rank': 0, 'xp': None}
+        Exporter.export(row)
+        self.assertEqual(self.dir.joinpath('current.json').read_text(), json.dumps({'networth': 12.5}, indent=4))
+        self.assertEqual(self.dir.joinpath('current.txt').read_text(), 'networth  12.5')
+
+        Exporter.export({**row, 'networth': 0})
+        self.assertEqual(self.dir.joinpath('current.json').read_text(), '{}')
+        self.assertEqual(self.dir.joinpath('current.txt').read_text(), '')
+
+        Exporter.export({**row, 'rank': 3, 'xp': 250})
+        self.assertEqual(json.loads(self.dir.joinpath('current.json').read_text()), {'networth': 12.5, 'rank': 3, 'xp': 250})
+        self.assertEqual(self.dir.joinpath('current.txt').read_text(), 'networth  12.5\n    rank  3\n      xp  250')
+
+        # history lines always have every column
+        lines: list[dict] = [json.loads(line) for line in self.dir.joinpath('history.ndjson').read_text().splitlines()]
+        self.assertEqual(lines[1], {'networth': 0, 'rank': 0, 'xp': None})
+
+
+    def test_all_keys(self) -> None:
+        Exporter = self.exporter(keys=['all'])
+
+        row: dict = {'organisation': 'Org', 'networth': 0.0, 'rank': 0, 'xp': 1}
+        Exporter.export(row)
+        self.assertEqual(json.loads(self.dir.joinpath('current.json').read_text()), row)
+        self.assertEqual(self.dir.joinpath('current.json').read_text(), json.dumps(row, indent=4))
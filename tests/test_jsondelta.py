@@ -0,0 +1,95 @@
+import copy
+import json
+import random
+import unittest
+
+import hylandbook.jsondelta
+
+
+
+
+class JsonDeltaTest(unittest.TestCase):
+    def value(self, r: random.Random, depth: int = 0) -> object:
+        kind: int = r.randrange(8 if depth < 3 else 6)
+        if kind == 0:
+            return r.randint(-5, 5)
+        if kind == 1:
+            return r.choice([0.5, 1.0, -2.25])
+        if kind == 2:
+            return r.choice([True, False, None])
+        if kind in (3, 4, 5):
+            return r.choice(['a', 'b', 'c', '', 'd"e'])
+        if kind == 6:
+            return [self.value(r, depth + 1) for _ in range(r.randrange(6))]
+        return {r.choice('klmnop'): self.value(r, depth + 1) for _ in range(r.randrange(5))}
+
+
+    def mutate(self, r: random.Random, value: object, depth: int = 0) -> object:
+        if r.random() < 0.15 or not isinstance(value, (list, dict)):
+            return self.value(r, depth) if r.random() < 0.7 else value
+
+        if isinstance(value, dict):
+            b: dict = {}
+            for k, v in value.items():
+                if r.random() < 0.15:
+                    continue
+                b[k] = self.mutate(r, v, depth + 1)
+            if r.random() < 0.3:
+                b[r.choice('klmnopq')] = self.value(r, depth + 1)
+            if r.random() < 0.1:
+                b = dict(reversed(list(b.items())))
+            return b
+
+        b: list = [self.mutate(r, v, depth + 1) if r.random() < 0.3 else v for v in value]
+        for _ in range(r.randrange(3)):
+            op: int = r.randrange(3)
+            i: int = r.randint(0, len(b))
+            if op == 0:
+                b.insert(i, self.value(r, depth + 1))
+            elif op == 1 and b:
+                del b[min(i, len(b) - 1)]
+            elif b:
+                b[min(i, len(b) - 1):min(i, len(b) - 1)] = b[:2]
+        return b
+
+
+    def assertRoundTrip(self, a: object, b: object) -> None:
+        original: object = copy.deepcopy(a)
+        delta: dict | None = hylandbook.jsondelta.diff(a, b)
+        # patches are stored as JSON
+        if delta is not None:
+            delta = json.loads(json.dumps(delta))
+
+        result: object = a if delta is None else hylandbook.jsondelta.apply(a, delta)
+        # the same file, types and key order included
+        self.assertEqual(json.dumps(result), json.dumps(b))
+        self.assertEqual(json.dumps(a), json.dumps(original))
+
+
+    def test_random(self) -> None:
+        r: random.Random = random.Random(7)
+        for _ in range(2000):
+            a: object = self.value(r)
+            self.assertRoundTrip(a, self.mutate(r, a))
+
+
+    def test_random_lists(self) -> None:
+        # like the pieces of a save file, long lists of strings with repeated elements
+        r: random.Random = random.Random(11)
+        for _ in range(300):
+            a: list[str] = [r.choice(['{', '}', '"a",', '"b",', '1,', '2,']) + str(r.randrange(4)) for _ in range(r.randrange(80))]
+            b: list[str] = list(a)
+            for _ in range(r.randrange(6)):
+                i: int = r.randint(0, len(b))
+                if r.random() < 0.5:
+                    b[i:i] = [f'new{r.randrange(3)}'] * r.randrange(1, 4)
+                else:
+                    del b[i:i + r.randrange(1, 4)]
+            self.assertRoundTrip(a, b)
+
+
+    def test_types(self) -> None:
+        # equal in Python, not in the file
+        for a, b in [(1, 1.0), (1, True), (0, False), ({'a': 1, 'b': 2}, {'b': 2, 'a': 1}), ([1], [1.0])]:
+            self.assertIsNotNone(hylandbook.jsondelta.diff(a, b))
+            self.assertRoundTrip(a, b)
@@ -0,0 +1,100 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+import hylandbook.jsonstream
+
+
+
+
+class JsonStreamTest(unittest.TestCase):
+    # key path -> mode, compared with what json.loads() makes of the same file
+    targets: dict[tuple[str, ...], str] = {
+        ('Products',): 'len',
+        ('Prices',): 'len',
+        ('Empty',): 'len',
+        ('EmptyObject',): 'len',
+        ('Nested', 'Vehicles'): 'len',
+        ('Nested', 'Owner'): 'value',
+        ('Settings',): 'value',
+        ('Quoted',): 'value',
+        ('Tricky',): 'value',
+        ('Unicode',): 'value',
+        ('Networth',): 'value',
+        ('Flag',): 'value',
+        ('Missing',): 'value',
+    }
+
+
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.dir = Path(self.tmp.name)
+
+
+    def document(self) -> dict:
+        return {
+            'DataType': 'Test',
+            'Quoted': 'say "hi" \\ and \\"bye\\"',
+            'Tricky': 'brackets ] [ } { , : inside a string',
+            'Unicode': 'Ünïcödé ✓ \U0001f600',
+            'Products': [f'product "{i}", with [brackets]' for i in range(40)],
+            'Prices': [{'String': f'p{i}', 'Int': i} for i in range(25)],
+            'Empty': [],
+            'EmptyObject': {},
+            'Nested': {
+                'Vehicles': [[1, 2.5, -3e2], {'a': [None, True, False]}, 'x', 0],
+                'Owner': {'Name': 'Quote \\" Man', 'Items': ['a', 'b']},
+            },
+            'Settings': {'ConsoleEnabled': False, 'Volume': 0.75},
+            'Networth': 12345.5,
+            'Flag': None,
+        }
+
+
+    def expected(self, doc: dict) -> dict:
+        results: dict = {}
+        for path, mode in self.targets.items():
+            value: object = doc
+            for k in path:
+                if not isinstance(value, dict) or k not in value:
+                    break
+                value = value[k]
+            else:
+                results[path] = len(value) if mode == 'len' else value
+        return results
+
+
+    def write(self, text: str, prefix: bytes = b'') -> Path:
+        file: Path = self.dir.joinpath('Test.json')
+        file.write_bytes(prefix + text.encode('utf-8'))
+        return file
+
+
+    def assertScans(self, file: Path, doc: dict) -> None:
+        for chunk_size in range(1, 65):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(hylandbook.jsonstream.JsonStream(chunk_size=chunk_size).scan(file, self.targets), self.expected(doc))
+
+
+    def test_chunk_boundaries(self) -> None:
+        doc: dict = self.document()
+        self.assertScans(self.write(json.dumps(doc, indent=4, ensure_ascii=False)), doc)
+
+
+    def test_compact(self) -> None:
+        doc: dict = self.document()
+        self.assertScans(self.write(json.dumps(doc, separators=(',', ':'))), doc)
+
+
+    def test_bom_crlf(self) -> None:
+        doc: dict = self.document()
+        text: str = json.dumps(doc, indent=2, ensure_ascii=False).replace('\n', '\r\n')
+        self.assertScans(self.write(text, prefix=b'\xef\xbb\xbf'), doc)
+
+
+    def test_unterminated(self) -> None:
+        file: Path = self.write('{"Quoted": "no end')
+        with self.assertRaises(json.JSONDecodeError):
+            hylandbook.jsonstream.JsonStream(chunk_size=4).scan(file, self.targets)
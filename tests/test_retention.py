@@ -0,0 +1,98 @@
+import sqlite3
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+import hylandbook.conf
+import hylandbook.database
+import hylandbook.retention
+
+
+
+
+Conf = hylandbook.conf.Conf()
+
+
+
+
+class RetentionTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+        self.Database = hylandbook.database.DatabaseSQLite(file=Path(self.tmp.name).joinpath('book.db'))
+        con = sqlite3.connect(self.Database.file)
+        con.execute(f'PRAGMA auto_vacuum = {Conf.db_auto_vacuum};')
+        con.executescript(Conf.db_schema)
+        con.execute("INSERT INTO saves (save_id, save_dir, organisation, seed) VALUES (1, 'SaveGame_1', 'org', 1);")
+        con.commit()
+        con.close()
+        self.Database.upgrade(Conf.db_migrations)
+        self.addCleanup(self.Database.close)
+
+        self.now: float = time.time()
+
+
+    def log(self, days_ago: float, rows: int, elapseddays: int) -> None:
+        # one row a minute, all in the same in-game day
+        start: float = self.now - days_ago * 86400
+        self.Database.write_many(
+            'INSERT INTO logs (log_time, save_id, elapseddays, networth) VALUES (?, 1, ?, ?);',
+            [(start + i * 60, elapseddays, float(i)) for i in range(rows)],
+        )
+        self.Database.commit(force=True)
+
+
+    def count(self) -> int:
+        return self.Database.execute('SELECT COUNT(*) FROM logs;').fetchone()[0]
+
+
+    def retention(self) -> hylandbook.retention.Retention:
+        return hylandbook.retention.Retention(database=self.Database, tiers=Conf.retention_tiers, batch_size=7)
+
+
+    def test_cursors_survive_restart(self) -> None:
+        self.log(days_ago=20, rows=30, elapseddays=3)
+        self.log(days_ago=19, rows=30, elapseddays=4)
+
+        Retention = self.retention()
+        Retention.run(budget=5)
+        self.assertTrue(Retention.caught_up)
+        self.assertEqual(self.count(), 2)
+
+        # a new instance starts where the last one stopped
+        Restarted = self.retention()
+        Restarted.run(budget=5)
+        self.assertEqual(Restarted.cursors, Retention.cursors)
+        self.assertGreater(Restarted.cursors[0], 0)
+
+
+    def test_rewind(self) -> None:
+        self.log(days_ago=20, rows=30, elapseddays=3)
+        self.retention().run(budget=5)
+        self.assertEqual(self.count(), 1)
+
+        # imported into the past, behind the cursor
+        self.log(days_ago=25, rows=30, elapseddays=1)
+        self.retention().run(budget=5)
+        self.assertEqual(self.count(), 31)
+
+        hylandbook.retention.Retention.rewind(database=self.Database, log_time=self.now - 25 * 86400)
+        self.Database.commit(force=True)
+        self.retention().run(budget=5)
+        self.assertEqual(self.count(), 2)
+
+
+    def test_vacuum_at_commit(self) -> None:
+        self.log(days_ago=20, rows=5000, elapseddays=3)
+        self.retention().run(budget=5)
+        self.assertGreater(self.Database.execute('PRAGMA freelist_count;').fetchone()[0], 0)
+
+        # waits for the next commit of rows
+        self.Database.incremental_vacuum(pages=1000)
+        self.assertEqual(self.Database.freed_pages, 0)
+
+        self.log(days_ago=1, rows=1, elapseddays=30)
+        self.assertGreater(self.Database.freed_pages, 0)
+        self.assertEqual(self.Database.vacuum_pages, 0)
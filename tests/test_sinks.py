@@ -0,0 +1,186 @@
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+import hylandbook.sinks
+
+
+
+
+class SinkTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.dir = Path(self.tmp.name)
+
+
+    @staticmethod
+    def rows(*values: dict, t: float = 1700000000.5) -> list[tuple[int, dict, dict]]:
+        # (save_id, row, values of keys) as handed to send()
+        return [(1, {'_t': t, 'organisation': 'Synthetic Org', **v}, v) for v in values]
+
+
+    def test_abstract(self) -> None:
+        with self.assertRaises(TypeError):
+            hylandbook.sinks.Sink(target='x', keys=[])
+        with self.assertRaises(TypeError):
+            hylandbook.sinks.DatagramSink(target='127.0.0.1:8125', keys=[], data_dir=self.dir)
+
+
+    @unittest.skipUnless(hasattr(os, 'mkfifo'), 'named pipes')
+    def test_fifo(self) -> None:
+        Sink = hylandbook.sinks.FifoSink(target='current.pipe', keys=['networth'], data_dir=self.dir)
+        Sink.open()
+        self.addCleanup(Sink.shutdown)
+
+        # nobody reads yet
+        Sink.send(self.rows({'networth': 1.5}))
+        self.assertEqual((Sink.sent, Sink.dropped), (0, 1))
+
+        reader: int = os.open(self.dir.joinpath('current.pipe'), os.O_RDONLY | os.O_NONBLOCK)
+        self.addCleanup(os.close, reader)
+        Sink.send(self.rows({'networth': 2.5}, {'networth': 3.5}))
+        self.assertEqual(Sink.sent, 2)
+        self.assertEqual([json.loads(line) for line in os.read(reader, 4096).splitlines()], [{'networth': 2.5}, {'networth': 3.5}])
+
+
+    @unittest.skipUnless(hasattr(os, 'mkfifo'), 'named pipes')
+    def test_fifo_partial_write(self) -> None:
+        Sink = hylandbook.sinks.FifoSink(target='current.pipe', keys=['name'], data_dir=self.dir, fifo_write_timeout=5)
+        Sink.open()
+        self.addCleanup(Sink.shutdown)
+
+        reader: int = os.open(self.dir.joinpath('current.pipe'), os.O_RDONLY | os.O_NONBLOCK)
+        self.addCleanup(os.close, reader)
+
+        # longer than the pipe takes at once, the reader only starts after the first part was written
+        name: str = 'x' * 256 * 1024
+        received: list[bytes] = []
+
+        def read() -> None:
+            time.sleep(0.2)
+            data: bytes = b''
+            while not data.endswith(b'\n'):
+                try:
+                    data += os.read(reader, 65536)
+                except BlockingIOError:
+                    time.sleep(0.01)
+            received.append(data)
+
+        Reader = threading.Thread(target=read)
+        Reader.start()
+        Sink.send(self.rows({'name': name}))
+        Reader.join(10)
+
+        self.assertEqual(Sink.sent, 1)
+        self.assertEqual(json.loads(received[0]), {'name': name})
+
+
+    @unittest.skipUnless(hasattr(os, 'mkfifo'), 'named pipes')
+    def test_fifo_stuck_reader(self) -> None:
+        Sink = hylandbook.sinks.FifoSink(target='current.pipe', keys=['name'], data_dir=self.dir, fifo_write_timeout=0.1)
+        Sink.open()
+        self.addCleanup(Sink.shutdown)
+
+        reader: int = os.open(self.dir.joinpath('current.pipe'), os.O_RDONLY | os.O_NONBLOCK)
+        self.addCleanup(os.close, reader)
+
+        # the rest of the line never fits, the row and the ones after it are dropped and the pipe is opened again
+        Sink.send(self.rows({'name': 'x' * 256 * 1024}, {'name': 'y'}))
+        self.assertEqual((Sink.sent, Sink.dropped), (0, 2))
+        self.assertIsNone(Sink.fd)
+
+
+    @unittest.skipUnless(hasattr(socket, 'AF_UNIX'), 'unix sockets')
+    def test_unix(self) -> None:
+        Sink = hylandbook.sinks.UnixSocketSink(target='current.sock', keys=['networth'], data_dir=self.dir)
+        Sink.open()
+        self.addCleanup(Sink.shutdown)
+
+        first: socket.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.addCleanup(first.close)
+        first.connect(str(self.dir.joinpath('current.sock')))
+        Sink.send(self.rows({'networth': 1.5}))
+        self.assertEqual(json.loads(first.recv(4096)), {'networth': 1.5})
+
+        # a new subscriber first gets the latest row
+        second: socket.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.addCleanup(second.close)
+        second.connect(str(self.dir.joinpath('current.sock')))
+        Sink.idle()
+        self.assertEqual(json.loads(second.recv(4096)), {'networth': 1.5})
+
+
+    @unittest.skipUnless(hasattr(socket, 'socketpair'), 'socket pairs')
+    def test_unix_slow_subscriber(self) -> None:
+        Sink = hylandbook.sinks.UnixSocketSink(target='current.sock', keys=['name'], data_dir=self.dir)
+
+        slow, slow_peer = socket.socketpair()
+        fast, fast_peer = socket.socketpair()
+        for s in (slow, slow_peer, fast, fast_peer):
+            self.addCleanup(s.close)
+        slow.setblocking(False)
+        fast.setblocking(False)
+        Sink.subscribers = [slow, fast]
+
+        # more than the slow subscriber's buffer takes, it is disconnected instead of getting half a line
+        line: bytes = json.dumps({'name': 'x' * 64}).encode('utf-8') + b'\n'
+        for _ in range(100000):
+            Sink._broadcast(line, Sink.subscribers)
+            if slow not in Sink.subscribers:
+                break
+            # the fast one keeps up
+            self.assertEqual(fast_peer.recv(len(line)), line)
+
+        self.assertEqual(Sink.subscribers, [fast])
+        self.assertEqual(Sink.disconnected, 1)
+
+
+    def udp(self) -> socket.socket:
+        receiver: socket.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.addCleanup(receiver.close)
+        receiver.bind(('127.0.0.1', 0))
+        receiver.settimeout(2)
+        return receiver
+
+
+    def test_statsd(self) -> None:
+        receiver: socket.socket = self.udp()
+        Sink = hylandbook.sinks.StatsdSink(target=f'127.0.0.1:{receiver.getsockname()[1]}', keys=['networth', 'xp', 'organisation'], data_dir=self.dir)
+        Sink.open()
+        self.addCleanup(Sink.shutdown)
+
+        Sink.send(self.rows({'networth': -2.5, 'xp': 10, 'organisation': 'Synthetic Org'}))
+        self.assertEqual(receiver.recv(4096).split(b'\n'), [b'hylandbook.1.networth:0|g', b'hylandbook.1.networth:-2.5|g', b'hylandbook.1.xp:10|g'])
+        self.assertEqual(Sink.sent, 1)
+
+
+    def test_statsd_datagram_size(self) -> None:
+        receiver: socket.socket = self.udp()
+        Sink = hylandbook.sinks.StatsdSink(target=f'127.0.0.1:{receiver.getsockname()[1]}', keys=['networth', 'xp'], data_dir=self.dir, max_datagram=40)
+        Sink.open()
+        self.addCleanup(Sink.shutdown)
+
+        # the lines of one row are split over datagrams, none longer than max_datagram
+        Sink.send(self.rows({'networth': 1.5, 'xp': 10}, {'networth': 2.5, 'xp': 20}))
+        datagrams: list[bytes] = [receiver.recv(4096) for _ in range(4)]
+        self.assertTrue(all([len(d) <= 40 for d in datagrams]))
+        self.assertEqual(b'\n'.join(datagrams).split(b'\n'), [
+            b'hylandbook.1.networth:1.5|g', b'hylandbook.1.xp:10|g',
+            b'hylandbook.1.networth:2.5|g', b'hylandbook.1.xp:20|g',
+        ])
+
+
+    def test_line_protocol(self) -> None:
+        receiver: socket.socket = self.udp()
+        Sink = hylandbook.sinks.LineProtocolSink(target=f'127.0.0.1:{receiver.getsockname()[1]}', keys=['networth', 'xp', 'rank name'], data_dir=self.dir)
+        Sink.open()
+        self.addCleanup(Sink.shutdown)
+
+        Sink.send(self.rows({'networth': 1.5, 'xp': 10, 'rank name': 'Street Rat'}, t=1700000000.5))
+        self.assertEqual(receiver.recv(4096), b'hylandbook,save_id=1,organisation=Synthetic\\ Org networth=1.5,xp=10i 1700000000500000000')
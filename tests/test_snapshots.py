@@ -0,0 +1,85 @@
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+
+import hylandbook.conf
+import hylandbook.database
+import hylandbook.snapshots
+
+
+
+
+Conf = hylandbook.conf.Conf()
+
+
+
+
+class SnapshotStoreTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.dir = Path(self.tmp.name)
+        self.save_dir = self.dir.joinpath('SaveGame_1')
+        self.save_dir.mkdir()
+
+        self.Database = hylandbook.database.DatabaseSQLite(file=self.dir.joinpath('book.db'))
+        con = sqlite3.connect(self.Database.file)
+        con.executescript(Conf.db_schema)
+        con.close()
+        self.Database.upgrade(Conf.db_migrations)
+        self.addCleanup(self.Database.close)
+
+
+    def products(self, n: int) -> bytes:
+        # not written by Python: CRLF, two-space indent, floats with trailing zeros and exponents, escaped quotes
+        lines: list[str] = ['{', '  "DataType": "ProductManagerData",', '  "Products": [']
+        for i in range(n):
+            lines.append(f'    {{"ID": "p{i}", "Price": {i}.50, "Size": 1.0E{i % 3}, "Label": "say \\"{i}\\""}}' + (',' if i < n - 1 else ''))
+        lines += ['  ]', '}', '']
+        return '\r\n'.join(lines).encode('utf-8')
+
+
+    def test_restore_round_trip(self) -> None:
+        Snapshots = hylandbook.snapshots.SnapshotStore(database=self.Database, codec='zlib', keyframe_interval=4, delta_min_size=0)
+        file: Path = self.save_dir.joinpath('Products.json')
+        versions: dict[int, bytes] = {}
+
+        for log_id in range(1, 11):
+            versions[log_id] = self.products(50 + log_id)
+            file.write_bytes(versions[log_id])
+            self.Database.write('INSERT INTO logs (log_id, log_time, save_id) VALUES (?, ?, 1);', (log_id, float(log_id)))
+            Snapshots.store(log_id=log_id, save_dir=self.save_dir)
+        self.Database.commit(force=True)
+
+        # a keyframe every 4th content, at 1, 5 and 9, the others are patches
+        self.assertEqual(Snapshots.deltas_written, 7)
+
+        restored: hylandbook.snapshots.SnapshotStore = hylandbook.snapshots.SnapshotStore(database=self.Database, codec='zlib')
+        for log_id, raw in versions.items():
+            dest: Path = self.dir.joinpath(f'restore_{log_id}')
+            self.assertEqual([p.name for p in restored.restore(log_id, dest)], ['Products.json'])
+            self.assertEqual(dest.joinpath('Products.json').read_bytes(), raw)
+
+
+    def test_not_json(self) -> None:
+        Snapshots = hylandbook.snapshots.SnapshotStore(database=self.Database, codec='none', keyframe_interval=4, delta_min_size=0)
+        file: Path = self.save_dir.joinpath('Game.json')
+        versions: list[bytes] = [b'\xff\xfe{"half":', b'\xff\xfe{"half": 1,\n"more"']
+
+        for log_id, raw in enumerate(versions, 1):
+            file.write_bytes(raw)
+            self.Database.write('INSERT INTO logs (log_id, log_time, save_id) VALUES (?, ?, 1);', (log_id, float(log_id)))
+            Snapshots.store(log_id=log_id, save_dir=self.save_dir)
+        self.Database.commit(force=True)
+
+        for log_id, raw in enumerate(versions, 1):
+            dest: Path = self.dir.joinpath(f'restore_{log_id}')
+            Snapshots.restore(log_id, dest)
+            self.assertEqual(dest.joinpath('Game.json').read_bytes(), raw)
+
+
+
+
+if __name__ == '__main__':
+    unittest.main()
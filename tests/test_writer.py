@@ -0,0 +1,56 @@
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+
+import hylandbook.app
+import hylandbook.conf
+import hylandbook.database
+import hylandbook.writer
+
+
+
+
+Conf = hylandbook.conf.Conf()
+
+
+
+
+class WriterQueueTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.dir = Path(self.tmp.name)
+
+        self.Database = hylandbook.database.DatabaseSQLite(file=self.dir.joinpath('book.db'))
+        con = sqlite3.connect(self.Database.file)
+        con.executescript(Conf.db_schema)
+        con.execute("INSERT INTO saves (save_id, save_dir, organisation, seed) VALUES (1, 'SaveGame_1', 'org', 1);")
+        con.commit()
+        con.close()
+        self.Database.upgrade(Conf.db_migrations)
+
+        self.App = hylandbook.app.App()
+        self.row: dict = {'log_time': 1700000000.125, 'save_id': 1, **{col: 1 for col in self.App.SdLogExtractor.columns}}
+
+
+    def test_resent_row_keeps_its_log_id(self) -> None:
+        WriterQueue = hylandbook.writer.WriterQueue(data_dir=self.dir, database=self.Database, poll_interval=0.01)
+        self.addCleanup(WriterQueue.close)
+        self.assertEqual(WriterQueue.start(), 'writer')
+
+        # the second one is what the queue sends when the writer went away after committing
+        log_id: int = WriterQueue.write(self.App.insert_log_sql, self.row)
+        self.assertEqual(WriterQueue.write(self.App.insert_log_sql, self.row), log_id)
+        self.assertNotEqual(WriterQueue.write(self.App.insert_log_sql, {**self.row, 'log_time': self.row['log_time'] + 1}), log_id)
+
+        con = sqlite3.connect(self.Database.file)
+        self.addCleanup(con.close)
+        self.assertEqual(con.execute('SELECT COUNT(*) FROM logs;').fetchone()[0], 2)
+
+
+    def test_direct_write_returns_log_id(self) -> None:
+        self.addCleanup(self.Database.close)
+
+        log_id: int = self.Database.write(self.App.insert_log_sql, self.row).fetchone()[0]
+        self.assertEqual(self.Database.write(self.App.insert_log_sql, self.row).fetchone()[0], log_id)